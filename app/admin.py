@@ -1,13 +1,17 @@
 from django.contrib import admin
-from .models import Author, Genre, Publisher, Book, Review
+from .models import Author, Genre, Publisher, Book, Review, Job
+from .pagination import EstimatedCountPaginator
 
 
+# Katta jadvallar uchun: "^" prefiks qidiruvi indeksdan foydalanadi, COUNT(*) taxminiy hisoblanadi
 @admin.register(Author)
 class AuthorAdmin(admin.ModelAdmin):
-    list_display = ('id', 'last_name', 'first_name', 'bio', 'birth_date', 'death_date')
-    search_fields = ('last_name', 'first_name', 'bio')
-    list_filter = ('birth_date', 'death_date')
+    list_display = ('id', 'last_name', 'first_name', 'bio', 'birth_date', 'death_date', 'is_deleted')
+    search_fields = ('^last_name', '^first_name')
+    list_filter = ('is_deleted', 'birth_date', 'death_date')
     ordering = ('last_name', 'first_name')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Genre)
@@ -20,22 +24,39 @@ class GenreAdmin(admin.ModelAdmin):
 @admin.register(Publisher)
 class PublisherAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'website', 'address')
-    search_fields = ('name', 'website')
+    search_fields = ('^name',)
     ordering = ('name',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
-    list_display = ('id', 'title', 'author', 'publisher', 'published_date', 'isbn', 'pages')
-    search_fields = ('title', 'author__last_name', 'author__first_name', 'publisher__name', 'isbn')
-    list_filter = ('published_date', 'publisher', 'genres')
+    list_display = ('id', 'title', 'author', 'publisher', 'published_date', 'isbn', 'pages', 'is_deleted')
+    list_select_related = ('author', 'publisher')
+    search_fields = ('^title', 'isbn__exact', '^author__last_name', '^publisher__name')
+    list_filter = ('is_deleted', 'published_date', 'genres')
     ordering = ('title',)
-    filter_horizontal = ('genres',)
+    autocomplete_fields = ('author', 'publisher', 'genres')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('id', 'book', 'reviewer_name', 'rating', 'created_at')
-    search_fields = ('book__title', 'reviewer_name', 'comment')
+    list_select_related = ('book', 'book__author')
+    search_fields = ('^reviewer_name', '^book__title')
     list_filter = ('rating', 'created_at')
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at', '-id')
+    raw_id_fields = ('book',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'locked_by', 'created_at')
+    list_filter = ('status', 'name')
+    ordering = ('run_at', 'id')
+    readonly_fields = ('last_error',)
@@ -0,0 +1,409 @@
+import math
+import os
+import secrets
+import threading
+import time
+from collections import Counter
+from itertools import count
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import similarity
+from .models import Author, Book, Genre, Publisher, Review
+from .urls import urlpatterns
+
+
+BENCH_USERNAME = 'benchmark'
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class Scenario:
+    def __init__(self, method, path, payload=None, prepare=None, auth=True):
+        self.method = method
+        self.path = path
+        self.payload = payload
+        self.prepare = prepare
+        self.auth = auth
+
+
+def is_disposable_database():
+    # Benchmark yozuvlar yaratadi va keshni tozalaydi: --force siz faqat DEBUG rejimida yoki test bazasida
+    name = str(connection.settings_dict['NAME'])
+    return settings.DEBUG or os.path.basename(name).startswith('test') or 'memory' in name
+
+
+class BenchContext:
+    def __init__(self):
+        self.run_id = int(time.time() * 1000)
+        # Har bir ishga tushirish uchun tasodifiy parolli vaqtinchalik foydalanuvchi; close() da o'chiriladi
+        self.username = f"{BENCH_USERNAME}-{self.run_id}"
+        self.password = secrets.token_urlsafe(16)
+        self.user = User(username=self.username, is_staff=True)
+        self.user.set_password(self.password)
+        self.user.save()
+        self.refresh = str(RefreshToken.for_user(self.user))
+        self.access = str(RefreshToken.for_user(self.user).access_token)
+        self.author_ids = list(Author.alive.values_list('pk', flat=True)[:1000])
+        self.book_ids = list(Book.alive.values_list('pk', flat=True)[:1000])
+        self.genre_ids = list(Genre.objects.values_list('pk', flat=True)[:1000])
+        self.publisher_ids = list(Publisher.objects.values_list('pk', flat=True)[:1000])
+        self.review_ids = list(Review.objects.values_list('pk', flat=True)[:1000])
+        if not self.book_ids:
+            raise ValueError("Benchmark uchun bazada kamida bitta kitob bo'lishi kerak.")
+        self.pool = []
+
+    def close(self):
+        User.objects.filter(username__startswith=f"bench{self.run_id}-").delete()
+        self.user.delete()
+
+    def pick(self, ids, i):
+        return ids[i % len(ids)]
+
+    def unique(self, i):
+        return f"{self.run_id}-{i}"
+
+    def prepare_authors(self, n):
+        self.pool = [a.pk for a in Author.objects.bulk_create(
+            [Author(first_name="Bench", last_name=f"Muallif {self.unique(i)}") for i in range(n)]
+        )]
+
+    def prepare_books(self, n):
+        self.prepare_authors(n)
+        self.pool = [b.pk for b in Book.objects.bulk_create(
+            [Book(title=f"Bench {self.unique(i)}", author_id=author_id) for i, author_id in enumerate(self.pool)]
+        )]
+
+    def prepare_genres(self, n):
+        self.pool = [g.pk for g in Genre.objects.bulk_create([Genre(name=f"Bench {self.unique(i)}") for i in range(n)])]
+
+    def prepare_publishers(self, n):
+        self.pool = [p.pk for p in Publisher.objects.bulk_create([Publisher(name=f"Bench {i}") for i in range(n)])]
+
+    def prepare_similarity(self, n):
+        similarity.build_full()
+
+    def prepare_reviews(self, n):
+        self.pool = [r.pk for r in Review.objects.bulk_create(
+            [Review(book_id=self.pick(self.book_ids, i), reviewer_name="Bench", rating=3) for i in range(n)]
+        )]
+
+
+def build_scenarios(ctx):
+    page = lambda i: {'page': i % 3 + 1}  # noqa: E731
+    return {
+        'api-token-auth/': Scenario(
+            'post', lambda i: '/api/api-token-auth/',
+            lambda i: {'username': ctx.username, 'password': ctx.password}, auth=False,
+        ),
+        'register_user': Scenario(
+            'post', lambda i: reverse('register_user'),
+            lambda i: {'username': f"bench{ctx.unique(i)}", 'email': f"bench{ctx.unique(i)}@gmail.com",
+                       'password': ctx.password},
+            auth=False,
+        ),
+        'login_user': Scenario(
+            'post', lambda i: reverse('login_user'),
+            lambda i: {'username': ctx.username, 'password': ctx.password}, auth=False,
+        ),
+        'jwt_refresh': Scenario('post', lambda i: reverse('jwt_refresh'), lambda i: {'refresh': ctx.refresh}, auth=False),
+
+        'author_create': Scenario(
+            'post', lambda i: reverse('author_create'),
+            lambda i: {'first_name': "Yangi", 'last_name': f"Muallif {ctx.unique(i)}"},
+        ),
+        'author_list_detail': Scenario('get', lambda i: reverse('author_list_detail'), page),
+        'author_update': Scenario(
+            'patch', lambda i: reverse('author_update', args=[ctx.pick(ctx.author_ids, i)]), lambda i: {'bio': f"Bio {i}"},
+        ),
+        'author_delete': Scenario(
+            'delete', lambda i: reverse('author_delete', args=[ctx.pool[i]]), prepare=ctx.prepare_authors,
+        ),
+        'author_batch': Scenario(
+            'post', lambda i: reverse('author_batch'), lambda i: {'ids': ctx.author_ids[i % 10:i % 10 + 30]},
+        ),
+        'author_detail': Scenario('get', lambda i: reverse('author_detail', args=[ctx.pick(ctx.author_ids, i)])),
+
+        'book_create': Scenario(
+            'post', lambda i: reverse('book_create'),
+            lambda i: {'title': f"Yangi kitob {i}", 'author': ctx.pool[i], 'publisher': None,
+                       'genres': ctx.genre_ids[:2]},
+            prepare=ctx.prepare_authors,
+        ),
+        'book_list_detail': Scenario('get', lambda i: reverse('book_list_detail'), page),
+        'book_batch': Scenario(
+            'post', lambda i: reverse('book_batch'), lambda i: {'ids': ctx.book_ids[i % 10:i % 10 + 30]},
+        ),
+        'book_export': Scenario('get', lambda i: reverse('book_export'), lambda i: {'output': 'ndjson'}),
+        'book_update': Scenario(
+            'patch', lambda i: reverse('book_update', args=[ctx.pick(ctx.book_ids, i)]), lambda i: {'pages': 100 + i},
+        ),
+        'book_delete': Scenario('delete', lambda i: reverse('book_delete', args=[ctx.pool[i]]), prepare=ctx.prepare_books),
+        'book_detail': Scenario('get', lambda i: reverse('book_detail', args=[ctx.pick(ctx.book_ids, i)])),
+        'book_reviews': Scenario('get', lambda i: reverse('book_reviews', args=[ctx.pick(ctx.book_ids, i)])),
+        'book_similar': Scenario(
+            'get', lambda i: reverse('book_similar', args=[ctx.pick(ctx.book_ids, i)]), prepare=ctx.prepare_similarity,
+        ),
+
+        'genre_create': Scenario('post', lambda i: reverse('genre_create'), lambda i: {'name': f"Janr {ctx.unique(i)}"}),
+        'genre_list_detail': Scenario('get', lambda i: reverse('genre_list_detail')),
+        'genre_update': Scenario(
+            'patch', lambda i: reverse('genre_update', args=[ctx.pool[i]]),
+            lambda i: {'name': f"Janr yangi {ctx.unique(i)}"}, prepare=ctx.prepare_genres,
+        ),
+        'genre_delete': Scenario('delete', lambda i: reverse('genre_delete', args=[ctx.pool[i]]), prepare=ctx.prepare_genres),
+        'genre_detail': Scenario('get', lambda i: reverse('genre_detail', args=[ctx.pick(ctx.genre_ids or [0], i)])),
+
+        'publisher_create': Scenario('post', lambda i: reverse('publisher_create'), lambda i: {'name': f"Nashriyot {i}"}),
+        'publisher_list_detail': Scenario('get', lambda i: reverse('publisher_list_detail')),
+        'publisher_update': Scenario(
+            'patch', lambda i: reverse('publisher_update', args=[ctx.pick(ctx.publisher_ids or [0], i)]),
+            lambda i: {'address': f"Manzil {i}"},
+        ),
+        'publisher_delete': Scenario(
+            'delete', lambda i: reverse('publisher_delete', args=[ctx.pool[i]]), prepare=ctx.prepare_publishers,
+        ),
+        'publisher_detail': Scenario(
+            'get', lambda i: reverse('publisher_detail', args=[ctx.pick(ctx.publisher_ids or [0], i)]),
+        ),
+
+        'review_create': Scenario(
+            'post', lambda i: reverse('review_create'),
+            lambda i: {'book': ctx.pick(ctx.book_ids, i), 'reviewer_name': "Bench", 'rating': i % 5 + 1},
+        ),
+        'review_list_detail': Scenario('get', lambda i: reverse('review_list_detail')),
+        'review_recent': Scenario('get', lambda i: reverse('review_recent'), lambda i: {'days': 30}),
+        'review_update': Scenario(
+            'patch', lambda i: reverse('review_update', args=[ctx.pick(ctx.review_ids or [0], i)]),
+            lambda i: {'rating': i % 5 + 1},
+        ),
+        'review_delete': Scenario('delete', lambda i: reverse('review_delete', args=[ctx.pool[i]]), prepare=ctx.prepare_reviews),
+        'review_detail': Scenario('get', lambda i: reverse('review_detail', args=[ctx.pick(ctx.review_ids or [0], i)])),
+
+        'leaderboard_genre_top_books': Scenario(
+            'get', lambda i: reverse('leaderboard_genre_top_books', args=[ctx.pick(ctx.genre_ids or [0], i)]),
+        ),
+        'leaderboard_most_reviewed': Scenario('get', lambda i: reverse('leaderboard_most_reviewed')),
+        'leaderboard_publishers': Scenario('get', lambda i: reverse('leaderboard_publishers')),
+
+        'change_feed': Scenario('get', lambda i: reverse('change_feed'), lambda i: {'since': 0, 'limit': 500}),
+        'metrics_snapshot': Scenario('get', lambda i: reverse('metrics_snapshot')),
+    }
+
+
+def route_names():
+    return [pattern.name or str(pattern.pattern) for pattern in urlpatterns]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+def make_client(ctx, scenario):
+    client = APIClient()
+    if scenario.auth:
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {ctx.access}')
+    return client
+
+
+def send(client, scenario, i):
+    payload = scenario.payload(i) if scenario.payload else None
+    if scenario.method == 'get':
+        response = client.get(scenario.path(i), payload)
+    else:
+        response = getattr(client, scenario.method)(scenario.path(i), payload, format='json')
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response.status_code
+
+
+def run_scenario(ctx, scenario, requests, concurrency):
+    if scenario.prepare:
+        scenario.prepare(requests + 1)
+    cache.clear()
+
+    # So'rovlar soni alohida, bitta oqimda o'lchanadi
+    with CaptureQueriesContext(connection) as queries:
+        send(make_client(ctx, scenario), scenario, requests)
+    query_count = len(queries)
+
+    latencies = []
+    errors = []
+    indexes = count()
+    lock = threading.Lock()
+
+    def worker():
+        client = make_client(ctx, scenario)
+        try:
+            while True:
+                with lock:
+                    i = next(indexes)
+                if i >= requests:
+                    return
+                started = time.perf_counter()
+                status_code = send(client, scenario, i)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed * 1000)
+                    if status_code >= 400:
+                        errors.append(status_code)
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connections.close_all()
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        worker()
+    else:
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.perf_counter() - started
+
+    result = {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'queries': query_count,
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else None,
+        'max_ms': round(max(latencies), 3) if latencies else None,
+    }
+    for p in PERCENTILES:
+        result[f'p{p}_ms'] = round(percentile(latencies, p), 3) if latencies else None
+    return result
+
+
+def run_benchmark(requests, concurrency, routes=None, stdout=None):
+    ctx = BenchContext()
+    try:
+        return benchmark_routes(ctx, requests, concurrency, routes, stdout)
+    finally:
+        ctx.close()
+
+
+def benchmark_routes(ctx, requests, concurrency, routes=None, stdout=None):
+    scenarios = build_scenarios(ctx)
+    results = {}
+    for name in route_names():
+        if routes and name not in routes:
+            continue
+        scenario = scenarios.get(name)
+        if scenario is None:
+            results[name] = {'skipped': True}
+            continue
+        results[name] = run_scenario(ctx, scenario, requests, concurrency)
+        if stdout:
+            r = results[name]
+            stdout.write(
+                f"{name:24} p50={r['p50_ms']}ms p95={r['p95_ms']}ms p99={r['p99_ms']}ms "
+                f"{r['throughput_rps']} req/s queries={r['queries']} errors={r['errors']}"
+            )
+    return results
+
+
+def run_overload(requests, concurrency, flood_route, flood_concurrency, protected_routes, stdout=None):
+    # Og'ir yo'nalish parallel oqimlar bilan to'xtovsiz yuklanadi; himoyalangan yo'nalishlar avval alohida,
+    # keyin shu yuklama ostida o'lchanadi (app.load ularning p99 ini ushlab turishi kerak)
+    ctx = BenchContext()
+    try:
+        return overload_routes(ctx, requests, concurrency, flood_route, flood_concurrency, protected_routes, stdout)
+    finally:
+        ctx.close()
+
+
+def overload_routes(ctx, requests, concurrency, flood_route, flood_concurrency, protected_routes, stdout=None):
+    scenarios = build_scenarios(ctx)
+    missing = [name for name in [flood_route, *protected_routes] if name not in scenarios]
+    if missing:
+        raise ValueError(f"Ssenariy topilmadi: {', '.join(missing)}")
+    base = scenarios[flood_route]
+
+    def flood_payload(i):
+        payload = base.payload(i) if base.payload else None
+        if base.method != 'get':
+            return payload
+        # Sahifa keshi yuklamani yutib yubormasligi uchun har bir GET alohida URL
+        return {**(payload or {}), 'bench': ctx.unique(i)}
+
+    flood = Scenario(base.method, base.path, flood_payload, prepare=base.prepare, auth=base.auth)
+    if flood.prepare:
+        flood.prepare(requests * flood_concurrency + 1)
+
+    baseline = {name: run_scenario(ctx, scenarios[name], requests, concurrency) for name in protected_routes}
+
+    stop = threading.Event()
+    statuses = Counter()
+    indexes = count()
+    lock = threading.Lock()
+
+    def flooder():
+        client = make_client(ctx, flood)
+        try:
+            while not stop.is_set():
+                with lock:
+                    i = next(indexes)
+                status_code = send(client, flood, i)
+                with lock:
+                    statuses[status_code] += 1
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=flooder) for _ in range(flood_concurrency)]
+    for thread in threads:
+        thread.start()
+    try:
+        loaded = {name: run_scenario(ctx, scenarios[name], requests, concurrency) for name in protected_routes}
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    result = {
+        'flood': {
+            'route': flood_route,
+            'concurrency': flood_concurrency,
+            'requests': sum(statuses.values()),
+            'shed': statuses[429] + statuses[503],
+            'statuses': {str(code): n for code, n in sorted(statuses.items())},
+        },
+        'routes': {},
+    }
+    for name in protected_routes:
+        result['routes'][name] = {
+            'baseline_p99_ms': baseline[name]['p99_ms'],
+            'overload_p99_ms': loaded[name]['p99_ms'],
+            'overload_errors': loaded[name]['errors'],
+        }
+        if stdout:
+            r = result['routes'][name]
+            stdout.write(
+                f"{name:24} p99: {r['baseline_p99_ms']}ms -> {r['overload_p99_ms']}ms "
+                f"(yuklama ostida) errors={r['overload_errors']}"
+            )
+    if stdout:
+        f = result['flood']
+        stdout.write(f"{flood_route} yuklamasi: {f['requests']} so'rov, {f['shed']} tasi rad etildi {f['statuses']}")
+    return result
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, base in baseline.get('routes', {}).items():
+        current = results.get(name)
+        if not current or current.get('skipped') or base.get('skipped'):
+            continue
+        if base.get('p95_ms') is not None and current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms > {base['p95_ms']}ms (+{tolerance:.0%})")
+        if current['queries'] > base['queries']:
+            regressions.append(f"{name}: queries {current['queries']} > {base['queries']}")
+    return regressions
@@ -0,0 +1,119 @@
+import hashlib
+import math
+import random
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_response_headers
+from rest_framework.response import Response
+
+from . import metrics
+
+
+def view_cache_key(request, prefix):
+    digest = hashlib.blake2b(request.get_full_path().encode(), digest_size=16).hexdigest()
+    return f"view:{prefix}:{digest}"
+
+
+def should_refresh(expires_at, delta, now):
+    # XFetch: muddat yaqinlashgan sari (va hisoblash qimmat bo'lsa) oldinroq yangilash ehtimoli oshadi
+    return now - delta * settings.VIEW_CACHE_EARLY_REFRESH_BETA * math.log(1.0 - random.random()) >= expires_at
+
+
+# cache_page o'rniga: muddat tugaganda kalit bo'yicha faqat bitta so'rov qayta hisoblaydi,
+# qolganlari shu paytda eski qiymatni oladi. Lease umumiy keshdagi cache.add: jarayonlar orasidagi kafolat faqat
+# add atomar bo'lgan backendlarda (Redis, Memcached, DatabaseCache). FileBasedCache da add = has_key + set,
+# shuning uchun u yerda ikki jarayon bir vaqtda hisoblashi mumkin (jarayon ichida LocMemCache atomar)
+def cached_view(timeout):
+    def decorator(view):
+        prefix = f"{view.__module__}.{view.__name__}"
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = view_cache_key(request, prefix)
+            lease_key = f"{key}:lease"
+            entry = cache.get(key)
+            now = time.time()
+
+            if entry is not None:
+                data, status_code, expires_at, delta = entry
+                if not should_refresh(expires_at, delta, now):
+                    metrics.incr('view_cache.hits')
+                    return cached_response(data, status_code, expires_at - now)
+                token = acquire_lease(lease_key)
+                # Kalitni boshqa jarayon yangilayapti: u tugaguncha eski qiymat beriladi
+                if token is None:
+                    metrics.incr('view_cache.stale')
+                    return cached_response(data, status_code, 0)
+            else:
+                token = acquire_lease(lease_key)
+                if token is None:
+                    # Eski qiymat ham yo'q: lease egasi natijani yozguncha kutiladi
+                    waited, token = wait_for_entry(key, lease_key)
+                    if waited is not None:
+                        data, status_code, expires_at, _ = waited
+                        metrics.incr('view_cache.waited')
+                        return cached_response(data, status_code, expires_at - time.time())
+
+            try:
+                if token is not None:
+                    # Lease olinguncha oldingi egasi natijani yozib ulgurgan bo'lsa, qayta hisoblanmaydi
+                    fresh = cache.get(key)
+                    if fresh is not None and (entry is None or fresh[2] != entry[2]):
+                        data, status_code, expires_at, _ = fresh
+                        metrics.incr('view_cache.hits')
+                        return cached_response(data, status_code, expires_at - time.time())
+
+                metrics.incr('view_cache.misses')
+                started = time.monotonic()
+                response = view(request, *args, **kwargs)
+                delta = time.monotonic() - started
+                if isinstance(response, Response) and response.status_code == 200:
+                    # Eski qiymat yangilash davomida berilishi uchun kesh yozuvi timeout dan uzoqroq yashaydi
+                    cache.set(
+                        key, (response.data, response.status_code, time.time() + timeout, delta),
+                        timeout + settings.VIEW_CACHE_STALE_TTL,
+                    )
+                    patch_response_headers(response, timeout)
+                return response
+            finally:
+                # Kutish muddati tugab, lease siz hisoblangan bo'lsa - boshqa so'rovning lease iga tegilmaydi
+                if token is not None:
+                    release_lease(lease_key, token)
+        return wrapper
+    return decorator
+
+
+def acquire_lease(lease_key):
+    token = uuid.uuid4().hex
+    return token if cache.add(lease_key, token, settings.VIEW_CACHE_LEASE_TIMEOUT) else None
+
+
+def release_lease(lease_key, token):
+    # Lease muddati o'tib, boshqa so'rovga o'tgan bo'lishi mumkin: faqat o'zimizniki o'chiriladi
+    if cache.get(lease_key) == token:
+        cache.delete(lease_key)
+
+
+def wait_for_entry(key, lease_key):
+    # (yozuv, None) yoki (None, lease tokeni) - yoki muddat tugasa (None, None): lease siz hisoblanadi
+    deadline = time.monotonic() + settings.VIEW_CACHE_LEASE_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(settings.VIEW_CACHE_WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry, None
+        # Lease egasi xatolik bilan tugadi (yoki muddati o'tdi): endi shu so'rov hisoblaydi
+        token = acquire_lease(lease_key)
+        if token is not None:
+            return None, token
+    return None, None
+
+
+def cached_response(data, status_code, max_age):
+    response = Response(data, status=status_code)
+    patch_response_headers(response, max(int(max_age), 0))
+    return response
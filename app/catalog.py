@@ -0,0 +1,147 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Avg, Count, OuterRef, Subquery
+
+from .models import Book, Review
+
+
+# Import va eksport uchun umumiy ustunlar tartibi
+CATALOG_FIELDS = [
+    'isbn', 'title',
+    'author_first_name', 'author_last_name',
+    'publisher', 'genres',
+    'published_date', 'pages', 'description',
+]
+
+EXPORT_FIELDS = ['id', *CATALOG_FIELDS, 'rating_avg', 'review_count', 'updated_at']
+
+GENRE_SEPARATOR = '|'
+
+FORMATS = ('csv', 'ndjson')
+
+EXPORT_FORMATS = ('csv', 'ndjson', 'columnar')
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'columnar': 'application/x-ndjson',
+}
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    lowered = str(path).lower()
+    if lowered.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return 'csv'
+
+
+def read_rows(fileobj, fmt):
+    # Fayl butunlay xotiraga yuklanmaydi: har bir qator alohida o'qiladi
+    if fmt == 'csv':
+        yield from csv.DictReader(fileobj)
+        return
+    for line in fileobj:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def split_genres(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(GENRE_SEPARATOR)
+    return [name.strip() for name in value if name and name.strip()]
+
+
+def export_queryset(since=None):
+    # Reyting agregatlari korrelyatsiyalangan subquery orqali olinadi:
+    # GROUP BY butun jadvalni kutmaydi, qatorlar darhol oqib boshlaydi
+    reviews = Review.objects.filter(book=OuterRef('pk')).order_by().values('book')
+    queryset = (
+        Book.alive.select_related('author', 'publisher')
+        .prefetch_related('genres')
+        .annotate(
+            rating_avg=Subquery(reviews.annotate(value=Avg('rating')).values('value')),
+            review_count=Subquery(reviews.annotate(value=Count('pk')).values('value')),
+        )
+    )
+    if since is not None:
+        # Sharh, muallif, nashriyot yoki janr o'zgarganda ham kitobning updated_at i yangilanadi (signals.touch_books).
+        # Nashriyot/janr nomi o'zgarishi fon vazifasida yoziladi: u bajarilgach keyingi eksportga tushadi
+        queryset = queryset.filter(updated_at__gt=since)
+    return queryset.order_by('pk')
+
+
+def export_rows(queryset, chunk_size=2000):
+    # .iterator() PostgreSQL da server-side (named) cursor ishlatadi
+    for book in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'id': book.pk,
+            'isbn': book.isbn,
+            'title': book.title,
+            'author_first_name': book.author.first_name,
+            'author_last_name': book.author.last_name,
+            'publisher': book.publisher.name if book.publisher else None,
+            'genres': [genre.name for genre in book.genres.all()],
+            'published_date': book.published_date,
+            'pages': book.pages,
+            'description': book.description,
+            'rating_avg': round(float(book.rating_avg), 2) if book.rating_avg is not None else None,
+            'review_count': book.review_count or 0,
+            'updated_at': book.updated_at,
+        }
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def encode_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        row['genres'] = GENRE_SEPARATOR.join(row['genres'])
+        yield writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else ('' if value is None else value)
+            for value in (row[field] for field in EXPORT_FIELDS)
+        ])
+
+
+def encode_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def encode_columnar(rows, group_size=10000):
+    # Parquet'ga o'xshash: har bir satr - ustunlar bo'yicha guruhlangan qatorlar bloki
+    yield json.dumps({'fields': EXPORT_FIELDS}) + "\n"
+    for group in chunked(rows, group_size):
+        columns = {field: [row[field] for row in group] for field in EXPORT_FIELDS}
+        yield json.dumps({'count': len(group), 'columns': columns}, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'ndjson': encode_ndjson,
+    'columnar': encode_columnar,
+}
+
+
+def export_catalog(fmt, since=None, chunk_size=2000):
+    return ENCODERS[fmt](export_rows(export_queryset(since), chunk_size=chunk_size))
@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from .models import Author, Book, ChangeLog, ChangeLogCompaction, Genre, Publisher, Review
+
+
+FEED_MODELS = {'author': Author, 'book': Book, 'genre': Genre, 'publisher': Publisher, 'review': Review}
+MODEL_NAMES = {model: name for name, model in FEED_MODELS.items()}
+
+
+def record(instance, action):
+    ChangeLog.objects.create(model_name=MODEL_NAMES[type(instance)], object_id=instance.pk, action=action)
+
+
+def record_many(model, ids, action=ChangeLog.UPSERT):
+    name = MODEL_NAMES[model]
+    ChangeLog.objects.bulk_create(
+        [ChangeLog(model_name=name, object_id=pk, action=action) for pk in ids], batch_size=1000,
+    )
+
+
+def record_many_after_commit(model, ids, action=ChangeLog.UPSERT):
+    # Uzoq tranzaksiyalar (import bo'lagi) uchun: yozuvlar commit dan keyin alohida qisqa tranzaksiyada qo'shiladi.
+    # Aks holda ular CHANGES_SETTLE_SECONDS dan kech commit bo'lib, kursori o'tib ketgan mijozlar ularni ko'rmaydi.
+    # Jarayon aynan commit dan keyin to'xtasa, yozuvlar yo'qoladi: bunday holatda mijozlar to'liq sinxronlanadi
+    ids = list(ids)
+    transaction.on_commit(lambda: record_many(model, ids, action))
+
+
+def record_table(model, after_pk=0, action=ChangeLog.UPSERT, batch_size=10000):
+    # Signal yubormaydigan ommaviy yozishlar (COPY, seed) uchun INSERT ... SELECT. Har bir id oralig'i alohida
+    # qisqa tranzaksiyada: bitta ulkan INSERT CHANGES_SETTLE_SECONDS dan uzoq davom etib, o'qiluvchilardan o'tib ketardi
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT max(id) FROM {table}")
+        max_id = cursor.fetchone()[0] or 0
+    for start in range(after_pk, max_id, batch_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {quote(ChangeLog._meta.db_table)} (model_name, object_id, action, created_at) "
+                f"SELECT %s, id, %s, %s FROM {table} WHERE id > %s AND id <= %s ORDER BY id",
+                [MODEL_NAMES[model], action, timezone.now(), start, start + batch_size],
+            )
+
+
+def horizon():
+    latest = ChangeLogCompaction.objects.first()
+    return latest.horizon if latest else 0
+
+
+def expire_cursors():
+    # ChangeLog ga yozilmagan ommaviy o'chirishlar (bo'lak DROP) uchun: hozirgi barcha kursorlar 410 oladi va
+    # to'liq sinxronlanadi. O'chirilgan har bir qator uchun "delete" yozuvi qo'shishdan arzon
+    new_horizon = max((ChangeLog.objects.aggregate(value=Max('pk'))['value'] or 0) + 1, horizon())
+    ChangeLogCompaction.objects.create(horizon=new_horizon)
+    return new_horizon
+
+
+def latest_cursor():
+    # Hali commit bo'lmagan tranzaksiyalar yozuvlari keyinroq shu kursordan oldin paydo bo'lmasligi uchun
+    settled = timezone.now() - timedelta(seconds=settings.CHANGES_SETTLE_SECONDS)
+    return ChangeLog.objects.filter(created_at__lte=settled).aggregate(value=Max('pk'))['value'] or 0
+
+
+def read(since, limit):
+    entries = list(ChangeLog.objects.filter(pk__gt=since).order_by('pk')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # Hali commit bo'lmagan tranzaksiyalar kichikroq id bilan keyinroq paydo bo'lishi mumkin:
+    # juda yangi yozuvlar sahifaga kiritilmaydi, mijoz ularni keyingi so'rovda oladi. Kafolat faqat ChangeLog
+    # ga yozib, CHANGES_SETTLE_SECONDS ichida commit qiladigan tranzaksiyalar uchun: uzoq yozuvchilar
+    # record_many_after_commit / record_table (qisqa tranzaksiyalar) dan foydalanadi
+    settled = timezone.now() - timedelta(seconds=settings.CHANGES_SETTLE_SECONDS)
+    for i, entry in enumerate(entries):
+        if entry.created_at > settled:
+            entries, has_more = entries[:i], False
+            break
+
+    # Sahifa ichida bir obyekt bir necha marta o'zgargan bo'lsa, faqat oxirgi holati yuboriladi
+    latest = {(entry.model_name, entry.object_id): entry for entry in entries}
+    next_cursor = entries[-1].pk if entries else since
+    return sorted(latest.values(), key=lambda entry: entry.pk), next_cursor, has_more
+
+
+def compact(retention_days, batch_size=10000):
+    removed = 0
+    max_id = ChangeLog.objects.aggregate(value=Max('pk'))['value'] or 0
+    newer = ChangeLog.objects.filter(
+        model_name=OuterRef('model_name'), object_id=OuterRef('object_id'), pk__gt=OuterRef('pk'),
+    )
+    # Har bir obyekt uchun faqat eng so'nggi yozuv qoladi: istalgan kursor uchun natija o'zgarmaydi
+    for start in range(0, max_id, batch_size):
+        with transaction.atomic():
+            count, _ = ChangeLog.objects.filter(pk__gt=start, pk__lte=start + batch_size).filter(Exists(newer)).delete()
+        removed += count
+
+    # Eski "delete" yozuvlari o'chiriladi; undan oldingi kursorlar 410 oladi
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    expired = ChangeLog.objects.filter(action=ChangeLog.DELETE, created_at__lt=cutoff)
+    new_horizon = max(expired.aggregate(value=Max('pk'))['value'] or 0, horizon())
+    count, _ = expired.filter(pk__lte=new_horizon).delete()
+    removed += count
+
+    ChangeLogCompaction.objects.create(horizon=new_horizon, removed=removed)
+    return removed, new_horizon
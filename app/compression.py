@@ -0,0 +1,190 @@
+import hashlib
+import zlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import get_max_age, patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Bir xil q qiymatida server afzalligi: zstd > br > gzip (kutubxona o'rnatilgan bo'lsa)
+ENCODINGS = [
+    encoding for encoding, available in (('zstd', zstandard), ('br', brotli), ('gzip', zlib)) if available
+]
+
+
+def negotiate(accept_encoding, encodings=None):
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+
+    best = None
+    for encoding in encodings or ENCODINGS:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > 0 and (best is None or q > best[0]):
+            best = (q, encoding)
+    return best[1] if best else None
+
+
+def compression_level(request, encoding):
+    match = getattr(request, 'resolver_match', None)
+    route = settings.COMPRESSION_ROUTE_LEVELS.get(match.url_name if match else None, {})
+    return route.get(encoding, settings.COMPRESSION_LEVELS[encoding])
+
+
+def compress(encoding, data, level):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return zlib.compress(data, level, wbits=31)
+
+
+class StreamCompressor:
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == 'zstd':
+            self.obj = zstandard.ZstdCompressor(level=level).compressobj()
+        elif encoding == 'br':
+            self.obj = brotli.Compressor(quality=level)
+        else:
+            self.obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.obj.process(data) if self.encoding == 'br' else self.obj.compress(data)
+
+    def flush(self):
+        # Shu paytgacha yozilganlarni mijoz darhol ochishi mumkin bo'lgan blok sifatida chiqaradi
+        if self.encoding == 'zstd':
+            return self.obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if self.encoding == 'br':
+            return self.obj.flush()
+        return self.obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.obj.finish() if self.encoding == 'br' else self.obj.flush()
+
+
+def compress_stream(content, encoding, level):
+    # Qatorma-qator (NDJSON) oqimlar bufer to'lganda siqiladi: har bir qatorni alohida flush qilish nisbatni buzadi
+    compressor = StreamCompressor(encoding, level)
+    buffered = 0
+    for chunk in content:
+        data = compressor.compress(chunk)
+        buffered += len(chunk)
+        if buffered >= settings.COMPRESSION_STREAM_BUFFER:
+            data += compressor.flush()
+            buffered = 0
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def compress_stream_async(content, encoding, level):
+    compressor = StreamCompressor(encoding, level)
+    buffered = 0
+    async for chunk in content:
+        data = compressor.compress(chunk)
+        buffered += len(chunk)
+        if buffered >= settings.COMPRESSION_STREAM_BUFFER:
+            data += compressor.flush()
+            buffered = 0
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def variant_timeout(request, response):
+    # Siqilgan variant faqat o'zi ham keshlanadigan javob (GET, max-age > 0) yonida saqlanadi. Yozishlar,
+    # tokenlar, private/no-store va cookie li javoblar keshni siqib chiqarmasin va diskka yozilmasin
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200 or response.cookies:
+        return 0
+    cache_control = response.get('Cache-Control', '').lower()
+    if 'private' in cache_control or 'no-store' in cache_control:
+        return 0
+    return min(get_max_age(response) or 0, settings.COMPRESSION_CACHE_TIMEOUT)
+
+
+def cached_compress(encoding, content, level, timeout):
+    # Siqilgan variant tana xeshi bo'yicha saqlanadi: keshdan qaytgan bir xil javob qayta siqilmaydi
+    key = f"compressed:{encoding}:{level}:{hashlib.blake2b(content, digest_size=16).hexdigest()}"
+    compressed = cache.get(key)
+    if compressed is not None:
+        metrics.incr('compression.cache_hits')
+        return compressed
+    metrics.incr('compression.cache_misses')
+    compressed = compress(encoding, content, level)
+    cache.set(key, compressed, timeout)
+    return compressed
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_LENGTH:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        encoding = negotiate(accept_encoding)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            level = compression_level(request, encoding)
+            if response.is_async:
+                response.streaming_content = compress_stream_async(response.streaming_content, encoding, level)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding, level)
+            del response.headers['Content-Length']
+        else:
+            if response.get('Content-Type', '').startswith('text/html'):
+                # HTML sahifalar (admin) CSRF tokenli: BREACH'ga qarshi tasodifiy to'ldirishli gzip, keshsiz
+                encoding = negotiate(accept_encoding, ['gzip'])
+                if encoding is None:
+                    return response
+                compressed = compress_string(response.content, max_random_bytes=GZipMiddleware.max_random_bytes)
+            else:
+                level = compression_level(request, encoding)
+                timeout = variant_timeout(request, response)
+                if timeout > 0:
+                    compressed = cached_compress(encoding, response.content, level, timeout)
+                else:
+                    compressed = compress(encoding, response.content, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,86 @@
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+
+from . import changes, jobs, object_cache
+from .models import Author, Book, ChangeLog, Review
+from .signals import schedule_leaderboard_refresh
+
+
+# Model.delete() bog'liq har bir obyektni xotiraga yuklab, har biriga signal yuboradi. Bu yerda esa
+# bog'liq jadvallar bitta DELETE ... WHERE fk IN (...) bilan (katta jadvallar bo'laklab) o'chiriladi
+PURGE_JOB = 'deletion.purge'
+
+
+def dependents(model):
+    # Modelga ishora qiluvchi barcha FK lar (yashirin "+" va M2M through jadvallari ham)
+    for field in model._meta.get_fields(include_hidden=True):
+        if field.auto_created and not field.concrete and (field.one_to_many or field.one_to_one):
+            yield field.related_model, field.field.name, field.on_delete
+
+
+def purge(model, pks, record=True):
+    pks = list(pks)
+    if not pks:
+        return 0
+    removed = 0
+    for related, field_name, on_delete in dependents(model):
+        children = related._base_manager.filter(**{f'{field_name}__in': pks}).order_by()
+        if on_delete is models.SET_NULL:
+            children.update(**{field_name: None})
+            continue
+        if related not in changes.MODEL_NAMES and not any(dependents(related)):
+            removed += children._raw_delete(children.db)
+            continue
+        # Kuzatiladigan (o'zgarishlar lentasi) yoki o'z bolalari bor jadvallar: pk lar bo'yicha bo'laklab
+        while True:
+            batch = list(children.values_list('pk', flat=True)[:settings.DELETE_PURGE_BATCH_SIZE])
+            if not batch:
+                break
+            with transaction.atomic():
+                removed += purge(related, batch)
+
+    if record and model in changes.MODEL_NAMES:
+        changes.record_many(model, pks, ChangeLog.DELETE)
+    rows = model._base_manager.filter(pk__in=pks).order_by()
+    return removed + rows._raw_delete(rows.db)
+
+
+@jobs.register(PURGE_JOB)
+def purge_job(model, pks):
+    model = apps.get_model(model)
+    # Tashqi tranzaksiya yo'q: har bir bo'lak (purge ichida) alohida commit qilinadi, shuning uchun uzun
+    # qulflar va WAL to'planmaydi. Vazifa yarmida to'xtasa, ota qator is_deleted=True bo'lib qoladi va
+    # qayta ishga tushirilganda qolgan qatorlardan davom etadi; tiklangan yoki tozalangan qatorlar tegilmaydi
+    pks = list(model.objects.filter(pk__in=pks, is_deleted=True).values_list('pk', flat=True))
+    return purge(model, pks, record=False) if pks else 0
+
+
+def subtree_size(model, pk, limit):
+    # Faqat "limit" gacha sanaladi: katta obyekt uchun ham so'rov arzon
+    reviews = Review.objects.filter(book__author_id=pk) if model is Author else Review.objects.filter(book_id=pk)
+    return reviews.order_by()[:limit + 1].count()
+
+
+def delete(model, pk):
+    # Kichik obyekt darhol o'chiriladi; sharhlari ko'p bo'lsa - o'chirilgan deb belgilanadi va fonda tozalanadi.
+    # Har ikki holatda ham so'rov vaqti bog'liq qatorlar soniga bog'liq emas
+    book_ids = list(Book.objects.filter(author_id=pk).values_list('pk', flat=True)) if model is Author else [pk]
+    if subtree_size(model, pk, settings.DELETE_INLINE_LIMIT) <= settings.DELETE_INLINE_LIMIT:
+        purge(model, [pk])
+        deferred = False
+    else:
+        Book.objects.filter(pk__in=book_ids).update(is_deleted=True, isbn=None)
+        if model is Author:
+            Author.objects.filter(pk=pk).update(is_deleted=True)
+            changes.record_many(Author, [pk], ChangeLog.DELETE)
+        changes.record_many(Book, book_ids, ChangeLog.DELETE)
+        jobs.enqueue(PURGE_JOB, {'model': model._meta.label, 'pks': [pk]})
+        deferred = True
+
+    # post_delete signallari yuborilmaydi: ularning ishi shu yerda
+    object_cache.invalidate(Book, book_ids)
+    if model is Author:
+        object_cache.invalidate(Author, [pk])
+    schedule_leaderboard_refresh()
+    return deferred
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import changes, jobs, metrics, object_cache
+from .models import Book, Review, ReviewStaging
+from .signals import schedule_leaderboard_refresh, touch_books
+
+
+# Buferlangan rejimda so'rov faqat ReviewStaging ga bitta INSERT qiladi (kitob qatoriga FK qulfi yo'q),
+# sharhlar esa fon vazifasida partiyalab yoziladi: tezlik commit soniga emas, partiya hajmiga bog'liq
+FLUSH_JOB = 'reviews.flush_staging'
+FLUSH_SCHEDULED_KEY = 'reviews:flush-scheduled'
+
+
+def is_buffered():
+    return settings.REVIEW_INGEST_MODE == 'buffered'
+
+
+def book_exists(pk):
+    # Issiq kitoblar obyekt keshida bor: ular uchun bazaga so'rov yuborilmaydi.
+    # Bu kitob o'qilishi emas, shuning uchun kesh hit/miss metrikalari yozilmaydi
+    return object_cache.contains(Book, pk) or Book.alive.filter(pk=pk).exists()
+
+
+def submit(validated_data):
+    staged = ReviewStaging.objects.create(**validated_data)
+    metrics.incr('reviews.ingest.staged')
+    schedule_flush(settings.REVIEW_INGEST_FLUSH_INTERVAL)
+    return staged
+
+
+def schedule_flush(delay=0):
+    # leaderboards.schedule_refresh kabi: navbatda bitta vazifa, kesh belgisi har bir so'rovdagi INSERT ni olib tashlaydi
+    if delay and not cache.add(FLUSH_SCHEDULED_KEY, 1, timeout=delay):
+        return
+    jobs.enqueue(FLUSH_JOB, delay=delay, dedupe_key=FLUSH_JOB)
+
+
+def flush(batch_size):
+    with transaction.atomic():
+        # skip_locked: bir nechta worker bir vaqtda turli partiyalarni ko'chira oladi
+        staged = list(ReviewStaging.objects.select_for_update(skip_locked=True).order_by('pk')[:batch_size])
+        if not staged:
+            return 0, 0
+        # Bufer paytida o'chirilgan kitoblarning sharhlari tashlab yuboriladi
+        live = set(Book.alive.filter(pk__in={row.book_id for row in staged}).values_list('pk', flat=True))
+        reviews = Review.objects.bulk_create([
+            Review(book_id=row.book_id, reviewer_name=row.reviewer_name, rating=row.rating, comment=row.comment)
+            for row in staged if row.book_id in live
+        ])
+        done = ReviewStaging.objects.filter(pk__in=[row.pk for row in staged]).order_by()
+        done._raw_delete(done.db)
+        # post_save yuborilmaydi: lenta bitta INSERT bilan, kitoblarning updated_at i bitta UPDATE bilan,
+        # leaderboard esa partiyaga bir marta rejalashtiriladi
+        changes.record_many(Review, [review.pk for review in reviews])
+        touch_books(Book.objects.filter(pk__in={review.book_id for review in reviews}))
+
+    metrics.observe('reviews.ingest.lag', (timezone.now() - staged[0].created_at).total_seconds())
+    metrics.observe('reviews.ingest.batch_size', len(staged))
+    metrics.incr('reviews.ingest.flushed', len(reviews))
+    metrics.incr('reviews.ingest.dropped', len(staged) - len(reviews))
+    if reviews:
+        schedule_leaderboard_refresh()
+    return len(reviews), len(staged) - len(reviews)
+
+
+@jobs.periodic
+def reschedule_flush():
+    # Flush vazifasi max_attempts dan keyin "failed" bo'lib qoladi: bufer bo'sh bo'lmasa, yangi submit kutilmaydi
+    if ReviewStaging.objects.exists():
+        jobs.enqueue(FLUSH_JOB, dedupe_key=FLUSH_JOB)
+
+
+@jobs.register(FLUSH_JOB)
+def flush_job():
+    # To'liq partiya qaytsa, bufer hali bo'shamagan
+    while sum(flush(settings.REVIEW_INGEST_BATCH_SIZE)) == settings.REVIEW_INGEST_BATCH_SIZE:
+        pass
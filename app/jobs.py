@@ -0,0 +1,182 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+_periodic = []
+_local_worker = None
+_local_worker_lock = threading.Lock()
+
+
+def register(name):
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def periodic(func):
+    # Worker har JOBS_LOCK_TIMEOUT / 2 da (qotgan vazifalar tekshiruvi bilan birga) chaqiradi:
+    # navbatdan tashqarida qolib ketgan ishni qayta rejalashtirish uchun
+    _periodic.append(func)
+    return func
+
+
+def enqueue(name, payload=None, delay=0, dedupe_key=None, max_attempts=None):
+    # Chaqiruvchining tranzaksiyasida bitta INSERT: yozuv bekor qilinsa, vazifa ham yo'qoladi
+    job = Job(
+        name=name,
+        payload=payload or {},
+        dedupe_key=dedupe_key,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    Job.objects.bulk_create([job], ignore_conflicts=dedupe_key is not None)
+    metrics.incr('jobs.enqueued')
+    if settings.JOBS_LOCAL_WORKER:
+        transaction.on_commit(start_local_worker)
+
+
+def backoff(attempts):
+    delay = min(settings.JOBS_BACKOFF_BASE * 2 ** (attempts - 1), settings.JOBS_BACKOFF_MAX)
+    return delay + random.uniform(0, settings.JOBS_BACKOFF_BASE)
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def claim(worker, limit=1):
+    now = timezone.now()
+    with transaction.atomic():
+        # SKIP LOCKED: parallel workerlar bir-birini kutmaydi va bir vazifani ikki marta olmaydi
+        candidates = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_at__lte=now)
+            .order_by('run_at', 'pk')[:limit]
+        )
+        claimed = []
+        for job in candidates:
+            # SKIP LOCKED yo'q bazalarda (SQLite) shartli UPDATE ikkinchi workerni to'xtatadi
+            updated = Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, locked_at=now, locked_by=worker, attempts=job.attempts + 1,
+            )
+            if updated:
+                job.status, job.locked_at, job.locked_by, job.attempts = Job.RUNNING, now, worker, job.attempts + 1
+                claimed.append(job)
+    return claimed
+
+
+def requeue(job, **fields):
+    # Shu kalitli yangi vazifa navbatda bo'lsa, u ishni bajaradi: eskisi o'chiriladi
+    try:
+        with transaction.atomic():
+            Job.objects.filter(pk=job.pk).update(status=Job.QUEUED, locked_at=None, locked_by='', **fields)
+    except IntegrityError:
+        Job.objects.filter(pk=job.pk).delete()
+
+
+def requeue_stale():
+    cutoff = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    stale = list(Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff))
+    for job in stale:
+        logger.warning("Vazifa %s (%s) qotib qolgan, navbatga qaytarildi", job.pk, job.name)
+        requeue(job)
+    return len(stale)
+
+
+def maintain():
+    requeue_stale()
+    for func in _periodic:
+        try:
+            func()
+        except Exception:
+            logger.exception("Davriy tekshiruv %s xatolik bilan tugadi", func.__name__)
+
+
+def run(job):
+    handler = _registry.get(job.name)
+    started = time.monotonic()
+    metrics.observe('jobs.lag', (timezone.now() - job.run_at).total_seconds())
+    try:
+        if handler is None:
+            raise LookupError(f"Ro'yxatdan o'tmagan vazifa: {job.name}")
+        handler(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(status=Job.FAILED, last_error=error)
+            metrics.incr('jobs.failed')
+            logger.error("Vazifa %s (%s) %s urinishdan keyin muvaffaqiyatsiz", job.pk, job.name, job.attempts)
+        else:
+            requeue(job, last_error=error, run_at=timezone.now() + timedelta(seconds=backoff(job.attempts)))
+            metrics.incr('jobs.retried')
+        return False
+    # Bajarilgan vazifalar saqlanmaydi: navbat jadvali faqat kutayotgan ishlar hajmida qoladi
+    Job.objects.filter(pk=job.pk).delete()
+    metrics.incr('jobs.succeeded')
+    metrics.observe(f'jobs.duration.{job.name}', time.monotonic() - started)
+    return True
+
+
+def run_pending(limit=None):
+    # Muddati yetgan vazifalarni shu oqimda tugatadi (testlar va run_worker --once uchun)
+    worker = worker_id()
+    done = 0
+    while limit is None or done < limit:
+        jobs = claim(worker)
+        if not jobs:
+            break
+        for job in jobs:
+            run(job)
+            done += 1
+    return done
+
+
+def work(stop, poll_interval, batch_size=1):
+    worker = worker_id()
+    last_stale_check = 0
+    try:
+        while not stop.is_set():
+            if time.monotonic() - last_stale_check > settings.JOBS_LOCK_TIMEOUT / 2:
+                maintain()
+                last_stale_check = time.monotonic()
+            try:
+                jobs = claim(worker, batch_size)
+            except Exception:
+                logger.exception("Vazifa olishda xatolik")
+                connection.close()
+                jobs = []
+            for job in jobs:
+                run(job)
+            if not jobs:
+                stop.wait(poll_interval)
+    finally:
+        connection.close()
+
+
+def start_local_worker():
+    # Alohida run_worker jarayoni bo'lmasa (lokal ishlab chiqish), navbat shu jarayondagi oqimda bajariladi
+    global _local_worker
+    with _local_worker_lock:
+        if _local_worker is not None and _local_worker.is_alive():
+            return
+        _local_worker = threading.Thread(
+            target=work, args=(threading.Event(), settings.JOBS_POLL_INTERVAL), daemon=True, name='jobs-local-worker',
+        )
+        _local_worker.start()
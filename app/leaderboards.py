@@ -0,0 +1,134 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+from . import changes, jobs
+from .models import (
+    Book, ChangeLog, Genre, GenreTopBook, LeaderboardState, MostReviewedBook, Publisher, PublisherRanking, Review,
+)
+
+
+STATE_NAME = 'leaderboards'
+REFRESH_JOB = 'leaderboards.refresh'
+REFRESH_SCHEDULED_KEY = 'leaderboards:refresh-scheduled'
+
+
+def get_state():
+    state, _ = LeaderboardState.objects.get_or_create(name=STATE_NAME)
+    return state
+
+
+def is_stale(state):
+    if state.refreshed_at is None:
+        return True
+    return timezone.now() - state.refreshed_at > timedelta(seconds=settings.LEADERBOARD_MAX_STALENESS)
+
+
+def refresh_genre_top(genre_ids):
+    size = settings.LEADERBOARD_SIZE
+    rows = []
+    for genre_id in genre_ids:
+        books = (
+            Book.alive.filter(genres=genre_id)
+            .annotate(rating_avg=Avg('reviews__rating'), review_count=Count('reviews'))
+            .filter(review_count__gte=settings.LEADERBOARD_MIN_REVIEWS)
+            .order_by('-rating_avg', '-review_count', 'pk')
+            .values_list('pk', 'rating_avg', 'review_count')[:size]
+        )
+        rows.extend(
+            GenreTopBook(genre_id=genre_id, book_id=book_id, rank=rank, rating_avg=avg, review_count=n)
+            for rank, (book_id, avg, n) in enumerate(books, start=1)
+        )
+    GenreTopBook.objects.filter(genre_id__in=genre_ids).delete()
+    GenreTopBook.objects.bulk_create(rows)
+
+
+def refresh_most_reviewed(now):
+    window_start = now - timedelta(days=settings.LEADERBOARD_WINDOW_DAYS)
+    top = (
+        Review.objects.filter(created_at__gte=window_start, book__is_deleted=False)
+        .values('book')
+        .annotate(review_count=Count('pk'))
+        .order_by('-review_count', 'book')[:settings.LEADERBOARD_SIZE]
+    )
+    MostReviewedBook.objects.all().delete()
+    MostReviewedBook.objects.bulk_create([
+        MostReviewedBook(book_id=row['book'], rank=rank, review_count=row['review_count'], window_start=window_start)
+        for rank, row in enumerate(top, start=1)
+    ])
+
+
+def refresh_publishers():
+    top = (
+        Publisher.objects.annotate(book_count=Count('book', filter=Q(book__is_deleted=False)))
+        .filter(book_count__gt=0)
+        .order_by('-book_count', 'pk')
+        .values_list('pk', 'book_count')[:settings.LEADERBOARD_SIZE]
+    )
+    PublisherRanking.objects.all().delete()
+    PublisherRanking.objects.bulk_create([
+        PublisherRanking(publisher_id=publisher_id, rank=rank, book_count=n)
+        for rank, (publisher_id, n) in enumerate(top, start=1)
+    ])
+
+
+def changed_genre_ids(after, upto):
+    # O'zgarishlar jurnali bo'yicha: yangi/tahrirlangan sharhlar kitoblarining janrlari, o'zgargan kitoblarning
+    # hozirgi va (GenreTopBook dagi) oldingi janrlari. O'chirishlarni bu yo'l bilan kuzatib bo'lmaydi: None
+    entries = ChangeLog.objects.filter(pk__gt=after, pk__lte=upto, model_name__in=['book', 'review'])
+    if entries.filter(action=ChangeLog.DELETE).exists():
+        return None
+    review_ids = entries.filter(model_name='review').values('object_id')
+    book_ids = entries.filter(model_name='book').values('object_id')
+    genre_ids = set(Genre.objects.filter(books__reviews__pk__in=review_ids).values_list('pk', flat=True))
+    genre_ids.update(Genre.objects.filter(books__pk__in=book_ids).values_list('pk', flat=True))
+    genre_ids.update(GenreTopBook.objects.filter(book_id__in=book_ids).values_list('genre_id', flat=True))
+    return sorted(genre_ids)
+
+
+def refresh(full=False):
+    now = timezone.now()
+    with transaction.atomic():
+        state = LeaderboardState.objects.select_for_update().get_or_create(name=STATE_NAME)[0]
+        watermark = max(changes.latest_cursor(), state.change_watermark)
+
+        # Inkremental rejim: faqat oxirgi yangilanishdan keyin o'zgargan janrlar qayta hisoblanadi.
+        # O'chirishlar bo'lsa yoki jurnal siqilib, kerakli yozuvlar yo'qolgan bo'lishi mumkin bo'lsa - to'liq
+        genre_ids = None
+        if not full and state.refreshed_at is not None and changes.horizon() <= state.change_watermark:
+            genre_ids = changed_genre_ids(state.change_watermark, watermark)
+        if genre_ids is None:
+            genre_ids = list(Genre.objects.values_list('pk', flat=True))
+
+        refresh_genre_top(genre_ids)
+        refresh_most_reviewed(now)
+        refresh_publishers()
+
+        state.refreshed_at = now
+        state.change_watermark = watermark
+        state.save(update_fields=['refreshed_at', 'change_watermark'])
+    return len(genre_ids)
+
+
+@jobs.register(REFRESH_JOB)
+def refresh_job():
+    refresh()
+
+
+def schedule_refresh(delay=0):
+    # dedupe_key: yozuvlar oqimi qanchalik katta bo'lmasin, navbatda bitta yangilash turadi;
+    # kechiktirilgan rejalashtirishda kesh belgisi har bir yozuvdagi ortiqcha INSERT ni ham olib tashlaydi
+    if delay and not cache.add(REFRESH_SCHEDULED_KEY, 1, timeout=delay):
+        return
+    jobs.enqueue(REFRESH_JOB, delay=delay, dedupe_key=REFRESH_JOB)
+
+
+def ensure_fresh(state):
+    # O'qish so'rovi kutmaydi: eskirgan bo'lsa, yangilash fon vazifasi sifatida navbatga qo'yiladi
+    if not settings.LEADERBOARD_AUTO_REFRESH or not is_stale(state):
+        return
+    schedule_refresh()
@@ -0,0 +1,211 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import JsonResponse
+
+from . import metrics
+
+
+# Yuklamani boshqarish: har bir so'rov sinfi (auth, detail, write, list, export) uchun bir vaqtda ishlovchi
+# so'rovlar va navbat chegarasi, umumiy sig'imdan esa past ustuvorlikdagi sinflarga kichikroq ulush beriladi.
+# Navbat to'la yoki umumiy sig'im tugagan bo'lsa so'rov darhol 429/503 + Retry-After oladi; navbatga tushgan
+# so'rov esa joy kutib, queue_timeout gacha o'z oqimini band qiladi (keyin 429).
+# Holat jarayon ichida (metrics kabi): har bir worker jarayoni o'z chegaralarini yuritadi, umumiy chegara
+# jarayonlar soniga ko'payadi. Navbat faqat ko'p oqimli serverda ma'noga ega (gunicorn gthread, runserver):
+# bitta oqimli (sync) worker da so'rovlar hech qachon bir vaqtda kelmaydi va chegaralar ishlamaydi
+STATEMENT_TIMEOUT_SQLSTATE = '57014'
+
+_lock = threading.Lock()
+_limiters = {}
+_inflight = 0
+_generation = 0
+
+
+class Limiter:
+    def __init__(self, concurrency, queue, queue_timeout):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            if self.active < self.concurrency:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue or self.queue_timeout <= 0:
+                return False
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while self.active >= self.concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+
+class Slot:
+    def __init__(self, name, limiter):
+        self.name = name
+        self.limiter = limiter
+        self.generation = _generation
+        self.released = False
+
+    def release(self):
+        global _inflight
+        if self.released:
+            return
+        self.released = True
+        self.limiter.release()
+        with _lock:
+            # reset() dan oldingi joylar hisoblagichlarga tegmaydi
+            if self.generation == _generation:
+                _inflight -= 1
+
+
+def get_limiter(name):
+    with _lock:
+        if name not in _limiters:
+            config = settings.LOAD_CLASSES[name]
+            _limiters[name] = Limiter(config['concurrency'], config['queue'], config['queue_timeout'])
+        return _limiters[name]
+
+
+def reset():
+    global _inflight, _generation
+    with _lock:
+        _limiters.clear()
+        _inflight = 0
+        _generation += 1
+
+
+@receiver(setting_changed)
+def reset_limiters(setting, **kwargs):
+    if setting == 'LOAD_CLASSES':
+        with _lock:
+            _limiters.clear()
+
+
+def route_class(request):
+    match = request.resolver_match
+    name = settings.LOAD_ROUTE_CLASSES.get(match.url_name or match.route) if match else None
+    if name:
+        return name
+    if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        return 'write'
+    return 'detail' if match and match.kwargs else 'list'
+
+
+def acquire(name):
+    # (slot, None) yoki (None, rad etish holati)
+    global _inflight
+    config = settings.LOAD_CLASSES[name]
+    share = settings.LOAD_PRIORITY_SHARES[config['priority']]
+    with _lock:
+        # Umumiy sig'im to'lib borayotganda past ustuvorlikdagi sinflar birinchi bo'lib rad etiladi
+        if _inflight >= settings.LOAD_MAX_INFLIGHT * share:
+            return None, 503
+        _inflight += 1
+        metrics.observe('load.inflight', _inflight)
+
+    limiter = get_limiter(name)
+    started = time.monotonic()
+    if not limiter.acquire():
+        with _lock:
+            _inflight -= 1
+        return None, 429
+    metrics.observe(f'load.queue_wait.{name}', time.monotonic() - started)
+    return Slot(name, limiter), None
+
+
+def set_statement_timeout(milliseconds):
+    # Ulanishdagi qiymat o'zgargandagina: bir sinf so'rovlari ketma-ket kelsa, qo'shimcha so'rov yo'q
+    if connection.vendor != 'postgresql' or getattr(connection, 'load_statement_timeout', None) == milliseconds:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('statement_timeout', %s, false)", [str(milliseconds)])
+    connection.load_statement_timeout = milliseconds
+
+
+@receiver(connection_created)
+def forget_statement_timeout(sender, connection, **kwargs):
+    connection.load_statement_timeout = None
+
+
+def is_statement_timeout(exception):
+    cause = exception.__cause__
+    return STATEMENT_TIMEOUT_SQLSTATE in (getattr(cause, 'sqlstate', None), getattr(cause, 'pgcode', None))
+
+
+def shed_response(status_code, retry_after):
+    message = (
+        "Server band. Birozdan so'ng qayta urinib ko'ring." if status_code == 503
+        else "Bu turdagi so'rovlar juda ko'p. Birozdan so'ng qayta urinib ko'ring."
+    )
+    response = JsonResponse(
+        {"success": False, "message": message}, status=status_code, json_dumps_params={'ensure_ascii': False},
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def release_after(content, slot):
+    # Oqimli javob (eksport) oxirigacha yuborilguncha joy band turadi
+    try:
+        yield from content
+    finally:
+        slot.release()
+
+
+class LoadSheddingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        slot = getattr(request, 'load_slot', None)
+        if slot is not None:
+            if response.streaming:
+                response.streaming_content = release_after(response.streaming_content, slot)
+                # Mijoz oqimni oxirigacha o'qimasa ham: WSGI server javobni yopganda joy bo'shaydi
+                response._resource_closers.append(slot.release)
+            else:
+                slot.release()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.LOAD_SHEDDING_ENABLED:
+            return None
+        name = route_class(request)
+        slot, status_code = acquire(name)
+        if slot is None:
+            metrics.incr(f'load.shed.{name}')
+            metrics.incr(f'load.shed.{status_code}')
+            return shed_response(status_code, settings.LOAD_CLASSES[name]['retry_after'])
+        request.load_slot = slot
+        set_statement_timeout(settings.LOAD_CLASSES[name]['statement_timeout'])
+        return None
+
+    def process_exception(self, request, exception):
+        slot = getattr(request, 'load_slot', None)
+        if slot is None or not is_statement_timeout(exception):
+            return None
+        metrics.incr(f'load.statement_timeouts.{slot.name}')
+        return shed_response(503, settings.LOAD_CLASSES[slot.name]['retry_after'])
@@ -0,0 +1,109 @@
+import json
+import platform
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from app.benchmark import compare, is_disposable_database, run_benchmark, run_overload
+from app.seeding import CatalogSeeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Sintetik katalog yaratib, app/urls.py dagi har bir endpoint uchun parallel yuklama ostida "
+        "kechikish persentillari, o'tkazuvchanlik va SQL so'rovlar sonini o'lchaydi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--books', type=int, default=1000)
+        parser.add_argument('--genres', type=int, default=30)
+        parser.add_argument('--publishers', type=int, default=50)
+        parser.add_argument('--reviews', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--no-seed', action='store_true', help="Mavjud ma'lumotlar ustida o'lchash")
+        parser.add_argument('--requests', type=int, default=100, help="Har bir endpoint uchun so'rovlar soni")
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--route', action='append', dest='routes', help="Faqat shu URL nomi (takrorlash mumkin)")
+        parser.add_argument('--output', help="Natijalarni JSON faylga yozish")
+        parser.add_argument('--baseline', help="Regressiya rejimi: shu JSON natija bilan solishtirish")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="p95 uchun ruxsat etilgan o'sish ulushi")
+        parser.add_argument(
+            '--force', action='store_true',
+            help="DEBUG o'chiq va test bo'lmagan bazada ham ishlatish (yozuvlar qo'shiladi, kesh tozalanadi)",
+        )
+        parser.add_argument(
+            '--overload', action='store_true',
+            help="Yuklama rejimi: --flood-route ni bosib turgan holda himoyalangan yo'nalishlar p99 ini o'lchash",
+        )
+        parser.add_argument('--flood-route', default='review_list_detail')
+        parser.add_argument('--flood-concurrency', type=int, default=16)
+        parser.add_argument(
+            '--protected-route', action='append', dest='protected_routes',
+            help="Himoyalangan yo'nalish (takrorlash mumkin; standart: login_user, book_detail, author_detail)",
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--requests va --concurrency musbat son bo'lishi kerak.")
+        if not options['force'] and not is_disposable_database():
+            raise CommandError(
+                "Benchmark bazaga yozadi va keshni tozalaydi: ishchi bazada ishlatish uchun --force bering."
+            )
+
+        if not options['no_seed']:
+            CatalogSeeder(seed=options['seed']).run(
+                authors=options['authors'], books=options['books'], genres=options['genres'],
+                publishers=options['publishers'], reviews=options['reviews'],
+            )
+
+        # Test klienti 'testserver' hostidan foydalanadi; debug toolbar o'lchovni buzmasligi kerak
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], INTERNAL_IPS=[]):
+            if options['overload']:
+                return self.overload(options)
+            results = run_benchmark(
+                options['requests'], options['concurrency'], routes=options['routes'], stdout=self.stdout,
+            )
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'scale': {key: options[key] for key in ('authors', 'books', 'genres', 'publishers', 'reviews')},
+            },
+            'routes': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Natijalar saqlandi: {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+            regressions = compare(results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError("Regressiya aniqlandi:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Regressiya topilmadi."))
+
+    def overload(self, options):
+        if options['flood_concurrency'] < 1:
+            raise CommandError("--flood-concurrency musbat son bo'lishi kerak.")
+        try:
+            result = run_overload(
+                options['requests'], options['concurrency'], options['flood_route'], options['flood_concurrency'],
+                options['protected_routes'] or ['login_user', 'book_detail', 'author_detail'], stdout=self.stdout,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({'meta': {'created_at': timezone.now().isoformat(), 'database': connection.vendor},
+                           'overload': result}, f, indent=2)
+            self.stdout.write(f"Natijalar saqlandi: {options['output']}")
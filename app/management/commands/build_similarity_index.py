@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import similarity
+
+
+class Command(BaseCommand):
+    help = "O'xshash kitoblar uchun xususiyatlar matritsasini (.npy, mmap) quradi."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help="Faqat oxirgi qurilishdan beri o'zgargan kitoblarni qayta hisoblash (o'zgarishlar jurnali bo'yicha)",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['incremental']:
+            version, changed, restat = similarity.build_incremental()
+            if changed is None:
+                self.stdout.write("Indeks yo'q yoki jurnal yetarli emas: to'liq qurildi.")
+            else:
+                self.stdout.write(f"{changed} ta kitob qayta hisoblandi.")
+                if restat:
+                    self.stdout.write("Sharhlar o'chirilgan: baho ustunlari barcha kitoblar uchun yangilandi.")
+        else:
+            version = similarity.build_full()
+        meta = similarity.load(version).meta
+        self.stdout.write(self.style.SUCCESS(
+            f"Indeks {version}: {meta['books']} ta kitob, {len(meta['genre_ids'])} ta janr, "
+            f"{time.monotonic() - started:.1f} s"
+        ))
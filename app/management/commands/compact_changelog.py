@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app import changes
+
+
+class Command(BaseCommand):
+    help = "O'zgarishlar jurnalidan eskirgan yozuvlarni o'chiradi (har bir obyektning oxirgi holati qoladi)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days', type=int, default=settings.CHANGELOG_RETENTION_DAYS,
+            help="\"delete\" yozuvlari necha kun saqlanadi",
+        )
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        if options['retention_days'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--retention-days manfiy, --batch-size esa 1 dan kichik bo'lmasligi kerak.")
+        removed, horizon = changes.compact(options['retention_days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{removed} ta yozuv o'chirildi, gorizont: {horizon}"))
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from app.catalog import EXPORT_FORMATS, export_catalog
+
+
+class Command(BaseCommand):
+    help = "Kitoblar katalogini muallif, nashriyot, janr va reytinglar bilan oqim tarzida eksport qiladi."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-format', choices=EXPORT_FORMATS, default='ndjson')
+        parser.add_argument('--output', default='-', help="Natija fayli ('-' bo'lsa stdout)")
+        parser.add_argument('--since', help="Faqat shu vaqtdan keyin o'zgargan kitoblar (ISO 8601)")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        since = options['since']
+        if since:
+            since = parse_datetime(since)
+            if since is None:
+                raise CommandError("--since ISO 8601 formatidagi sana-vaqt bo'lishi kerak.")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        started_at = timezone.now()
+        path = options['output']
+        stream = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        try:
+            for part in export_catalog(options['output_format'], since=since, chunk_size=options['chunk_size']):
+                stream.write(part)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        # Keyingi inkremental eksport uchun --since qiymati
+        self.stderr.write(f"Eksport boshlangan vaqt: {started_at.isoformat()}")
@@ -0,0 +1,206 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from app import changes, object_cache, registry
+from app.catalog import FORMATS, chunked, detect_format, read_rows, split_genres
+from app.models import Author, Book, Genre, Publisher
+
+
+# updated_at ham yangilanadi: aks holda qayta import qilingan kitoblar export --since da ko'rinmaydi
+BOOK_UPDATE_FIELDS = ['title', 'author', 'publisher', 'published_date', 'pages', 'description', 'updated_at']
+
+
+class Command(BaseCommand):
+    help = "CSV/NDJSON katalog faylini xotiraga to'liq yuklamasdan, bo'laklab bazaga import qiladi."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fayl yo'li ('-' bo'lsa stdin o'qiladi)")
+        parser.add_argument('--format', choices=FORMATS, help="Fayl formati (standart: kengaytmadan aniqlanadi)")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--on-conflict', choices=['update', 'ignore'], default='update',
+            help="ISBN bo'yicha mavjud kitoblar yangilansinmi yoki o'tkazib yuborilsinmi",
+        )
+        parser.add_argument('--encoding', default='utf-8')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size musbat son bo'lishi kerak.")
+        path = options['path']
+        fmt = detect_format(path, options['format'])
+        self.batch_size = options['batch_size']
+        self.on_conflict = options['on_conflict']
+
+        # Tabiiy kalit -> id lug'atlari faqat bir marta quriladi
+        self.authors = {
+            (first_name, last_name): pk
+            for first_name, last_name, pk in Author.alive.values_list('first_name', 'last_name', 'pk').iterator()
+        }
+        self.publishers = dict(Publisher.objects.values_list('name', 'pk').iterator())
+        self.genres = dict(Genre.objects.values_list('name', 'pk').iterator())
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding=options['encoding'])
+        except OSError as e:
+            raise CommandError(f"Faylni ochib bo'lmadi: {e}")
+
+        imported = skipped = 0
+        started = time.monotonic()
+        try:
+            for chunk in chunked(read_rows(stream, fmt), self.batch_size):
+                rows = [row for row in map(self.parse_row, chunk) if row]
+                skipped += len(chunk) - len(rows)
+                with transaction.atomic():
+                    done, conflicts = self.import_chunk(rows)
+                imported += done
+                skipped += conflicts
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{imported} ta kitob yuklandi, {skipped} ta qator o'tkazib yuborildi "
+                    f"({(imported + skipped) / max(elapsed, 1e-6):.0f} qator/s)"
+                )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Import yakunlandi: {imported} ta kitob, {skipped} ta o'tkazib yuborilgan qator, {elapsed:.1f} s"
+        ))
+
+    def parse_row(self, row):
+        title = (row.get('title') or '').strip()
+        last_name = (row.get('author_last_name') or '').strip()
+        isbn = str(row.get('isbn') or '').strip() or None
+        if not title or not last_name or (isbn and len(isbn) > 13):
+            return None
+
+        pages = row.get('pages')
+        published_date = row.get('published_date') or None
+        try:
+            pages = int(pages) if pages not in (None, '') else None
+            published_date = parse_date(published_date) if published_date else None
+        except (TypeError, ValueError):
+            return None
+        if pages is not None and pages < 0:
+            return None
+
+        return {
+            'isbn': isbn,
+            'title': title[:200],
+            'author': ((row.get('author_first_name') or '').strip()[:100], last_name[:100]),
+            'publisher': (row.get('publisher') or '').strip()[:200] or None,
+            'genres': [name[:100] for name in split_genres(row.get('genres'))],
+            'published_date': published_date,
+            'pages': pages,
+            'description': row.get('description') or None,
+        }
+
+    def import_chunk(self, rows):
+        missing_authors = {row['author'] for row in rows} - self.authors.keys()
+        if missing_authors:
+            created = Author.objects.bulk_create(
+                [Author(first_name=first_name, last_name=last_name) for first_name, last_name in missing_authors]
+            )
+            self.authors.update({(author.first_name, author.last_name): author.pk for author in created})
+            changes.record_many_after_commit(Author, [author.pk for author in created])
+
+        missing_publishers = {row['publisher'] for row in rows if row['publisher']} - self.publishers.keys()
+        if missing_publishers:
+            created = Publisher.objects.bulk_create([Publisher(name=name) for name in missing_publishers])
+            self.publishers.update({publisher.name: publisher.pk for publisher in created})
+            changes.record_many_after_commit(Publisher, [publisher.pk for publisher in created])
+            transaction.on_commit(registry.PUBLISHERS.bump)
+
+        missing_genres = {name for row in rows for name in row['genres']} - self.genres.keys()
+        if missing_genres:
+            Genre.objects.bulk_create([Genre(name=name) for name in missing_genres], ignore_conflicts=True)
+            created = dict(Genre.objects.filter(name__in=missing_genres).values_list('name', 'pk'))
+            self.genres.update(created)
+            changes.record_many_after_commit(Genre, created.values())
+            transaction.on_commit(registry.GENRES.bump)
+
+        # Bitta bo'lak ichida takrorlangan ISBN lardan oxirgisi olinadi
+        by_isbn = {}
+        without_isbn = []
+        for row in rows:
+            book = Book(
+                title=row['title'],
+                author_id=self.authors[row['author']],
+                publisher_id=self.publishers.get(row['publisher']),
+                published_date=row['published_date'],
+                isbn=row['isbn'],
+                pages=row['pages'],
+                description=row['description'],
+            )
+            if row['isbn']:
+                by_isbn[row['isbn']] = (book, row['genres'])
+            else:
+                without_isbn.append((book, row['genres']))
+
+        # Har bir muallif faqat bitta kitob yoza oladi: boshqa kitobi bor mualliflarning qatorlari
+        # o'tkazib yuboriladi (shu ISBN li kitobning o'zi bo'lsa, bu yangilash hisoblanadi)
+        candidates = [*by_isbn.values(), *without_isbn]
+        owners = dict(
+            Book.alive.filter(author_id__in={book.author_id for book, _ in candidates}).values_list('author_id', 'isbn')
+        )
+        accepted = {}
+        for book, genres in candidates:
+            if book.author_id in accepted:
+                continue
+            if book.author_id in owners and (book.isbn is None or owners[book.author_id] != book.isbn):
+                continue
+            accepted[book.author_id] = (book, genres)
+
+        if self.on_conflict == 'ignore':
+            # Bazada bor ISBN li qatorlar yozilmaydi (janrlari ham): ular o'tkazib yuborilgan deb hisoblanadi
+            taken = set(Book.objects.filter(
+                isbn__in=[book.isbn for book, _ in accepted.values() if book.isbn],
+            ).values_list('isbn', flat=True))
+            accepted = {author_id: item for author_id, item in accepted.items() if item[0].isbn not in taken}
+
+        with_isbn = [book for book, _ in accepted.values() if book.isbn]
+        if with_isbn and self.on_conflict == 'update':
+            Book.objects.bulk_create(
+                with_isbn, update_conflicts=True, unique_fields=['isbn'], update_fields=BOOK_UPDATE_FIELDS,
+            )
+        elif with_isbn:
+            # Parallel import bilan poyga bo'lsa ham xato bermaydi
+            Book.objects.bulk_create(with_isbn, ignore_conflicts=True)
+        without_isbn = [book for book, _ in accepted.values() if not book.isbn]
+        if without_isbn:
+            # Parallel import bilan poyga bo'lsa ham unique_book_per_author xatoga yo'l qo'ymaydi
+            Book.objects.bulk_create(without_isbn, ignore_conflicts=True)
+
+        # author_id endi kitobning tabiiy kaliti: id lar bitta so'rov bilan olinadi
+        ids = dict(Book.alive.filter(author_id__in=accepted.keys()).values_list('author_id', 'pk'))
+
+        # M2M bog'lanishlar to'g'ridan-to'g'ri through jadvaliga yoziladi: kitobning janrlari fayldagi ro'yxatga
+        # tenglashtiriladi (fayldan olib tashlangan janrlar o'chiriladi), mavjud bog'lanishlar tegilmaydi
+        Through = Book.genres.through
+        wanted = {
+            ids[author_id]: {self.genres[name] for name in genres}
+            for author_id, (_, genres) in accepted.items()
+            if author_id in ids
+        }
+        stale = [
+            pk for pk, book_id, genre_id in Through.objects.filter(book_id__in=wanted).values_list('pk', 'book_id', 'genre_id')
+            if genre_id not in wanted[book_id]
+        ]
+        if stale:
+            Through.objects.filter(pk__in=stale).delete()
+        links = [Through(book_id=book_id, genre_id=genre_id) for book_id, genres in wanted.items() for genre_id in genres]
+        if links:
+            Through.objects.bulk_create(links, ignore_conflicts=True)
+
+        # bulk_create signal yubormaydi: o'zgarishlar lentasi yozuvlari bo'lak commit bo'lgach qo'shiladi
+        changes.record_many_after_commit(Book, ids.values())
+        # Yangilangan kitoblar (va yangi janr bog'lanishlari) obyekt keshida eskirib qolmasin
+        object_cache.invalidate(Book, ids.values())
+
+        # Poygada yozilmay qolgan qatorlar ham o'tkazib yuborilgan hisoblanadi
+        return len(ids), len(candidates) - len(ids)
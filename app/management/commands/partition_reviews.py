@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from app import partitions
+from app.models import Review
+
+
+class Command(BaseCommand):
+    help = (
+        "Sharhlar jadvalining oylik bo'laklarini boshqaradi: kelgusi oylar uchun bo'lak yaratadi va "
+        "saqlash muddatidan eski bo'laklarni olib tashlaydi (cron orqali kuniga bir marta)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true', help="Oddiy jadvalni bo'laklangan jadvalga aylantirish")
+        parser.add_argument('--unpartition', action='store_true', help="Bo'laklangan jadvalni oddiy jadvalga qaytarish")
+        parser.add_argument('--ahead', type=int, default=settings.REVIEW_PARTITIONS_AHEAD, help="Necha oy oldinga")
+        parser.add_argument(
+            '--retention-months', type=int, default=settings.REVIEW_RETENTION_MONTHS,
+            help="Shundan eski oylar olib tashlanadi (0 - hech narsa o'chirilmaydi)",
+        )
+        parser.add_argument('--detach', action='store_true', help="Eski bo'laklarni o'chirish o'rniga ajratib qo'yish")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Sharhlar jadvalini bo'laklash faqat PostgreSQL bilan ishlaydi.")
+        if options['ahead'] < 0 or options['retention_months'] < 0:
+            raise CommandError("--ahead va --retention-months manfiy bo'lmasligi kerak.")
+
+        if options['convert'] and options['unpartition']:
+            raise CommandError("--convert va --unpartition birga ishlatilmaydi.")
+        if options['unpartition']:
+            with connection.schema_editor() as schema_editor:
+                if partitions.unpartition(schema_editor, Review):
+                    self.stdout.write("Sharhlar jadvali oddiy jadvalga qaytarildi.")
+            return
+
+        if options['convert']:
+            with connection.schema_editor() as schema_editor:
+                if partitions.convert(schema_editor, Review, options['ahead']):
+                    self.stdout.write("Sharhlar jadvali oylik bo'laklarga ajratildi.")
+        with connection.cursor() as cursor:
+            if not partitions.is_partitioned(cursor, Review._meta.db_table):
+                raise CommandError("Sharhlar jadvali bo'laklanmagan: --convert bilan ishga tushiring.")
+
+        created = partitions.ensure_partitions(options['ahead'])
+        removed = []
+        if options['retention_months']:
+            removed = partitions.expire(options['retention_months'], detach=options['detach'])
+        action = "ajratilgan" if options['detach'] else "o'chirilgan"
+        self.stdout.write(self.style.SUCCESS(
+            f"Yaratilgan bo'laklar: {', '.join(created) or '-'}; {action}: {', '.join(removed) or '-'}"
+        ))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app.leaderboards import refresh
+
+
+class Command(BaseCommand):
+    help = "Leaderboard jadvallarini qayta hisoblaydi (standart: inkremental, faqat o'zgarishlar jurnalidagi kitob va sharhlar bo'yicha)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Barcha janrlarni qayta hisoblash")
+        parser.add_argument('--loop', action='store_true', help="Jarayon ichidagi rejalashtiruvchi sifatida ishlash")
+        parser.add_argument('--interval', type=int, default=60, help="--loop rejimida yangilashlar orasidagi soniya")
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            started = time.monotonic()
+            genres = refresh(full=full)
+            self.stdout.write(f"Leaderboardlar yangilandi: {genres} ta janr, {time.monotonic() - started:.2f} s")
+            if not options['loop']:
+                return
+            full = False
+            close_old_connections()
+            time.sleep(options['interval'])
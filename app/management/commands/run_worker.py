@@ -0,0 +1,46 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app import jobs
+
+
+class Command(BaseCommand):
+    help = "Bazadagi fon vazifalari navbatini bajaradi (tashqi broker kerak emas)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOBS_CONCURRENCY, help="Parallel oqimlar soni")
+        parser.add_argument('--poll-interval', type=float, default=settings.JOBS_POLL_INTERVAL, help="Soniya")
+        parser.add_argument('--batch-size', type=int, default=1, help="Bir urinishda olinadigan vazifalar soni")
+        parser.add_argument('--once', action='store_true', help="Muddati yetgan vazifalarni bajarib, chiqish")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--concurrency va --batch-size musbat son bo'lishi kerak.")
+
+        if options['once']:
+            jobs.maintain()
+            done = jobs.run_pending()
+            self.stdout.write(self.style.SUCCESS(f"{done} ta vazifa bajarildi."))
+            return
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        threads = [
+            threading.Thread(target=jobs.work, args=(stop, options['poll_interval'], options['batch_size']))
+            for _ in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Worker ishga tushdi: {options['concurrency']} ta oqim")
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            stop.set()
+        for thread in threads:
+            thread.join()
+        self.stdout.write("Worker to'xtatildi.")
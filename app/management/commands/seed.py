@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from app.seeding import CatalogSeeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Realistik taqsimotdagi sintetik ma'lumotlar (muallif, kitob, janr, nashriyot, sharh) yaratadi. "
+        "Bir xil --seed (va --now) bir xil natija beradi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--books', type=int, default=1000, help="Mualliflar sonidan oshmaydi (1 muallif = 1 kitob)")
+        parser.add_argument('--genres', type=int, default=20)
+        parser.add_argument('--publishers', type=int, default=100)
+        parser.add_argument('--reviews', type=int, default=20000)
+        parser.add_argument('--review-skew', type=float, default=1.1, help="Kitoblar bo'yicha sharhlar Zipf darajasi")
+        parser.add_argument('--days', type=int, default=730, help="Sharhlar necha kunlik davrga tarqatiladi")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--now', help="Sharh vaqtlari hisoblanadigan nuqta (ISO 8601; standart: hozir)")
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--copy', action='store_true', help="Sharh va janr bog'lanishlarini PostgreSQL COPY bilan yozish")
+
+    def handle(self, *args, **options):
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError("--copy faqat PostgreSQL bilan ishlaydi.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size musbat son bo'lishi kerak.")
+        now = options['now']
+        if now:
+            now = parse_datetime(now)
+            if now is None:
+                raise CommandError("--now ISO 8601 formatidagi sana-vaqt bo'lishi kerak.")
+            if timezone.is_naive(now):
+                now = timezone.make_aware(now)
+
+        started = time.monotonic()
+        seeder = CatalogSeeder(
+            seed=options['seed'], batch_size=options['batch_size'], use_copy=options['copy'], stdout=self.stdout,
+            now=now,
+        )
+        totals = seeder.run(
+            authors=options['authors'], books=options['books'], genres=options['genres'],
+            publishers=options['publishers'], reviews=options['reviews'],
+            review_skew=options['review_skew'], days=options['days'],
+        )
+        summary = ", ".join(f"{name}={value}" for name, value in totals.items())
+        self.stdout.write(self.style.SUCCESS(f"Tayyor ({time.monotonic() - started:.1f} s): {summary}"))
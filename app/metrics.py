@@ -0,0 +1,37 @@
+import threading
+from collections import Counter
+
+
+# Jarayon ichidagi oddiy hisoblagichlar (har bir worker o'zinikini yuritadi)
+_lock = threading.Lock()
+_counters = Counter()
+_observations = {}
+
+
+def incr(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name, value):
+    with _lock:
+        count, total, maximum = _observations.get(name, (0, 0, 0))
+        _observations[name] = (count + 1, total + value, max(maximum, value))
+
+
+def snapshot():
+    with _lock:
+        data = dict(_counters)
+        for name, (count, total, maximum) in _observations.items():
+            data[f"{name}.count"] = count
+            data[f"{name}.avg"] = round(total / count, 3) if count else 0
+            data[f"{name}.max"] = maximum
+    hits, misses = data.get('object_cache.hits', 0), data.get('object_cache.misses', 0)
+    data['object_cache.hit_ratio'] = round(hits / (hits + misses), 4) if hits + misses else None
+    return data
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _observations.clear()
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:17
+
+from django.db import migrations, models
+
+
+# Admin "^" qidiruvi PostgreSQL da UPPER(col::text) LIKE UPPER('x%') ko'rinishida bo'ladi;
+# bunday shart faqat shu ifoda bo'yicha text_pattern_ops indeksidan foydalana oladi
+PREFIX_SEARCH_INDEXES = [
+    ('book_title_upper_like_idx', 'app_book', 'title'),
+    ('author_last_name_upper_like_idx', 'app_author', 'last_name'),
+    ('author_first_name_upper_like_idx', 'app_author', 'first_name'),
+    ('publisher_name_upper_like_idx', 'app_publisher', 'name'),
+    ('review_reviewer_name_upper_like_idx', 'app_review', 'reviewer_name'),
+]
+
+
+def create_prefix_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in PREFIX_SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" (UPPER("{column}"::text) text_pattern_ops)'
+        )
+
+
+def drop_prefix_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in PREFIX_SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_review_book_created_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='title',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='publisher',
+            name='name',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['last_name', 'first_name'], name='author_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at', '-id'], name='review_created_idx'),
+        ),
+        migrations.RunPython(create_prefix_search_indexes, drop_prefix_search_indexes),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_authors(apps, schema_editor):
+    # Cheklov mavjud takrorlanishlarda tushunarsiz IntegrityError bilan to'xtamasin: avval aniq xabar
+    Book = apps.get_model('app', 'Book')
+    duplicates = list(
+        Book.objects.values('author_id').annotate(n=Count('pk')).filter(n__gt=1)
+        .order_by('author_id').values_list('author_id', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            "unique_book_per_author qo'shib bo'lmaydi: quyidagi mualliflarning bittadan ortiq kitobi bor "
+            f"(author_id: {', '.join(map(str, duplicates))}). Ortiqcha kitoblarni o'chiring yoki boshqa "
+            "muallifga o'tkazing, so'ng migratsiyani qayta ishga tushiring."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_admin_search_indexes'),
+    ]
+
+    # Avval cheklov yaratiladi, keyin ortiqcha bo'lib qolgan author_id indeksi o'chiriladi
+    operations = [
+        migrations.RunPython(check_duplicate_authors, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='book',
+            constraint=models.UniqueConstraint(fields=('author',), name='unique_book_per_author'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='books', to='app.author'),
+        ),
+    ]
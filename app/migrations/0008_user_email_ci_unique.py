@@ -0,0 +1,57 @@
+from django.db import migrations
+
+
+# Registratsiyada email oldindan exists() bilan tekshirilmaydi: takrorlanishni shu indeks ushlaydi.
+# Katta auth_user jadvalini qulflamaslik uchun PostgreSQL da CONCURRENTLY bilan yaratiladi
+INDEX_NAME = 'auth_user_email_lower_uniq'
+
+
+def create_email_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('postgresql', 'sqlite'):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        # Avvalgi tekshiruv faqat aynan bir xil emailni ushlardi: registrga ko'ra farqli takrorlar bo'lishi mumkin
+        cursor.execute(
+            'SELECT LOWER("email") FROM "auth_user" WHERE "email" <> \'\' '
+            'GROUP BY LOWER("email") HAVING COUNT(*) > 1 ORDER BY 1 LIMIT 20'
+        )
+        duplicates = [email for (email,) in cursor.fetchall()]
+        if duplicates:
+            raise RuntimeError(
+                f"{INDEX_NAME} yaratib bo'lmaydi: quyidagi emaillar bir nechta foydalanuvchida uchraydi "
+                f"({', '.join(duplicates)}). Ularni birlashtiring yoki o'zgartiring, so'ng migratsiyani qayta ishga tushiring."
+            )
+        if vendor == 'postgresql':
+            # Muvaffaqiyatsiz CONCURRENTLY qurilish INVALID indeks qoldiradi va IF NOT EXISTS uni o'tkazib yuboradi
+            cursor.execute(
+                "SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = %s",
+                [INDEX_NAME],
+            )
+            row = cursor.fetchone()
+            if row and row[0]:
+                cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{INDEX_NAME}"')
+    concurrently = 'CONCURRENTLY ' if vendor == 'postgresql' else ''
+    schema_editor.execute(
+        f'CREATE UNIQUE INDEX {concurrently}IF NOT EXISTS "{INDEX_NAME}" '
+        f'ON "auth_user" (LOWER("email")) WHERE "email" <> \'\''
+    )
+
+
+def drop_email_index(apps, schema_editor):
+    if schema_editor.connection.vendor not in ('postgresql', 'sqlite'):
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS "{INDEX_NAME}"')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('app', '0007_book_unique_author'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_email_index, drop_email_index),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:30
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Mavjud qatorlar uchun bittadan "upsert" yozuvi: since=0 butun katalogning to'liq nusxasini beradi
+BACKFILL_MODELS = ['author', 'publisher', 'genre', 'book', 'review']
+
+
+def backfill_changelog(apps, schema_editor):
+    ChangeLog = apps.get_model('app', 'ChangeLog')
+    quote = schema_editor.connection.ops.quote_name
+    now = schema_editor.connection.ops.adapt_datetimefield_value(timezone.now())
+    for name in BACKFILL_MODELS:
+        table = apps.get_model('app', name)._meta.db_table
+        schema_editor.execute(
+            f"INSERT INTO {quote(ChangeLog._meta.db_table)} (model_name, object_id, action, created_at) "
+            f"SELECT %s, id, 'upsert', %s FROM {quote(table)} ORDER BY id",
+            [name, now],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogCompaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('horizon', models.BigIntegerField(default=0)),
+                ('removed', models.PositiveIntegerField(default=0)),
+                ('compacted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('upsert', "Yaratildi/o'zgardi"), ('delete', "O'chirildi")], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model_name', 'object_id', 'id'], name='changelog_object_idx'), models.Index(fields=['action', 'created_at'], name='changelog_action_created_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_changelog, migrations.RunPython.noop),
+    ]
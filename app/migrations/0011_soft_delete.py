@@ -0,0 +1,84 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Kitob/muallif o'chirilganda bog'liq qatorlarni baza o'zi o'chiradi (Django 5.2 da db_on_delete yo'q).
+# app.deletion bularni baribir oldindan, bo'laklab o'chiradi; CASCADE parallel qo'shilgan qatorlar uchun zaxira
+CASCADE_FOREIGN_KEYS = [
+    ('book', 'author_id', 'author'),
+    ('review', 'book_id', 'book'),
+    ('genretopbook', 'book_id', 'book'),
+    ('mostreviewedbook', 'book_id', 'book'),
+]
+
+
+def foreign_keys(apps):
+    Book = apps.get_model('app', 'Book')
+    tables = [
+        (apps.get_model('app', model)._meta.db_table, column, apps.get_model('app', target)._meta.db_table)
+        for model, column, target in CASCADE_FOREIGN_KEYS
+    ]
+    tables.append((Book._meta.get_field('genres').remote_field.through._meta.db_table, 'book_id', Book._meta.db_table))
+    return tables
+
+
+def set_on_delete(apps, schema_editor, action):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    quote = schema_editor.quote_name
+    for table, column, target in foreign_keys(apps):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+        for name, info in constraints.items():
+            if not info['foreign_key'] or info['columns'] != [column]:
+                continue
+            schema_editor.execute(f"ALTER TABLE {quote(table)} DROP CONSTRAINT {quote(name)}")
+            schema_editor.execute(
+                f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} FOREIGN KEY ({quote(column)}) "
+                f"REFERENCES {quote(target)} (id) ON DELETE {action} DEFERRABLE INITIALLY DEFERRED"
+            )
+
+
+def add_db_cascade(apps, schema_editor):
+    set_on_delete(apps, schema_editor, 'CASCADE')
+
+
+def remove_db_cascade(apps, schema_editor):
+    set_on_delete(apps, schema_editor, 'NO ACTION')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_changelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='books', to='app.author'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='book',
+            name='unique_book_per_author',
+        ),
+        migrations.AddConstraint(
+            model_name='book',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('author',), name='unique_book_per_author'),
+        ),
+        migrations.RunPython(add_db_cascade, remove_db_cascade),
+    ]
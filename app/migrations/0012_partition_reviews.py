@@ -0,0 +1,13 @@
+from django.db import migrations
+
+
+# Bo'laklash migratsiyalar grafidan chiqarilgan: sxema muhit sozlamalariga yoki app.partitions kodiga bog'liq
+# bo'lmasligi uchun. Jadval "manage.py partition_reviews --convert" / "--unpartition" bilan aniq o'zgartiriladi.
+# Bu migratsiyani avval qo'llagan bazalar o'zgarmaydi
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_soft_delete'),
+    ]
+
+    operations = []
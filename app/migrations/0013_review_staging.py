@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_partition_reviews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewStaging',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('book_id', models.BigIntegerField()),
+                ('reviewer_name', models.CharField(max_length=100)),
+                ('rating', models.PositiveSmallIntegerField()),
+                ('comment', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_review_staging'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='leaderboardstate',
+            name='review_watermark',
+        ),
+        migrations.AddField(
+            model_name='leaderboardstate',
+            name='change_watermark',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -1,5 +1,15 @@
 from django.db import models
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+
+# O'chirilgan (is_deleted) qatorlar fon vazifasida tozalanguncha API so'rovlarida ko'rinmaydi (app.deletion).
+# objects odatiy menejer bo'lib qoladi: admin, teskari bog'lanishlar va ichki so'rovlar barcha qatorlarni ko'radi
+class AliveManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
 
 
 class Author(models.Model):
@@ -8,6 +18,10 @@ class Author(models.Model):
     bio = models.TextField(blank=True, null=True)
     birth_date = models.DateField(null=True, blank=True)
     death_date = models.DateField(null=True, blank=True)
+    is_deleted = models.BooleanField(default=False)
+
+    objects = models.Manager()
+    alive = AliveManager()
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}".strip()
@@ -15,6 +29,9 @@ class Author(models.Model):
     class Meta:
         verbose_name = "Muallif"
         verbose_name_plural = "Mualliflar"
+        indexes = [
+            models.Index(fields=['last_name', 'first_name'], name='author_name_idx'),
+        ]
 
 
 class Genre(models.Model):
@@ -25,7 +42,7 @@ class Genre(models.Model):
 
 
 class Publisher(models.Model):
-    name = models.CharField(max_length=200)
+    name = models.CharField(max_length=200, db_index=True)
     address = models.TextField(blank=True, null=True)
     website = models.URLField(blank=True, null=True)
 
@@ -34,7 +51,8 @@ class Publisher(models.Model):
 
 
 class Book(models.Model):
-    title = models.CharField(max_length=200)
+    title = models.CharField(max_length=200, db_index=True)
+    # unique_book_per_author faqat o'chirilmagan kitoblarni qamraydi: tozalash va CASCADE uchun alohida indeks
     author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name="books")
     publisher = models.ForeignKey(Publisher, on_delete=models.SET_NULL, null=True, blank=True)
     genres = models.ManyToManyField(Genre, related_name="books")
@@ -42,11 +60,35 @@ class Book(models.Model):
     isbn = models.CharField(max_length=13, unique=True, blank=True, null=True)
     pages = models.PositiveIntegerField(null=True, blank=True)
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    is_deleted = models.BooleanField(default=False)
+
+    objects = models.Manager()
+    alive = AliveManager()
+
+    class Meta:
+        constraints = [
+            # Har bir muallif faqat bitta kitob yoza oladi (o'chirilib, tozalanishini kutayotgani hisobga olinmaydi)
+            models.UniqueConstraint(fields=['author'], condition=Q(is_deleted=False), name='unique_book_per_author'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.author}"
 
 
+class ReviewQuerySet(models.QuerySet):
+    def latest_per_book(self, book_ids, limit):
+        # Har bir kitobning oxirgi N ta sharhi bitta oynali (window) so'rov bilan olinadi
+        return (
+            self.filter(book_id__in=book_ids)
+            .annotate(row_number=Window(
+                RowNumber(), partition_by=F('book_id'), order_by=[F('created_at').desc(), F('id').desc()],
+            ))
+            .filter(row_number__lte=limit)
+            .order_by('book_id', '-created_at', '-id')
+        )
+
+
 class Review(models.Model):
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="reviews")
     reviewer_name = models.CharField(max_length=100)
@@ -56,5 +98,142 @@ class Review(models.Model):
     comment = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ReviewQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['book', '-created_at', '-id'], name='review_book_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='review_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.reviewer_name} → {self.book.title}"
+
+
+# Buferlangan sharhlar (app.ingest, REVIEW_INGEST_MODE="buffered"): FK va qo'shimcha indekslarsiz, faqat
+# qo'shiladi; fon vazifasi ularni partiyalab Review ga ko'chiradi
+class ReviewStaging(models.Model):
+    book_id = models.BigIntegerField()
+    reviewer_name = models.CharField(max_length=100)
+    rating = models.PositiveSmallIntegerField()
+    comment = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.reviewer_name} → #{self.book_id}"
+
+
+# Leaderboard jadvallari: Review/Book dan davriy hisoblanadi, o'qish O(1)
+class LeaderboardState(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    # Oxirgi yangilashda hisobga olingan ChangeLog id si (inkremental yangilash shundan keyingi o'zgarishlarni oladi)
+    change_watermark = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
+class GenreTopBook(models.Model):
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name="+")
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    rating_avg = models.FloatField()
+    review_count = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['genre', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['genre', 'rank'], name='unique_genre_top_book_rank'),
+        ]
+
+
+class MostReviewedBook(models.Model):
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField(unique=True)
+    review_count = models.PositiveIntegerField()
+    window_start = models.DateTimeField()
+
+    class Meta:
+        ordering = ['rank']
+
+
+class PublisherRanking(models.Model):
+    publisher = models.ForeignKey(Publisher, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField(unique=True)
+    book_count = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['rank']
+
+
+# O'zgarishlar jurnali (app.changes): mijozlar /changes/?since=<id> orqali faqat o'zgargan qatorlarni oladi
+class ChangeLog(models.Model):
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = [
+        (UPSERT, "Yaratildi/o'zgardi"),
+        (DELETE, "O'chirildi"),
+    ]
+
+    model_name = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model_name', 'object_id', 'id'], name='changelog_object_idx'),
+            models.Index(fields=['action', 'created_at'], name='changelog_action_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.pk}: {self.model_name} #{self.object_id} {self.action}"
+
+
+class ChangeLogCompaction(models.Model):
+    # horizon dan eski kursorlar o'chirilgan yozuvlarni ko'rmay qolishi mumkin: ular to'liq sinxronlanadi
+    horizon = models.BigIntegerField(default=0)
+    removed = models.PositiveIntegerField(default=0)
+    compacted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+
+
+# Fon vazifalari navbati (app.jobs): tashqi broker kerak emas, navbat shu bazada
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, "Navbatda"),
+        (RUNNING, "Bajarilmoqda"),
+        (FAILED, "Xato bilan tugadi"),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    # Bir xil kalitli vazifadan navbatda faqat bittasi turadi
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_claim_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'], condition=models.Q(status='queued'), name='unique_queued_job_dedupe_key',
+            ),
+        ]
+
     def __str__(self):
-        return f"{self.reviewer_name} → {self.book.title}"
\ No newline at end of file
+        return f"{self.name} ({self.status})"
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from . import metrics
+
+
+# Model obyektlarining serializatsiya qilingan ko'rinishi model va pk bo'yicha saqlanadi
+def cache_key(model, pk):
+    return f"obj:{model._meta.label_lower}:{pk}"
+
+
+def get_many(model, pks):
+    found = cache.get_many([cache_key(model, pk) for pk in pks])
+    payloads = {pk: found[cache_key(model, pk)] for pk in pks if cache_key(model, pk) in found}
+    metrics.incr('object_cache.hits', len(payloads))
+    metrics.incr('object_cache.misses', len(pks) - len(payloads))
+    return payloads
+
+
+def contains(model, pk):
+    # Metrikasiz: obyekt o'qilmaydi, faqat mavjudligi tekshiriladi
+    return cache.get(cache_key(model, pk)) is not None
+
+
+def set_many(model, payloads):
+    if payloads:
+        cache.set_many(
+            {cache_key(model, pk): payload for pk, payload in payloads.items()},
+            timeout=settings.OBJECT_CACHE_TIMEOUT,
+        )
+
+
+def invalidate(model, pks):
+    pks = list(pks)
+    # Bitta o'zgarish nechta kesh yozuviga ta'sir qilishi (fan-out) kuzatiladi
+    metrics.observe(f'object_cache.invalidation_fanout.{model._meta.model_name}', len(pks))
+    if pks:
+        keys = [cache_key(model, pk) for pk in pks]
+        cache.delete_many(keys)
+        # Tranzaksiya ichida: parallel o'quvchi shu orada commit dan oldingi qatorni keshga qaytarib qo'yishi
+        # mumkin, shuning uchun commit dan keyin yana o'chiriladi (registry.bump bilan bir xil)
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def fetch_serialized(model, pks, queryset, serializer_class):
+    # Keshda bor obyektlar bazaga so'ralmaydi; qolganlari bitta pk__in so'rovi bilan olinadi
+    payloads = get_many(model, pks)
+    missing = [pk for pk in pks if pk not in payloads]
+    if missing:
+        fresh = {obj.pk: dict(serializer_class(obj).data) for obj in queryset.filter(pk__in=missing)}
+        set_many(model, fresh)
+        payloads.update(fresh)
+    return payloads
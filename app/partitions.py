@@ -0,0 +1,196 @@
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import changes, jobs
+from .models import Book, Review
+from .signals import INVALIDATE_BOOKS_JOB, schedule_leaderboard_refresh
+
+
+# PostgreSQL da sharhlar jadvali created_at bo'yicha oylik bo'laklarga ajratiladi (partition_reviews buyrug'i).
+# created_at chegarasi berilgan so'rovlar faqat kerakli oylarni o'qiydi, eski oylar DROP/DETACH bilan o'chiriladi.
+# Bo'laklangan jadvalning birlamchi kaliti (id, created_at): Django uchun pk baribir id (qiymatlari identity dan)
+PARTITION_NAME = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def month_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(start, months):
+    index = start.year * 12 + start.month - 1 + months
+    return start.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table, start):
+    return f"{table}_p{start:%Y%m}"
+
+
+def default_partition(table):
+    return f"{table}_default"
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [table])
+    return cursor.fetchone()[0]
+
+
+def partitions(cursor, table):
+    # {oy boshi: bo'lak nomi}; default bo'lak kirmaydi
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)",
+        [table],
+    )
+    found = {}
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME.search(name)
+        if match:
+            found[datetime(int(match[1]), int(match[2]), 1, tzinfo=dt_timezone.utc)] = name
+    return found
+
+
+def create_partition(cursor, table, start):
+    quote = connection.ops.quote_name
+    name, end = partition_name(table, start), add_months(start, 1)
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    default = default_partition(table)
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {quote(default)} WHERE created_at >= %s AND created_at < %s)", [start, end],
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(f"CREATE TABLE {quote(name)} PARTITION OF {quote(table)} {bounds}")
+        return name
+    # Oldindan yaratilmagan oy qatorlari default bo'lakka tushgan: ular yangi bo'lakka ko'chiriladi
+    cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(default)}")
+    cursor.execute(f"CREATE TABLE {quote(name)} PARTITION OF {quote(table)} {bounds}")
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {quote(default)} WHERE created_at >= %s AND created_at < %s RETURNING *) "
+        f"INSERT INTO {quote(table)} SELECT * FROM moved",
+        [start, end],
+    )
+    cursor.execute(f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(default)} DEFAULT")
+    return name
+
+
+def flush_deferred(cursor):
+    # Kechiktirilgan FK tekshiruvlari kutib turgan jadvalni ALTER/DROP qilib bo'lmaydi (0011 migratsiyasi)
+    cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+def rebuild(schema_editor, model, partitioned, ahead=0, now=None):
+    # Jadval qayta yaratiladi va qatorlar ko'chiriladi: bir martalik, ACCESS EXCLUSIVE qulf ostida
+    quote = schema_editor.quote_name
+    table = model._meta.db_table
+    legacy = f"{table}_old"
+    pk = model._meta.pk.column
+    now = now or timezone.now()
+    with schema_editor.connection.cursor() as cursor:
+        flush_deferred(cursor)
+        cursor.execute(f"LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        # Indekslar (migratsiyalardagi nomlari bilan) bazaning o'zidan olinadi; birlamchi kalit va cheklovlar indekslari
+        # alohida qayta yaratiladi
+        cursor.execute(
+            "SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = to_regclass(%s) AND NOT indisprimary "
+            "AND indexrelid NOT IN (SELECT conindid FROM pg_constraint WHERE conrelid = to_regclass(%s))",
+            [table, table],
+        )
+        indexes = [definition for (definition,) in cursor.fetchall()]
+        cursor.execute(f"SELECT min(created_at) FROM {quote(table)}")
+        oldest = cursor.fetchone()[0] or now
+
+        cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}")
+        cursor.execute(
+            f"CREATE TABLE {quote(table)} (LIKE {quote(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY "
+            f"INCLUDING CONSTRAINTS){' PARTITION BY RANGE (created_at)' if partitioned else ''}"
+        )
+        if partitioned:
+            cursor.execute(f"CREATE TABLE {quote(default_partition(table))} PARTITION OF {quote(table)} DEFAULT")
+            start, last = month_start(oldest), add_months(month_start(now), ahead)
+            while start <= last:
+                create_partition(cursor, table, start)
+                start = add_months(start, 1)
+        cursor.execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(legacy)}")
+        cursor.execute(f"DROP TABLE {quote(legacy)}")
+
+        key = f"{quote(pk)}, created_at" if partitioned else quote(pk)
+        cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(f'{table}_pkey')} PRIMARY KEY ({key})")
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, %s), coalesce(max({quote(pk)}), 0) + 1, false) FROM {quote(table)}",
+            [table, pk],
+        )
+        # Eski jadval o'chgach nomlar bo'shaydi. Bo'laklangan jadvalda indeks har bir bo'lakka (kelajakdagilariga ham)
+        # avtomatik qo'shiladi; "ON ONLY" bo'lsa qo'shilmasdi, shuning uchun olib tashlanadi
+        for definition in indexes:
+            cursor.execute(definition.replace(' ON ONLY ', ' ON ', 1))
+
+
+def convert(schema_editor, model, ahead, now=None):
+    with schema_editor.connection.cursor() as cursor:
+        if is_partitioned(cursor, model._meta.db_table):
+            return False
+    rebuild(schema_editor, model, True, ahead, now)
+    return True
+
+
+def unpartition(schema_editor, model):
+    with schema_editor.connection.cursor() as cursor:
+        if not is_partitioned(cursor, model._meta.db_table):
+            return False
+    rebuild(schema_editor, model, False)
+    return True
+
+
+def ensure_partitions(ahead, now=None):
+    # Joriy va keyingi "ahead" oy uchun bo'laklar; yozuvlar default bo'lakka tushmasligi uchun cron orqali
+    table = Review._meta.db_table
+    start = month_start(now or timezone.now())
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        flush_deferred(cursor)
+        existing = partitions(cursor, table)
+        for offset in range(ahead + 1):
+            month = add_months(start, offset)
+            if month not in existing:
+                created.append(create_partition(cursor, table, month))
+    return created
+
+
+def expire(retention_months, detach=False, now=None):
+    # Butun oyi muddatdan eski bo'laklar DELETE siz olib tashlanadi; signal yo'q, shuning uchun
+    # o'zgarishlar lentasi, kitob keshlari va leaderboard shu yerda yangilanadi.
+    # Har bir sharh uchun "delete" yozuvi qo'shilmaydi (bo'lak millionlab qator bo'lishi mumkin): kursorlar
+    # eskirgan deb belgilanadi, mijozlar to'liq sinxronlanadi, ta'sirlangan kitoblar esa bir martadan yoziladi
+    quote = connection.ops.quote_name
+    table = Review._meta.db_table
+    cutoff = add_months(month_start(now or timezone.now()), -retention_months)
+    removed, book_ids = [], set()
+    with transaction.atomic(), connection.cursor() as cursor:
+        flush_deferred(cursor)
+        for start, name in sorted(partitions(cursor, table).items()):
+            if add_months(start, 1) > cutoff:
+                break
+            cursor.execute(f"SELECT DISTINCT book_id FROM {quote(name)}")
+            book_ids.update(book_id for (book_id,) in cursor.fetchall())
+            if detach:
+                cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+            else:
+                cursor.execute(f"DROP TABLE {quote(name)}")
+            removed.append(name)
+        if book_ids:
+            changes.expire_cursors()
+            changes.record_many(Book, sorted(book_ids))
+            jobs.enqueue(INVALIDATE_BOOKS_JOB, {'ids': sorted(book_ids)})
+    if removed:
+        schedule_leaderboard_refresh()
+    return removed
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.query import ModelIterable
+
+from . import metrics
+from .models import Book, Genre, Publisher
+
+
+# Kichik, kam o'zgaradigan ma'lumotnoma jadvallari har bir workerda to'liq xotirada saqlanadi.
+# Umumiy keshdagi versiya hisoblagichi o'zgarsagina jadval qayta yuklanadi
+class Registry:
+    def __init__(self, model):
+        self.model = model
+        self.version_key = f"registry:{model._meta.label_lower}:version"
+        self._lock = threading.Lock()
+        self._objects = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def shared_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            # Kesh tozalansa ham eski versiya bilan adashmaslik uchun vaqtdan olinadi
+            cache.add(self.version_key, time.time_ns(), None)
+            version = cache.get(self.version_key)
+        return version
+
+    def objects(self, recheck=False):
+        now = time.monotonic()
+        if not recheck and self._version is not None and now - self._checked_at < settings.REGISTRY_CHECK_INTERVAL:
+            return self._objects
+        version = self.shared_version()
+        with self._lock:
+            if version != self._version:
+                self._objects = self.model.objects.order_by('pk').in_bulk()
+                self._version = version
+                metrics.incr(f'registry.reloads.{self.model._meta.model_name}')
+            self._checked_at = now
+        return self._objects
+
+    # Qaytarilgan obyektlar barcha so'rovlar uchun umumiy: ularni o'zgartirmang
+    def all(self):
+        return list(self.objects().values())
+
+    def get(self, pk):
+        return self.in_bulk([pk]).get(pk)
+
+    def in_bulk(self, pks):
+        objects = self.objects()
+        if any(pk not in objects for pk in pks):
+            # Boshqa workerda yaqinda yaratilgan bo'lishi mumkin: versiya darhol qayta tekshiriladi
+            objects = self.objects(recheck=True)
+        return {pk: objects[pk] for pk in pks if pk in objects}
+
+    def bump(self):
+        self._version = None
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, time.time_ns(), None)
+
+
+GENRES = Registry(Genre)
+PUBLISHERS = Registry(Publisher)
+REGISTRIES = {Genre: GENRES, Publisher: PUBLISHERS}
+
+
+def for_model(model):
+    return REGISTRIES[model]
+
+
+def attach_references(books):
+    # publisher va genres JOIN/prefetch o'rniga reyestrdan; bazadan faqat kitob-janr bog'lanishlari olinadi
+    publisher_field = Book._meta.get_field('publisher')
+    publishers = PUBLISHERS.in_bulk({book.publisher_id for book in books if book.publisher_id})
+    links = {book.pk: [] for book in books}
+    for book_id, genre_id in Book.genres.through.objects.filter(book_id__in=links).values_list('book_id', 'genre_id'):
+        links[book_id].append(genre_id)
+    genres = GENRES.in_bulk({genre_id for ids in links.values() for genre_id in ids})
+
+    for book in books:
+        if book.publisher_id is None or book.publisher_id in publishers:
+            publisher_field.set_cached_value(book, publishers.get(book.publisher_id))
+        manager = book.genres
+        queryset = manager.get_queryset()
+        queryset._result_cache = sorted(
+            (genres[pk] for pk in links[book.pk] if pk in genres), key=lambda genre: genre.pk,
+        )
+        queryset._prefetch_done = True
+        book.__dict__.setdefault('_prefetched_objects_cache', {})[manager.prefetch_cache_name] = queryset
+
+
+class BookReferenceIterable(ModelIterable):
+    def __iter__(self):
+        books = list(super().__iter__())
+        if books:
+            attach_references(books)
+        yield from books
+
+
+def with_references(queryset):
+    queryset = queryset.select_related('author')
+    queryset._iterable_class = BookReferenceIterable
+    return queryset
@@ -0,0 +1,240 @@
+import csv
+import io
+import random
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import changes, registry
+from .models import Author, Book, Genre, Publisher, Review
+
+
+GENRE_NAMES = [
+    "Roman", "Qissa", "Hikoya", "She'riyat", "Drama", "Tarix", "Fantastika", "Detektiv",
+    "Sarguzasht", "Biografiya", "Falsafa", "Psixologiya", "Iqtisodiyot", "Bolalar adabiyoti",
+    "Ilmiy-ommabop", "Diniy", "Memuar", "Publitsistika", "Satira", "Triller",
+]
+
+FIRST_NAMES = [
+    "Alisher", "Abdulla", "Cho'lpon", "Erkin", "Gafur", "Hamid", "Zulfiya", "Said", "Oybek",
+    "Tohir", "Xurshid", "Nodira", "Uvaysiy", "Asqad", "Shukur", "Odil", "Muhammad", "Saida",
+]
+
+LAST_NAMES = [
+    "Navoiy", "Qodiriy", "Vohidov", "G'ulom", "Olimjon", "Ahmad", "Malik", "Qahhor", "Oripov",
+    "Yoqubov", "Xolmirzayev", "Hoshimov", "Sulaymon", "Do'stmuhammad", "Mahmudov", "Usmonov",
+]
+
+TITLE_WORDS = [
+    "O'tkan", "kunlar", "Mehrobdan", "chayon", "Kecha", "va", "kunduz", "Dunyoning", "ishlari",
+    "Ulug'bek", "xazinasi", "Sariq", "devni", "minib", "Ikki", "eshik", "orasi", "Yulduzli", "tunlar",
+]
+
+COMMENTS = [
+    "Juda yoqdi!", "O'rtacha kitob.", "Hammaga tavsiya qilaman.", "Syujet biroz cho'zilgan.",
+    "Tilining go'zalligi hayratlanarli.", "Qayta o'qishga arziydi.",
+]
+
+# 1..5 baholar uchun og'irliklar: real reytinglar odatda yuqori baholarga og'adi
+RATING_WEIGHTS = [5, 7, 15, 33, 40]
+
+# Kitob nechta janrga tegishli bo'lishi ehtimolligi (1, 2, 3, 4 ta)
+GENRE_FANOUT_WEIGHTS = [50, 30, 15, 5]
+
+
+def isbn13(number):
+    digits = f"978{number:09d}"
+    checksum = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(digits))
+    return digits + str((10 - checksum % 10) % 10)
+
+
+def zipf_cum_weights(n, exponent):
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+class CatalogSeeder:
+    def __init__(self, seed=42, batch_size=10000, use_copy=False, stdout=None, now=None):
+        self.rng = random.Random(seed)
+        # Sharh vaqtlari shu nuqtadan orqaga tarqatiladi: to'liq takrorlanuvchanlik uchun now ham belgilanadi
+        self.now = now
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.stdout = stdout
+
+    def log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    def progress(self, label, done, total, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.log(f"{label}: {done}/{total} ({done / elapsed:.0f} qator/s)")
+
+    def run(self, authors, books, genres, publishers, reviews, review_skew=1.1, days=730):
+        # Har bir muallif faqat bitta kitob yoza oladi
+        books = min(books, authors)
+        # COPY/bulk_create signal yubormaydi: yangi qatorlar oxirida o'zgarishlar jurnaliga yoziladi
+        seeded_after = {
+            model: model.objects.aggregate(value=Max('pk'))['value'] or 0 for model in changes.FEED_MODELS.values()
+        }
+        genre_ids = self.seed_genres(genres)
+        publisher_ids = self.seed_publishers(publishers)
+        author_ids = self.seed_authors(authors)
+        book_ids = self.seed_books(author_ids[:books], publisher_ids)
+        self.seed_book_genres(book_ids, genre_ids)
+        self.seed_reviews(book_ids, reviews, review_skew, days)
+        for model, after_pk in seeded_after.items():
+            changes.record_table(model, after_pk)
+        for reference in registry.REGISTRIES.values():
+            reference.bump()
+        return {
+            'genres': len(genre_ids), 'publishers': len(publisher_ids), 'authors': len(author_ids),
+            'books': len(book_ids), 'reviews': reviews if book_ids else 0,
+        }
+
+    def seed_genres(self, count):
+        names = [
+            GENRE_NAMES[i] if i < len(GENRE_NAMES) else f"{GENRE_NAMES[i % len(GENRE_NAMES)]} {i // len(GENRE_NAMES)}"
+            for i in range(count)
+        ]
+        Genre.objects.bulk_create([Genre(name=name) for name in names], ignore_conflicts=True)
+        ids = dict(Genre.objects.filter(name__in=names).values_list('name', 'pk'))
+        return [ids[name] for name in names]
+
+    def seed_publishers(self, count):
+        publishers = [
+            Publisher(name=f"{self.rng.choice(LAST_NAMES)} nashriyoti {i}", address="Toshkent")
+            for i in range(count)
+        ]
+        return [p.pk for p in Publisher.objects.bulk_create(publishers, batch_size=self.batch_size)]
+
+    def seed_authors(self, count):
+        ids = []
+        started = time.monotonic()
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            created = Author.objects.bulk_create([
+                Author(
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=f"{self.rng.choice(LAST_NAMES)} {start + i}",
+                    birth_date=date(1900, 1, 1) + timedelta(days=self.rng.randrange(365 * 100)),
+                )
+                for i in range(size)
+            ])
+            ids.extend(author.pk for author in created)
+            self.progress("Mualliflar", len(ids), count, started)
+        return ids
+
+    def seed_books(self, author_ids, publisher_ids):
+        ids = []
+        # count() emas: o'chirilgan kitoblar bo'lsa ISBN lar to'qnashadi. Har bir seed ISBN raqami kitob pk idan
+        # kichik, shuning uchun max(pk) dan boshlash oldingi seed lar bilan ham to'qnashmaydi
+        offset = Book.objects.aggregate(value=Max('pk'))['value'] or 0
+        started = time.monotonic()
+        for start in range(0, len(author_ids), self.batch_size):
+            batch = author_ids[start:start + self.batch_size]
+            created = Book.objects.bulk_create([
+                Book(
+                    title=" ".join(self.rng.sample(TITLE_WORDS, self.rng.randint(1, 4))).capitalize(),
+                    author_id=author_id,
+                    publisher_id=self.rng.choice(publisher_ids) if publisher_ids else None,
+                    published_date=date(1920, 1, 1) + timedelta(days=self.rng.randrange(365 * 100)),
+                    isbn=isbn13(offset + start + i),
+                    pages=self.rng.randint(48, 1200),
+                )
+                for i, author_id in enumerate(batch)
+            ])
+            ids.extend(book.pk for book in created)
+            self.progress("Kitoblar", len(ids), len(author_ids), started)
+        return ids
+
+    def seed_book_genres(self, book_ids, genre_ids):
+        if not genre_ids:
+            return
+        # Janrlar mashhurligi ham notekis: bir nechta janr ko'pchilik kitoblarda uchraydi
+        cum_weights = zipf_cum_weights(len(genre_ids), 1.0)
+        fanouts = range(1, len(GENRE_FANOUT_WEIGHTS) + 1)
+
+        def rows():
+            for book_id in book_ids:
+                k = min(len(genre_ids), self.rng.choices(fanouts, GENRE_FANOUT_WEIGHTS)[0])
+                for genre_id in set(self.rng.choices(genre_ids, cum_weights=cum_weights, k=k)):
+                    yield (book_id, genre_id)
+
+        Through = Book.genres.through
+        self.write_rows(Through._meta.db_table, ['book_id', 'genre_id'], rows(), "Kitob-janr")
+
+    def seed_reviews(self, book_ids, count, skew, days):
+        if not book_ids or not count:
+            return
+        # Sharhlar kitoblar bo'yicha Zipf taqsimotida: oz sonli "mashhur" kitoblar ko'p sharh oladi
+        order = list(book_ids)
+        self.rng.shuffle(order)
+        cum_weights = zipf_cum_weights(len(order), skew)
+        now = self.now or timezone.now()
+        span = days * 24 * 3600
+
+        def rows():
+            remaining = count
+            while remaining:
+                size = min(self.batch_size, remaining)
+                remaining -= size
+                targets = self.rng.choices(order, cum_weights=cum_weights, k=size)
+                ratings = self.rng.choices(range(1, 6), RATING_WEIGHTS, k=size)
+                for book_id, rating in zip(targets, ratings):
+                    yield (
+                        book_id,
+                        f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}",
+                        rating,
+                        self.rng.choice(COMMENTS) if self.rng.random() < 0.3 else None,
+                        now - timedelta(seconds=self.rng.randrange(span)),
+                    )
+
+        columns = ['book_id', 'reviewer_name', 'rating', 'comment', 'created_at']
+        self.write_rows(Review._meta.db_table, columns, rows(), "Sharhlar", total=count)
+
+    def write_rows(self, table, columns, rows, label, total=None):
+        # created_at (auto_now_add) ni saqlab qolish uchun barg jadvallar to'g'ridan-to'g'ri yoziladi
+        quote = connection.ops.quote_name
+        started = time.monotonic()
+        done = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                done += self.flush(table, columns, batch, quote)
+                self.progress(label, done, total or '?', started)
+                batch = []
+        if batch:
+            done += self.flush(table, columns, batch, quote)
+            self.progress(label, done, total or '?', started)
+
+    def flush(self, table, columns, batch, quote):
+        column_sql = ", ".join(quote(column) for column in columns)
+        with transaction.atomic(), connection.cursor() as cursor:
+            if self.use_copy:
+                self.copy(cursor.cursor, f"COPY {quote(table)} ({column_sql}) FROM STDIN", batch)
+            else:
+                adapt = connection.ops.adapt_datetimefield_value
+                batch = [tuple(adapt(v) if hasattr(v, 'tzinfo') else v for v in row) for row in batch]
+                placeholders = ", ".join(["%s"] * len(columns))
+                cursor.executemany(f"INSERT INTO {quote(table)} ({column_sql}) VALUES ({placeholders})", batch)
+        return len(batch)
+
+    def copy(self, raw_cursor, sql, batch):
+        if hasattr(raw_cursor, 'copy'):
+            # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                for row in batch:
+                    copy.write_row(row)
+            return
+        # psycopg2
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow(['\\N' if value is None else value for value in row])
+        buffer.seek(0)
+        raw_cursor.copy_expert(f"{sql} WITH (FORMAT csv, NULL '\\N')", buffer)
@@ -1,8 +1,25 @@
 from rest_framework import serializers
+from rest_framework.serializers import raise_errors_on_nested_writes
+from rest_framework.utils import model_meta
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
-from .models import Author, Book, Genre, Publisher, Review
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from . import ingest, registry
+from .models import (
+    Author, Book, Genre, Publisher, Review, ReviewStaging, GenreTopBook, MostReviewedBook, PublisherRanking,
+)
+
+
+EMAIL_TAKEN_MESSAGE = "Ushbu elektron pochta manzili allaqachon ro'yxatdan o'tgan."
+USERNAME_TAKEN_MESSAGE = "Bu foydalanuvchi nomi allaqachon band."
+
+AUTHOR_TAKEN_MESSAGE = (
+    "Bu muallif (Author) allaqachon bitta kitob yozgan. Har bir muallif faqat bitta kitob yarata oladi."
+)
+ISBN_TAKEN_MESSAGE = "Bu ISBN raqamli kitob allaqachon mavjud."
+CONFLICT_MESSAGE = "Ma'lumotlar bir vaqtda o'zgartirildi. Iltimos, qayta urinib ko'ring."
 
 
 class UserRegisterSerializer(serializers.ModelSerializer):
@@ -19,13 +36,19 @@ class UserRegisterSerializer(serializers.ModelSerializer):
         if not value.endswith('@gmail.com'):
             raise serializers.ValidationError("Faqat '@gmail.com' bilan tugaydigan elektron pochta manzillariga ruxsat beriladi.")
             
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("Ushbu elektron pochta manzili allaqachon ro'yxatdan o'tgan.")
-            
         return value
 
     def create(self, validated_data):
-        user = User.objects.create_user(**validated_data)
+        # Email takrorlanishini auth_user_email_lower_uniq indeksi aniqlaydi (oldindan so'rov yo'q)
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(**validated_data)
+        except IntegrityError:
+            email = validated_data.get('email')
+            taken = User.objects.alias(email_lower=Lower('email')).filter(email_lower=(email or '').lower())
+            if email and taken.exclude(email='').exists():
+                raise serializers.ValidationError({'email': [EMAIL_TAKEN_MESSAGE]})
+            raise serializers.ValidationError({'username': [USERNAME_TAKEN_MESSAGE]})
         return user
 
 
@@ -42,7 +65,112 @@ class UserLoginSerializer(serializers.Serializer):
         raise serializers.ValidationError("Kiritilgan ma'lumotlarga mos foydalanuvchi topilmadi.")
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class RegistryRelatedField(serializers.PrimaryKeyRelatedField):
+    # Genre/Publisher ID lari bazaga so'rovsiz, xotiradagi reyestr (app.registry) bo'yicha tekshiriladi
+    def __init__(self, model, **kwargs):
+        self.registry = registry.for_model(model)
+        kwargs.setdefault('queryset', model.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = self.registry.get(pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+    def in_bulk(self, pks):
+        return self.registry.in_bulk(pks)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    # Har bir ID uchun alohida SELECT o'rniga bitta "pk IN (...)" so'rovi
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        pks = []
+        for item in data:
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                pks.append(int(item))
+            except (TypeError, ValueError):
+                child.fail('incorrect_type', data_type=type(item).__name__)
+        found = child.in_bulk(pks) if isinstance(child, RegistryRelatedField) else child.get_queryset().in_bulk(pks)
+        for pk in pks:
+            if pk not in found:
+                child.fail('does_not_exist', pk_value=pk)
+        return list({pk: found[pk] for pk in pks}.values())
+
+
+class MinimalWriteMixin:
+    # UPDATE faqat o'zgargan ustunlarni yozadi, M2M farq bo'yicha yangilanadi,
+    # javob (serializer.data) esa xotiradagi obyektlardan quriladi
+    def create(self, validated_data):
+        many_to_many = self.pop_many_to_many(validated_data)
+        instance = super().create(validated_data)
+        for attr, values in many_to_many.items():
+            if values:
+                getattr(instance, attr).add(*values)
+            self.cache_many_to_many(instance, attr, values)
+        return instance
+
+    def update(self, instance, validated_data):
+        raise_errors_on_nested_writes('update', self, validated_data)
+        many_to_many = self.pop_many_to_many(validated_data)
+
+        update_fields = []
+        for attr, value in validated_data.items():
+            field = instance._meta.get_field(attr)
+            new = value.pk if field.is_relation and value is not None else value
+            if getattr(instance, field.attname) != new:
+                update_fields.append(field.name)
+            setattr(instance, attr, value)
+        if update_fields:
+            update_fields += [f.name for f in instance._meta.concrete_fields if getattr(f, 'auto_now', False)]
+            instance.save(update_fields=update_fields)
+
+        # Janrlar o'zgarsa updated_at ni m2m_changed signali yangilaydi (signals.touch_books)
+        for attr, values in many_to_many.items():
+            manager = getattr(instance, attr)
+            current = {obj.pk for obj in manager.all()}
+            wanted = {obj.pk for obj in values}
+            removed = current - wanted
+            added = [obj for obj in values if obj.pk not in current]
+            if removed:
+                manager.remove(*removed)
+            if added:
+                manager.add(*added)
+            self.cache_many_to_many(instance, attr, values)
+        return instance
+
+    def pop_many_to_many(self, validated_data):
+        relations = model_meta.get_field_info(self.Meta.model).relations
+        return {
+            attr: validated_data.pop(attr) for attr, relation in relations.items()
+            if relation.to_many and attr in validated_data
+        }
+
+    def cache_many_to_many(self, instance, attr, values):
+        # prefetch_related natijasi bilan bir xil: keyingi .all() bazaga bormaydi
+        manager = getattr(instance, attr)
+        prefetched = instance.__dict__.setdefault('_prefetched_objects_cache', {})
+        prefetched.pop(manager.prefetch_cache_name, None)
+        queryset = manager.get_queryset()
+        queryset._result_cache = sorted(values, key=lambda obj: obj.pk)
+        queryset._prefetch_done = True
+        prefetched[manager.prefetch_cache_name] = queryset
+
+
+class AuthorSerializer(MinimalWriteMixin, serializers.ModelSerializer):
     class Meta:
         model = Author
         fields = ['id', 'first_name', 'last_name', 'bio', 'birth_date', 'death_date'] 
@@ -54,22 +182,22 @@ class AuthorSerializer(serializers.ModelSerializer):
         }
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(MinimalWriteMixin, serializers.ModelSerializer):
     class Meta:
         model = Genre
         fields = '__all__'
 
 
-class PublisherSerializer(serializers.ModelSerializer):
+class PublisherSerializer(MinimalWriteMixin, serializers.ModelSerializer):
     class Meta:
         model = Publisher
         fields = '__all__'
 
 
-class BookSerializer(serializers.ModelSerializer):
-    author = serializers.PrimaryKeyRelatedField(queryset=Author.objects.all())
-    publisher = serializers.PrimaryKeyRelatedField(queryset=Publisher.objects.all(), allow_null=True)
-    genres = serializers.PrimaryKeyRelatedField(queryset=Genre.objects.all(), many=True)
+class BookSerializer(MinimalWriteMixin, serializers.ModelSerializer):
+    author = serializers.PrimaryKeyRelatedField(queryset=Author.alive.all())
+    publisher = RegistryRelatedField(Publisher, allow_null=True)
+    genres = BulkManyRelatedField(child_relation=RegistryRelatedField(Genre))
     author_detail = AuthorSerializer(source='author', read_only=True)
     publisher_detail = PublisherSerializer(source='publisher', read_only=True)
     genres_list = GenreSerializer(source='genres', many=True, read_only=True)
@@ -88,20 +216,42 @@ class BookSerializer(serializers.ModelSerializer):
             'published_date': {'required': False, 'allow_null': True},
         }
         
-    def validate_author(self, value):
-        if Book.objects.filter(author=value).exists():
-            if self.instance and self.instance.author == value:
-                return value
-            
-            raise serializers.ValidationError(
-                "Bu muallif (Author) allaqachon bitta kitob yozgan. Har bir muallif faqat bitta kitob yarata oladi."
-            )
-            
-        return value
+    # "Bir muallif - bitta kitob" qoidasini unique_book_per_author cheklovi ta'minlaydi:
+    # oldindan exists() so'rovi yo'q, parallel so'rovlar ham qoidani buzolmaydi
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            self.raise_conflict(validated_data)
 
+    def update(self, instance, validated_data):
+        # Unikal ustunlar o'zgarmasa savepoint kerak emas
+        author = validated_data.get('author')
+        if (author is None or author.pk == instance.author_id) and validated_data.get('isbn', instance.isbn) == instance.isbn:
+            return super().update(instance, validated_data)
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            self.raise_conflict(validated_data, instance)
 
-class ReviewSerializer(serializers.ModelSerializer):
-    book = serializers.PrimaryKeyRelatedField(queryset=Book.objects.all())
+    def raise_conflict(self, validated_data, instance=None):
+        # Qaysi cheklov buzilgani keyin aniqlanadi (masalan, ISBN poygasi): har qanday holatda 400
+        others = Book.alive.all()
+        if instance is not None:
+            others = others.exclude(pk=instance.pk)
+        author = validated_data.get('author')
+        if author is not None and others.filter(author=author).exists():
+            raise serializers.ValidationError({'author': [AUTHOR_TAKEN_MESSAGE]})
+        isbn = validated_data.get('isbn')
+        if isbn and Book.objects.filter(isbn=isbn).exclude(pk=getattr(instance, 'pk', None)).exists():
+            raise serializers.ValidationError({'isbn': [ISBN_TAKEN_MESSAGE]})
+        raise serializers.ValidationError({'non_field_errors': [CONFLICT_MESSAGE]})
+
+
+class ReviewSerializer(MinimalWriteMixin, serializers.ModelSerializer):
+    book = serializers.PrimaryKeyRelatedField(queryset=Book.alive.all())
     book_title = serializers.CharField(source='book.title', read_only=True)
     
 
@@ -113,4 +263,52 @@ class ReviewSerializer(serializers.ModelSerializer):
             'id', 'book', 'book_title', 
             'reviewer_name', 'rating', 'comment', 'created_at'
         ]
-        read_only_fields = ['created_at']
\ No newline at end of file
+        read_only_fields = ['created_at']
+
+
+class ReviewIngestSerializer(serializers.ModelSerializer):
+    # Buferlangan rejim: Book obyekti yuklanmaydi, sharh esa ReviewStaging ga yoziladi (app.ingest)
+    book = serializers.IntegerField(source='book_id')
+    rating = serializers.IntegerField(min_value=1, max_value=5)
+
+    class Meta:
+        model = ReviewStaging
+        fields = ['id', 'book', 'reviewer_name', 'rating', 'comment']
+
+    def validate_book(self, value):
+        if not ingest.book_exists(value):
+            raise serializers.ValidationError(f"«{value}» ID li kitob topilmadi.")
+        return value
+
+    def create(self, validated_data):
+        return ingest.submit(validated_data)
+
+
+class ReviewSnippetSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Review
+        fields = ['id', 'reviewer_name', 'rating', 'comment', 'created_at']
+
+
+class GenreTopBookSerializer(serializers.ModelSerializer):
+    book_title = serializers.CharField(source='book.title', read_only=True)
+
+    class Meta:
+        model = GenreTopBook
+        fields = ['rank', 'book', 'book_title', 'rating_avg', 'review_count']
+
+
+class MostReviewedBookSerializer(serializers.ModelSerializer):
+    book_title = serializers.CharField(source='book.title', read_only=True)
+
+    class Meta:
+        model = MostReviewedBook
+        fields = ['rank', 'book', 'book_title', 'review_count', 'window_start']
+
+
+class PublisherRankingSerializer(serializers.ModelSerializer):
+    publisher_name = serializers.CharField(source='publisher.name', read_only=True)
+
+    class Meta:
+        model = PublisherRanking
+        fields = ['rank', 'publisher', 'publisher_name', 'book_count']
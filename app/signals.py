@@ -0,0 +1,145 @@
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import changes, jobs, leaderboards, object_cache, registry
+from .models import Author, Book, ChangeLog, Genre, Publisher, Review
+
+
+# Kitob javobida publisher_detail va genres_list ham bor
+RELATED_BOOK_LOOKUPS = {Publisher: 'publisher', Genre: 'genres'}
+
+INVALIDATE_BOOKS_JOB = 'object_cache.invalidate_books'
+INVALIDATE_RELATED_BOOKS_JOB = 'object_cache.invalidate_related_books'
+
+
+def related_book_ids(sender, pk):
+    return Book.objects.filter(**{RELATED_BOOK_LOOKUPS[sender]: pk}).values_list('pk', flat=True)
+
+
+def touch_books(queryset):
+    # Eksport qatorida reyting, muallif, nashriyot va janr nomlari bor: ular o'zgarsa kitobning updated_at i ham
+    # yangilanadi (eksport --since). Bitta UPDATE, signal va ChangeLog siz
+    return queryset.update(updated_at=timezone.now())
+
+
+# Minglab kitoblarga tarqaladigan invalidatsiya so'rov vaqtida emas, fon vazifasida bajariladi
+@jobs.register(INVALIDATE_BOOKS_JOB)
+def invalidate_books(ids):
+    touch_books(Book.objects.filter(pk__in=ids))
+    object_cache.invalidate(Book, ids)
+
+
+@jobs.register(INVALIDATE_RELATED_BOOKS_JOB)
+def invalidate_related_books_of(model, pk):
+    ids = list(related_book_ids(apps.get_model(model), pk))
+    touch_books(Book.objects.filter(pk__in=ids))
+    object_cache.invalidate(Book, ids)
+
+
+def schedule_leaderboard_refresh():
+    # Sharh/kitob o'zgarsa ham leaderboard MAX_STALENESS dan ko'p eskirmaydi; navbatda bitta vazifa
+    if settings.LEADERBOARD_AUTO_REFRESH:
+        leaderboards.schedule_refresh(delay=settings.LEADERBOARD_MAX_STALENESS)
+
+
+@receiver([post_save, post_delete], sender=Book)
+def invalidate_book(sender, instance, **kwargs):
+    object_cache.invalidate(Book, [instance.pk])
+    schedule_leaderboard_refresh()
+
+
+@receiver([post_save, post_delete], sender=Review)
+def review_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        touch_books(Book.objects.filter(pk=instance.book_id))
+    schedule_leaderboard_refresh()
+
+
+@receiver([post_save, post_delete], sender=Author)
+def invalidate_author(sender, instance, created=False, **kwargs):
+    object_cache.invalidate(Author, [instance.pk])
+    # Kitob javobida author_detail bor; har bir muallifda ko'pi bilan bitta kitob, shuning uchun shu yerda
+    if not created:
+        books = Book.objects.filter(author=instance)
+        touch_books(books)
+        object_cache.invalidate(Book, books.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Publisher)
+@receiver(post_save, sender=Genre)
+def invalidate_related_books(sender, instance, created=False, **kwargs):
+    if not created:
+        jobs.enqueue(INVALIDATE_RELATED_BOOKS_JOB, {'model': sender._meta.label, 'pk': instance.pk})
+
+
+@receiver([post_save, post_delete], sender=Publisher)
+@receiver([post_save, post_delete], sender=Genre)
+def bump_registry(sender, instance, **kwargs):
+    # Shu workerda darhol; commit dan keyin yana - boshqa workerlar commit qilinmagan holatni yuklab qo'ymasin
+    reference = registry.for_model(sender)
+    reference.bump()
+    transaction.on_commit(reference.bump)
+
+
+@receiver(pre_delete, sender=Publisher)
+@receiver(pre_delete, sender=Genre)
+def remember_related_books(sender, instance, **kwargs):
+    # O'chirishdan keyin bog'lanishlar yo'qoladi, shuning uchun kitoblar oldindan eslab qolinadi
+    instance._related_book_ids = list(related_book_ids(sender, instance.pk))
+
+
+@receiver(post_delete, sender=Publisher)
+@receiver(post_delete, sender=Genre)
+def invalidate_deleted_related_books(sender, instance, **kwargs):
+    ids = getattr(instance, '_related_book_ids', [])
+    if ids:
+        jobs.enqueue(INVALIDATE_BOOKS_JOB, {'ids': ids})
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Publisher)
+@receiver(post_save, sender=Review)
+def record_upsert(sender, instance, raw=False, **kwargs):
+    if not raw:
+        changes.record(instance, ChangeLog.UPSERT)
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Publisher)
+@receiver(post_delete, sender=Review)
+def record_delete(sender, instance, **kwargs):
+    changes.record(instance, ChangeLog.DELETE)
+
+
+@receiver(m2m_changed, sender=Book.genres.through)
+def record_book_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    # Kitob javobidagi genres ro'yxati o'zgaradi
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        changes.record(instance, ChangeLog.UPSERT)
+    elif action == 'pre_clear':
+        changes.record_many(Book, instance.books.values_list('pk', flat=True))
+    elif pk_set:
+        changes.record_many(Book, pk_set)
+
+
+@receiver(m2m_changed, sender=Book.genres.through)
+def invalidate_book_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        touch_books(Book.objects.filter(pk=instance.pk))
+        object_cache.invalidate(Book, [instance.pk])
+    elif action == 'pre_clear':
+        jobs.enqueue(INVALIDATE_BOOKS_JOB, {'ids': list(instance.books.values_list('pk', flat=True))})
+    elif pk_set:
+        jobs.enqueue(INVALIDATE_BOOKS_JOB, {'ids': list(pk_set)})
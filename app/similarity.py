@@ -0,0 +1,252 @@
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Avg, Count
+from django.utils import timezone
+
+from . import changes, metrics
+from .models import Book, ChangeLog, Genre, Review
+
+
+# Kitob vektori: janrlar one-hot + o'rtacha baho va mashhurlik; qatorlar L2 bo'yicha normallangan,
+# shuning uchun kosinus o'xshashlik bitta matritsa-vektor ko'paytmasi
+CURRENT_FILE = 'CURRENT'
+VERSION_FORMAT = '%Y%m%d%H%M%S%f'
+ARRAYS = ('book_ids', 'publisher_ids', 'features')
+
+_lock = threading.Lock()
+_loaded = None
+_checked_at = 0.0
+
+
+class Index:
+    def __init__(self, path, meta, book_ids, publisher_ids, features):
+        self.path = path
+        self.meta = meta
+        self.book_ids = book_ids
+        self.publisher_ids = publisher_ids
+        self.features = features
+
+    def row(self, book_id):
+        row = int(np.searchsorted(self.book_ids, book_id))
+        if row < len(self.book_ids) and self.book_ids[row] == book_id:
+            return row
+        return None
+
+    def similar(self, book_id, limit):
+        row = self.row(book_id)
+        if row is None:
+            return None
+        scores = self.features @ self.features[row]
+        weight = settings.SIMILARITY_PUBLISHER_WEIGHT
+        if weight and self.publisher_ids[row]:
+            scores += weight * (self.publisher_ids == self.publisher_ids[row])
+        scores[row] = -np.inf
+        limit = min(limit, len(scores) - 1)
+        if limit < 1:
+            return []
+        # To'liq saralash o'rniga O(n) argpartition, keyin faqat top-k saralanadi
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(self.book_ids[i]), float(scores[i])) for i in top]
+
+
+def index_dir():
+    return str(settings.SIMILARITY_INDEX_DIR)
+
+
+def current_version():
+    try:
+        with open(os.path.join(index_dir(), CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load(version):
+    path = os.path.join(index_dir(), version)
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    # mmap: fayl sahifalari OS keshida, barcha worker jarayonlari bitta nusxadan o'qiydi
+    arrays = [np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in ARRAYS]
+    return Index(path, meta, *arrays)
+
+
+def get_index():
+    global _loaded, _checked_at
+    now = time.monotonic()
+    if _loaded is not None and now - _checked_at < settings.SIMILARITY_RELOAD_INTERVAL:
+        return _loaded
+    version = current_version()
+    with _lock:
+        if version is None:
+            _loaded = None
+        elif _loaded is None or _loaded.meta['version'] != version:
+            _loaded = load(version)
+            metrics.incr('similarity.reloads')
+        _checked_at = now
+    return _loaded
+
+
+def genre_columns(genre_ids):
+    return {genre_id: col for col, genre_id in enumerate(genre_ids)}
+
+
+def book_rows(book_ids=None):
+    books = Book.alive.order_by('pk')
+    if book_ids is not None:
+        books = books.filter(pk__in=book_ids)
+    rows = list(books.values_list('pk', 'publisher_id').iterator(chunk_size=20000))
+    ids = np.fromiter((pk for pk, _ in rows), dtype=np.int64, count=len(rows))
+    publishers = np.fromiter((publisher_id or 0 for _, publisher_id in rows), dtype=np.int64, count=len(rows))
+    return ids, publishers
+
+
+def genre_features(book_ids, columns):
+    # book_ids tartiblangan bo'lishi kerak: qator raqami searchsorted bilan topiladi
+    features = np.zeros((len(book_ids), len(columns) + 2), dtype=np.float32)
+    if not len(book_ids):
+        return features
+    links = Book.genres.through.objects.order_by()
+    if len(book_ids) < settings.SIMILARITY_FULL_SCAN_THRESHOLD:
+        links = links.filter(book_id__in=book_ids.tolist())
+    links = np.array(list(links.values_list('book_id', 'genre_id').iterator(chunk_size=50000)), dtype=np.int64)
+    if len(links):
+        rows = np.searchsorted(book_ids, links[:, 0]).clip(max=len(book_ids) - 1)
+        known = book_ids[rows] == links[:, 0]
+        cols = np.array([columns.get(genre_id, -1) for genre_id in links[:, 1].tolist()], dtype=np.int64)
+        keep = known & (cols >= 0)
+        features[rows[keep], cols[keep]] = settings.SIMILARITY_GENRE_WEIGHT
+    return features
+
+
+def apply_review_stats(book_ids, features, max_reviews):
+    if not len(book_ids):
+        return max_reviews
+    stats = Review.objects.order_by().values('book_id').annotate(avg=Avg('rating'), count=Count('id'))
+    if len(book_ids) < settings.SIMILARITY_FULL_SCAN_THRESHOLD:
+        stats = stats.filter(book_id__in=book_ids.tolist())
+    stats = np.array(
+        [(row['book_id'], row['avg'], row['count']) for row in stats.iterator(chunk_size=50000)], dtype=np.float64,
+    ).reshape(-1, 3)
+    if len(stats):
+        book_col = stats[:, 0].astype(np.int64)
+        rows = np.searchsorted(book_ids, book_col).clip(max=len(book_ids) - 1)
+        keep = book_ids[rows] == book_col
+        max_reviews = max(max_reviews, int(stats[keep, 2].max(initial=0)))
+        # Baho 3 atrofida markazlashtiriladi: [-1, 1]
+        features[rows[keep], -2] = settings.SIMILARITY_RATING_WEIGHT * (stats[keep, 1] - 3) / 2
+        features[rows[keep], -1] = (
+            settings.SIMILARITY_POPULARITY_WEIGHT * np.log1p(stats[keep, 2]) / np.log1p(max(max_reviews, 1))
+        )
+    return max_reviews
+
+
+def normalize(features):
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    np.divide(features, norms, out=features, where=norms > 0)
+    return features
+
+
+def build_full():
+    cursor = changes.latest_cursor()
+    genre_ids = list(Genre.objects.order_by('pk').values_list('pk', flat=True))
+    book_ids, publisher_ids = book_rows()
+    features = genre_features(book_ids, genre_columns(genre_ids))
+    max_reviews = apply_review_stats(book_ids, features, 0)
+    meta = {'genre_ids': genre_ids, 'cursor': cursor, 'max_reviews': max_reviews}
+    return write(meta, book_ids, publisher_ids, normalize(features))
+
+
+def build_incremental():
+    # (versiya, qayta hisoblangan kitoblar soni yoki to'liq qurilgan bo'lsa None, sharh statistikasi to'liq yangilandimi)
+    index = get_index()
+    if index is None or index.meta['cursor'] < changes.horizon():
+        return build_full(), None, True
+
+    cursor = changes.latest_cursor()
+    entries = ChangeLog.objects.filter(pk__gt=index.meta['cursor'], pk__lte=cursor)
+    touched = {}
+    for model_name, action, object_id in entries.values_list('model_name', 'action', 'object_id').iterator():
+        touched.setdefault((model_name, action), set()).add(object_id)
+    # Yangi janr ustun qo'shadi, janr/nashriyot o'chirilishi esa kitoblarni signalsiz o'zgartiradi (CASCADE/SET NULL)
+    if touched.get(('genre', ChangeLog.UPSERT), set()) - set(index.meta['genre_ids']) or any(
+        (name, ChangeLog.DELETE) in touched for name in ('genre', 'publisher')
+    ):
+        return build_full(), None, True
+
+    changed = touched.get(('book', ChangeLog.UPSERT), set()) | touched.get(('book', ChangeLog.DELETE), set())
+    reviewed = touched.get(('review', ChangeLog.UPSERT), set())
+    if reviewed:
+        changed |= set(Review.objects.filter(pk__in=reviewed).values_list('book_id', flat=True))
+    # O'chirilgan sharh qaysi kitobniki ekanini jurnal bilmaydi: baho ustunlari barcha kitoblar uchun yangilanadi
+    restat = ('review', ChangeLog.DELETE) in touched
+    if not changed and not restat:
+        return index.meta['version'], 0, False
+
+    changed = np.array(sorted(changed), dtype=np.int64)
+    fresh_ids, fresh_publishers = book_rows(changed.tolist())
+    fresh = genre_features(fresh_ids, genre_columns(index.meta['genre_ids']))
+
+    # O'zgarmagan qatorlar eski indeksdan olinadi, o'zgarganlari (va o'chirilganlari) almashtiriladi
+    keep = ~np.isin(index.book_ids, changed)
+    book_ids = np.concatenate([index.book_ids[keep], fresh_ids])
+    publisher_ids = np.concatenate([index.publisher_ids[keep], fresh_publishers])
+    if restat:
+        # Normallangan qatordan janrlar qismi qayta tiklanadi (nol bo'lmagan ustunlar = kitob janrlari)
+        kept = np.zeros((int(keep.sum()), fresh.shape[1]), dtype=np.float32)
+        kept[:, :-2] = (index.features[keep, :-2] > 0) * settings.SIMILARITY_GENRE_WEIGHT
+        features = np.concatenate([kept, fresh])
+    else:
+        max_reviews = apply_review_stats(fresh_ids, fresh, index.meta['max_reviews'])
+        features = np.concatenate([index.features[keep], normalize(fresh)])
+
+    order = np.argsort(book_ids, kind='stable')
+    book_ids, publisher_ids, features = book_ids[order], publisher_ids[order], features[order]
+    if restat:
+        max_reviews = apply_review_stats(book_ids, features, 0)
+        normalize(features)
+    meta = dict(index.meta, cursor=cursor, max_reviews=max_reviews)
+    return write(meta, book_ids, publisher_ids, features), len(changed), restat
+
+
+def write(meta, book_ids, publisher_ids, features):
+    root = index_dir()
+    os.makedirs(root, exist_ok=True)
+    version = timezone.now().strftime(VERSION_FORMAT)
+    path = os.path.join(root, version)
+    os.makedirs(path)
+    for name, array in zip(ARRAYS, (book_ids, publisher_ids, features)):
+        np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(dict(meta, version=version, books=len(book_ids)), f)
+
+    # Workerlar CURRENT ni o'qiydi: almashtirish atomar, eski fayllar ochiq mmap lar uchun saqlanib qoladi
+    previous = current_version()
+    tmp = os.path.join(root, f'{CURRENT_FILE}.tmp')
+    with open(tmp, 'w') as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(root, CURRENT_FILE))
+    prune(root, previous)
+    return version
+
+
+def prune(root, previous):
+    # Almashtirishdan oldingi versiya (previous) va undan yangilari qoladi: worker uni CURRENT dan hozirgina o'qib,
+    # endi ochayotgan bo'lishi mumkin. Eskirog'i esa o'rnini bosgan versiya SIMILARITY_PRUNE_GRACE soniyadan
+    # oldin yozilgan bo'lsagina o'chiriladi (ketma-ket tez qurishlarda ham)
+    if not previous:
+        return
+    versions = sorted(name for name in os.listdir(root) if name.isdigit())
+    expired = set(versions[:max(len(versions) - settings.SIMILARITY_KEEP_VERSIONS, 0)])
+    cutoff = timezone.now() - timedelta(seconds=settings.SIMILARITY_PRUNE_GRACE)
+    for name, successor in zip(versions, versions[1:]):
+        replaced_at = datetime.strptime(successor, VERSION_FORMAT).replace(tzinfo=dt_timezone.utc)
+        if name in expired and name < previous and replaced_at < cutoff:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
@@ -1,16 +1,41 @@
-from django.test import TestCase
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
+from rest_framework.response import Response
+from django.http import HttpResponse
 from rest_framework.test import APITestCase
 from rest_framework import status
+from rest_framework.exceptions import ValidationError as APIValidationError
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
-from datetime import date 
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock, skipIf, skipUnless
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
 # Model validatsiyasi uchun qo'shildi
 from django.core.exceptions import ValidationError 
+from django.db import OperationalError, connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 
-from .models import Author, Book, Genre, Publisher, Review
+from . import (
+    caching, changes, compression, deletion, ingest, jobs, leaderboards, load, metrics, object_cache, partitions, registry,
+    similarity,
+)
+from .models import Author, Book, ChangeLog, Genre, Publisher, Review, ReviewStaging, GenreTopBook, Job
+from .pagination import EstimatedCountPaginator
 from .serializers import AuthorSerializer, BookSerializer, GenreSerializer, PublisherSerializer, ReviewSerializer
+from .validators import CommonPasswordValidator
 
 
 # =============================
@@ -92,6 +117,8 @@ class AuthorSerializerTest(TestCase):
 # =============================
 class BaseAPITestCase(APITestCase):
     def setUp(self):
+        # Xotiradagi test keshi (config.test_runner) testlar orasida tozalanadi
+        cache.clear()
         self.user = User.objects.create_user(username='testuser', password='password123')
         refresh = RefreshToken.for_user(self.user)
         self.access_token = str(refresh.access_token)
@@ -121,6 +148,39 @@ class BaseAPITestCase(APITestCase):
         }
 
 
+class RegistrationAPITest(APITestCase):
+    def register(self, username, email, password="Kuchli-parol-2024"):
+        return self.client.post(
+            reverse('register_user'), {'username': username, 'email': email, 'password': password}, format='json')
+
+    def test_duplicate_email_rejected_by_index(self):
+        self.assertEqual(self.register('ali', 'Ali@gmail.com').status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.register('vali', 'ali@gmail.com')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data['errors'])
+        self.assertEqual(User.objects.count(), 1)
+        user_queries = [q['sql'] for q in queries if '"email"' in q['sql']]
+        self.assertTrue(user_queries[0].startswith('INSERT'))
+
+    def test_users_without_email_do_not_conflict(self):
+        User.objects.create_user(username='a', password='x')
+        User.objects.create_user(username='b', password='x')
+        self.assertEqual(User.objects.filter(email='').count(), 2)
+
+    def test_common_password_rejected(self):
+        response = self.register('ali', 'ali@gmail.com', password='Password123')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(User.objects.count(), 0)
+
+        validator = CommonPasswordValidator()
+        self.assertIs(validator.hashes, CommonPasswordValidator().hashes)
+        with self.assertRaises(ValidationError):
+            validator.validate(' Password123')
+        validator.validate('Kuchli-parol-2024')
+
+
 class AuthorAPITest(BaseAPITestCase):
     def test_author_create(self):
         url = self.get_urls('Author')['create']
@@ -157,7 +217,7 @@ class BookAPITest(BaseAPITestCase):
         url = self.get_urls('Book')['create']
         data = {
             'title': 'New Book', 
-            'author': self.author.pk, 
+            'author': Author.objects.create(last_name="New").pk, 
             'publisher': self.publisher.pk, 
             'genres': [self.genre.pk]
         }
@@ -173,6 +233,721 @@ class BookAPITest(BaseAPITestCase):
         self.book.refresh_from_db()
         self.assertEqual(self.book.title, 'Updated Title')
 
+    def test_one_book_per_author_enforced_by_constraint(self):
+        url = self.get_urls('Book')['create']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                url, {'title': "Ikkinchi", 'author': self.author.pk, 'publisher': None, 'genres': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        book_queries = [q['sql'] for q in queries if '"app_book"' in q['sql']]
+        self.assertTrue(book_queries[0].startswith('INSERT'))
+        self.assertIn("faqat bitta kitob", str(response.data['errors']['author'][0]))
+        self.assertEqual(Book.objects.count(), 1)
+
+        other = Book.objects.create(title="Boshqa", author=Author.objects.create(last_name="B"))
+        url = self.get_urls('Book', other.pk)['update']
+        response = self.client.patch(url, {'author': self.author.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('author', response.data['errors'])
+        other.refresh_from_db()
+        self.assertNotEqual(other.author_id, self.author.pk)
+
+        response = self.client.patch(url, {'author': other.author_id, 'title': "Yangi"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_isbn_race_reported_as_validation_error(self):
+        serializer = BookSerializer(data={
+            'title': "Poyga", 'author': Author.objects.create(last_name="R").pk, 'publisher': None, 'genres': [],
+            'isbn': "9780000000002",
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        # Tekshiruvdan keyin parallel so'rov shu ISBN ni egalladi
+        Book.objects.create(title="Birinchi", author=Author.objects.create(last_name="S"), isbn="9780000000002")
+        with self.assertRaises(APIValidationError) as raised:
+            serializer.save()
+        self.assertIn('isbn', raised.exception.detail)
+
+
+class DeletionAPITest(BaseAPITestCase):
+    def add_reviews(self, n):
+        Review.objects.bulk_create(Review(book=self.book, reviewer_name=f"U{i}", rating=3) for i in range(n))
+
+    def test_inline_delete_does_not_load_reviews(self):
+        self.add_reviews(50)
+        review_ids = list(Review.objects.values_list('pk', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(self.get_urls('Author', self.author.pk)['delete'])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        # Sharhlar soni so'rovlar soniga ta'sir qilmaydi
+        self.assertLess(len(queries), 25)
+        self.assertFalse(Book.objects.exists())
+        self.assertFalse(Review.objects.exists())
+        self.assertFalse(Book.genres.through.objects.exists())
+        deleted = set(ChangeLog.objects.filter(action=ChangeLog.DELETE).values_list('model_name', 'object_id'))
+        self.assertLessEqual({('author', self.author.pk), ('book', self.book.pk)} | {('review', pk) for pk in review_ids},
+                             deleted)
+
+    @override_settings(DELETE_INLINE_LIMIT=10, DELETE_PURGE_BATCH_SIZE=7)
+    def test_large_book_is_hidden_then_purged(self):
+        self.add_reviews(20)
+        response = self.client.delete(self.get_urls('Book', self.book.pk)['delete'])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Review.objects.count(), 21)
+        self.assertTrue(Book.objects.filter(pk=self.book.pk, is_deleted=True).exists())
+        self.assertEqual(self.client.get(self.get_urls('Book', self.book.pk)['detail']).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(self.get_urls('Review', self.review.pk)['detail']).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.delete(self.get_urls('Book', self.book.pk)['delete']).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+        # Muallif tozalanishni kutmasdan yangi kitob yoza oladi, ISBN ham bo'shatilgan
+        response = self.client.post(self.get_urls('Book')['create'], {
+            'title': "Yangi", 'author': self.author.pk, 'publisher': None, 'isbn': "9998887776665", 'genres': [],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        jobs.run_pending()
+        self.assertFalse(Book.objects.filter(pk=self.book.pk).exists())
+        self.assertFalse(Review.objects.exists())
+        self.assertEqual(Book.objects.get().title, "Yangi")
+        self.assertEqual(ChangeLog.objects.filter(model_name='review', action=ChangeLog.DELETE).count(), 21)
+
+    @override_settings(DELETE_INLINE_LIMIT=0)
+    def test_purge_skips_restored_rows(self):
+        self.client.delete(self.get_urls('Author', self.author.pk)['delete'])
+        self.assertFalse(Author.alive.exists())
+        Author.objects.update(is_deleted=False)
+        jobs.run_pending()
+        self.assertTrue(Author.objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(Review.objects.count(), 1)
+
+    @override_settings(DELETE_INLINE_LIMIT=10, DELETE_PURGE_BATCH_SIZE=7)
+    def test_purge_commits_each_batch(self):
+        self.add_reviews(20)
+        self.client.delete(self.get_urls('Book', self.book.pk)['delete'])
+        record_many = changes.record_many
+        calls = []
+
+        def fail_second_batch(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise OperationalError("uzilish")
+            return record_many(*args, **kwargs)
+
+        with mock.patch.object(deletion.changes, 'record_many', side_effect=fail_second_batch):
+            with self.assertRaises(OperationalError):
+                deletion.purge_job('app.Book', [self.book.pk])
+        # Birinchi bo'lak saqlanib qoladi, qayta ishga tushirish qolganidan davom etadi
+        self.assertEqual(Review.objects.count(), 14)
+        self.assertTrue(Book.objects.filter(pk=self.book.pk, is_deleted=True).exists())
+        deletion.purge_job('app.Book', [self.book.pk])
+        self.assertFalse(Book.objects.filter(pk=self.book.pk).exists())
+        self.assertFalse(Review.objects.exists())
+
+    def test_default_manager_keeps_deleted_rows(self):
+        Book.objects.filter(pk=self.book.pk).update(is_deleted=True)
+        # Admin, teskari bog'lanishlar va import o'chirilgan qatorlarni ko'radi; API esa alive orqali o'qiydi
+        self.assertEqual(list(self.author.books.all()), [self.book])
+        self.assertTrue(Book.objects.filter(pk=self.book.pk).exists())
+        self.assertFalse(Book.alive.filter(pk=self.book.pk).exists())
+        self.assertEqual(self.client.get(self.get_urls('Book', self.book.pk)['detail']).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+
+class WriteQueryBudgetTest(BaseAPITestCase):
+    # Byudjetga JWT foydalanuvchisi SELECT i, transaction.atomic ning SAVEPOINT/RELEASE i va ChangeLog INSERT i ham kiradi
+    # (sharh, muallif yoki janrlar o'zgarsa kitoblarning updated_at i uchun bitta UPDATE ham - signals.touch_books)
+    def assertWriteQueries(self, budget, method, url, payload, expected_status):
+        # Genre/Publisher reyestri har bir workerda bir marta yuklanadi: byudjetga kirmaydi
+        registry.GENRES.all()
+        registry.PUBLISHERS.all()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, payload, format='json')
+        self.assertEqual(response.status_code, expected_status, response.data)
+        self.assertLessEqual(len(queries), budget, "\n".join(q['sql'] for q in queries))
+        return response, queries
+
+    def test_create_budgets(self):
+        new_author = Author.objects.create(last_name="New")
+        cases = [
+            ('author_create', {'first_name': "A", 'last_name': "B"}, 5),
+            ('genre_create', {'name': "Yangi janr"}, 6),
+            ('publisher_create', {'name': "Yangi nashriyot"}, 5),
+            ('review_create', {'book': self.book.pk, 'reviewer_name': "Ali", 'rating': 4}, 7),
+            ('book_create', {
+                'title': "Yangi", 'author': new_author.pk, 'publisher': self.publisher.pk,
+                'genres': [self.genre.pk], 'isbn': "9780000000001",
+            }, 11),
+        ]
+        for name, payload, budget in cases:
+            with self.subTest(name):
+                self.assertWriteQueries(budget, 'post', reverse(name), payload, status.HTTP_201_CREATED)
+
+    def test_update_budgets(self):
+        cases = [
+            ('author_update', self.author.pk, {'bio': "Yangi"}, 8),
+            ('genre_update', self.genre.pk, {'name': "Janr"}, 8),
+            ('publisher_update', self.publisher.pk, {'name': "Nashriyot"}, 7),
+            ('review_update', self.review.pk, {'rating': 3}, 7),
+            ('book_update', self.book.pk, {'title': "Yangi nom"}, 7),
+        ]
+        for name, pk, payload, budget in cases:
+            with self.subTest(name):
+                self.assertWriteQueries(budget, 'patch', reverse(name, kwargs={'pk': pk}), payload, status.HTTP_200_OK)
+
+    def test_book_update_writes_only_changed_columns(self):
+        url = reverse('book_update', kwargs={'pk': self.book.pk})
+        _, queries = self.assertWriteQueries(7, 'patch', url, {'title': "Yangi nom"}, status.HTTP_200_OK)
+        update = next(q['sql'] for q in queries if q['sql'].startswith('UPDATE'))
+        self.assertIn('"title"', update)
+        self.assertNotIn('"isbn"', update)
+
+        _, queries = self.assertWriteQueries(5, 'patch', url, {'title': "Yangi nom"}, status.HTTP_200_OK)
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE')])
+
+    def test_book_genres_applied_as_diff(self):
+        other = Genre.objects.create(name="Boshqa")
+        Through = Book.genres.through
+        kept = Through.objects.get(book=self.book, genre=self.genre).pk
+        url = reverse('book_update', kwargs={'pk': self.book.pk})
+        response, _ = self.assertWriteQueries(
+            9, 'patch', url, {'genres': [self.genre.pk, other.pk]}, status.HTTP_200_OK)
+
+        self.assertEqual([g['id'] for g in response.data['data']['genres_list']], [self.genre.pk, other.pk])
+        self.assertTrue(Through.objects.filter(pk=kept).exists())
+
+        response, _ = self.assertWriteQueries(8, 'patch', url, {'genres': [other.pk]}, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['genres'], [other.pk])
+        self.assertEqual(list(self.book.genres.values_list('pk', flat=True)), [other.pk])
+
+    def test_book_genres_change_touches_updated_at(self):
+        before = Book.objects.get(pk=self.book.pk).updated_at
+        other = Genre.objects.create(name="Boshqa")
+        url = reverse('book_update', kwargs={'pk': self.book.pk})
+        self.client.patch(url, {'genres': [other.pk]}, format='json')
+        self.assertGreater(Book.objects.get(pk=self.book.pk).updated_at, before)
+
+
+class ReferenceRegistryTest(BaseAPITestCase):
+    def reference_queries(self, queries):
+        return [q['sql'] for q in queries if 'FROM "app_genre"' in q['sql'] or 'FROM "app_publisher"' in q['sql']]
+
+    def test_reference_endpoints_served_from_memory(self):
+        registry.GENRES.all()
+        registry.PUBLISHERS.all()
+        with CaptureQueriesContext(connection) as queries:
+            for name, pk in [('genre', self.genre.pk), ('publisher', self.publisher.pk)]:
+                self.assertEqual(self.client.get(reverse(f'{name}_detail', kwargs={'pk': pk})).status_code, 200)
+                self.assertEqual(len(self.client.get(reverse(f'{name}_list_detail')).data), 1)
+            response = self.client.get(reverse('book_list_detail'), {'ids': str(self.book.pk)})
+        self.assertEqual(response.data['data'][0]['publisher_detail']['name'], "Old Publisher")
+        self.assertEqual([g['name'] for g in response.data['data'][0]['genres_list']], ["Old Genre"])
+        self.assertEqual(self.reference_queries(queries), [])
+
+    def test_version_bump_reloads_registry(self):
+        registry.GENRES.all()
+        url = reverse('genre_detail', kwargs={'pk': self.genre.pk})
+        self.client.patch(reverse('genre_update', kwargs={'pk': self.genre.pk}), {'name': "Drama"}, format='json')
+        self.assertEqual(self.client.get(url).data['data']['name'], "Drama")
+
+        # Boshqa worker o'zgartirgan holat: faqat umumiy hisoblagich oshadi
+        Genre.objects.filter(pk=self.genre.pk).update(name="Komediya")
+        cache.incr(registry.GENRES.version_key)
+        with override_settings(REGISTRY_CHECK_INTERVAL=0):
+            self.assertEqual(registry.GENRES.get(self.genre.pk).name, "Komediya")
+
+    def test_unknown_reference_id_rejected(self):
+        response = self.client.post(reverse('book_create'), {
+            'title': "Yangi", 'author': Author.objects.create(last_name="N").pk, 'publisher': 999, 'genres': [998],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data['errors']), {'publisher', 'genres'})
+
+
+class BatchAPITest(BaseAPITestCase):
+    def test_book_batch_only_queries_cache_misses(self):
+        other = Book.objects.create(title="Other", author=Author.objects.create(last_name="B"))
+        response = self.client.get(reverse('book_list_detail'), {'ids': f"{self.book.pk},999"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([b['id'] for b in response.data['data']], [self.book.pk])
+        self.assertEqual(response.data['missing'], [999])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('book_batch'), {'ids': [other.pk, self.book.pk]}, format='json')
+        self.assertEqual([b['title'] for b in response.data['data']], ["Other", "Old Book"])
+        book_queries = [q['sql'] for q in queries.captured_queries if 'FROM "app_book"' in q['sql']]
+        self.assertEqual(len(book_queries), 1)
+        self.assertIn(f'"app_book"."id" IN ({other.pk})', book_queries[0])
+
+    def test_batch_cache_invalidated_on_save(self):
+        url = reverse('author_batch')
+        self.client.post(url, {'ids': [self.author.pk]}, format='json')
+        self.author.last_name = "Renamed"
+        self.author.save()
+        response = self.client.post(url, {'ids': [self.author.pk]}, format='json')
+        self.assertEqual(response.data['data'][0]['last_name'], "Renamed")
+
+    def test_batch_rejects_invalid_ids(self):
+        response = self.client.get(reverse('author_list_detail'), {'ids': '1,abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ObjectCacheTest(BaseAPITestCase):
+    def book_payload(self):
+        return object_cache.get_many(Book, [self.book.pk]).get(self.book.pk)
+
+    def warm(self):
+        object_cache.fetch_serialized(Book, [self.book.pk], Book.objects.all(), BookSerializer)
+        self.assertIsNotNone(self.book_payload())
+
+    def test_list_page_served_from_object_cache(self):
+        url = self.get_urls('Book')['list']
+        self.client.get(url, {'page': 1})
+        # Boshqa URL: sahifa keshi emas, obyekt keshi ishlaydi
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'page': 1, 'v': 2})
+        self.assertEqual(response.data['results'][0]['title'], "Old Book")
+        self.assertFalse(any('"app_book"."title"' in q['sql'].split('FROM')[0] for q in queries.captured_queries))
+
+    def test_author_change_invalidates_books(self):
+        self.warm()
+        self.author.first_name = "New"
+        self.author.save()
+        self.assertIsNone(self.book_payload())
+
+    def test_genre_m2m_and_rename_invalidate_books(self):
+        self.warm()
+        self.book.genres.remove(self.genre)
+        self.assertIsNone(self.book_payload())
+
+        self.book.genres.add(self.genre)
+        # Janr/nashriyot o'zgarishi barcha kitoblariga tarqaladi: bu fon vazifasida bajariladi
+        self.warm()
+        self.genre.name = "Renamed"
+        self.genre.save()
+        self.assertIsNotNone(self.book_payload())
+        jobs.run_pending()
+        self.assertIsNone(self.book_payload())
+
+        self.warm()
+        self.publisher.delete()
+        jobs.run_pending()
+        self.assertIsNone(self.book_payload())
+
+    def test_invalidation_repeated_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.title = "New"
+            self.book.save()
+            # Parallel o'quvchi commit dan oldin eski qatorni keshga qaytardi
+            object_cache.set_many(Book, {self.book.pk: {'title': "Old Book"}})
+        self.assertIsNone(self.book_payload())
+
+    def test_import_update_invalidates_books(self):
+        self.warm()
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write("isbn,title,author_first_name,author_last_name\n"
+                    f"{self.book.isbn},Imported,{self.author.first_name},{self.author.last_name}\n")
+        self.addCleanup(os.remove, path)
+        call_command('import_catalog', path, stdout=io.StringIO())
+        self.assertIsNone(self.book_payload())
+
+    def test_metrics_report_hit_ratio(self):
+        metrics.reset()
+        object_cache.fetch_serialized(Book, [self.book.pk], Book.objects.all(), BookSerializer)
+        object_cache.fetch_serialized(Book, [self.book.pk], Book.objects.all(), BookSerializer)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('metrics_snapshot'))
+        self.assertEqual(response.data['data']['object_cache.hits'], 1)
+        self.assertEqual(response.data['data']['object_cache.misses'], 1)
+        self.assertEqual(response.data['data']['object_cache.hit_ratio'], 0.5)
+
+
+class BookReviewsAPITest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            Review.objects.create(book=self.book, reviewer_name=f"R{i}", rating=i + 1)
+
+    def test_book_reviews_cursor_pagination(self):
+        url = reverse('book_reviews', kwargs={'pk': self.book.pk})
+        response = self.client.get(url, {'page_size': 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertEqual(response.data['results'][0]['reviewer_name'], "R4")
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([r['reviewer_name'] for r in response.data['results']], ["R0", "Old User"])
+        self.assertIsNone(response.data['next'])
+
+    def test_book_reviews_rating_filter(self):
+        url = reverse('book_reviews', kwargs={'pk': self.book.pk})
+        response = self.client.get(url, {'min_rating': 4})
+        self.assertEqual(sorted(r['rating'] for r in response.data['results']), [4, 5, 5])
+        response = self.client.get(url, {'rating': 9})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_book_detail_embeds_latest_reviews(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('book_detail', kwargs={'pk': self.book.pk}))
+        self.assertEqual(sum('"app_review"' in q['sql'] for q in queries.captured_queries), 1)
+        latest = response.data['data']['latest_reviews']
+        self.assertEqual([r['reviewer_name'] for r in latest], ["R4", "R3", "R2"])
+
+
+class RecentReviewsAPITest(BaseAPITestCase):
+    def test_recent_reviews_window(self):
+        old = Review.objects.create(book=self.book, reviewer_name="Eski", rating=2)
+        Review.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=40))
+
+        response = self.client.get(reverse('review_recent'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['reviewer_name'] for r in response.data['results']], ["Old User"])
+        response = self.client.get(reverse('review_recent'), {'days': 60})
+        self.assertEqual([r['reviewer_name'] for r in response.data['results']], ["Old User", "Eski"])
+        response = self.client.get(reverse('review_recent'), {'days': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CompressionTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        Book.objects.bulk_create([
+            Book(title=f"Kitob {i}", author=Author.objects.create(last_name=f"M{i}"), description="tavsif " * 20)
+            for i in range(10)
+        ])
+
+    def test_negotiate(self):
+        self.assertEqual(compression.negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(compression.negotiate('gzip;q=0, identity'), None)
+        self.assertEqual(compression.negotiate('*'), compression.ENCODINGS[0])
+        self.assertIsNone(compression.negotiate(''))
+
+    def test_cached_response_is_not_recompressed(self):
+        url = reverse('book_list_detail')
+        plain = self.client.get(url).content
+        first = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', first['Vary'])
+        self.assertEqual(gzip.decompress(first.content), plain)
+
+        second = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(second.content, first.content)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['compression.cache_misses'], 1)
+        self.assertEqual(snapshot['compression.cache_hits'], 1)
+
+    def test_uncacheable_responses_compressed_without_storing(self):
+        middleware = compression.CompressionMiddleware(lambda request: None)
+        body = json.dumps({'access': "x" * 2000}).encode()
+        for method, headers in (('post', {}), ('get', {'Cache-Control': 'private, max-age=60'}), ('get', {})):
+            with self.subTest(method=method, headers=headers):
+                request = getattr(RequestFactory(), method)('/api/login/', HTTP_ACCEPT_ENCODING='gzip')
+                response = middleware.process_response(request, HttpResponse(body, headers=headers))
+                self.assertEqual(gzip.decompress(response.content), body)
+        self.assertNotIn('compression.cache_misses', metrics.snapshot())
+
+    @override_settings(COMPRESSION_STREAM_BUFFER=256, COMPRESSION_ROUTE_LEVELS={'book_export': {'gzip': 9}})
+    def test_streaming_export_compressed(self):
+        url = reverse('book_export')
+        plain = b''.join(self.client.get(url, {'output': 'ndjson'}).streaming_content)
+        response = self.client.get(url, {'output': 'ndjson'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), plain)
+
+    def test_small_responses_left_alone(self):
+        response = self.client.get(reverse('genre_list_detail'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+# Lease uchun atomar cache.add kerak: sozlamalardagi FileBasedCache da bu kafolatlanmaydi (app.caching)
+@override_settings(
+    VIEW_CACHE_EARLY_REFRESH_BETA=0,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'view-cache-test'}},
+)
+class ViewCacheTest(TestCase):
+    def setUp(self):
+        # Xotiradagi test keshi (config.test_runner) testlar orasida tozalanadi
+        cache.clear()
+        self.computed = 0
+        self.lock = threading.Lock()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+        @caching.cached_view(60)
+        def slow_view(request):
+            with self.lock:
+                self.computed += 1
+                value = self.computed
+            self.entered.set()
+            self.release.wait(5)
+            return Response({'value': value})
+        self.view = slow_view
+        self.request = RequestFactory().get('/books/', {'page': 1})
+
+    def start(self, results, indexes):
+        def call(i):
+            results[i] = self.view(self.request).data['value']
+        threads = [threading.Thread(target=call, args=(i,)) for i in indexes]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def concurrent(self, count=8, wait_others=False):
+        # Birinchi so'rov lease ni olib, view ichida to'xtab turadi; qolganlari shundan keyin keladi
+        results = [None] * count
+        owner = self.start(results, [0])
+        self.assertTrue(self.entered.wait(5))
+        others = self.start(results, range(1, count))
+        if wait_others:
+            for thread in others:
+                thread.join()
+        self.release.set()
+        for thread in owner + others:
+            thread.join()
+        return results
+
+    def test_cold_miss_computes_once(self):
+        self.assertEqual(self.concurrent(), [1] * 8)
+        self.assertEqual(self.computed, 1)
+
+    def test_expired_entry_recomputed_once_and_stale_served(self):
+        self.release.set()
+        self.view(self.request)
+        self.release.clear()
+        self.entered.clear()
+        key = caching.view_cache_key(self.request, f"{self.view.__module__}.{self.view.__name__}")
+        data, status_code, _, delta = cache.get(key)
+        cache.set(key, (data, status_code, time.time() - 1, delta))
+
+        results = self.concurrent(wait_others=True)
+        self.assertEqual(self.computed, 2)
+        self.assertEqual(results, [2] + [1] * 7)
+        self.assertEqual(self.view(self.request).data['value'], 2)
+
+    @override_settings(VIEW_CACHE_LEASE_TIMEOUT=0.2, VIEW_CACHE_WAIT_INTERVAL=0.05)
+    def test_wait_timeout_leaves_foreign_lease(self):
+        key = caching.view_cache_key(self.request, f"{self.view.__module__}.{self.view.__name__}")
+        cache.set(f"{key}:lease", 'boshqa', 60)
+        self.release.set()
+        self.assertEqual(self.view(self.request).data['value'], 1)
+        self.assertEqual(cache.get(f"{key}:lease"), 'boshqa')
+
+    def test_lease_winner_rereads_entry(self):
+        self.release.set()
+        self.view(self.request)
+        key = caching.view_cache_key(self.request, f"{self.view.__module__}.{self.view.__name__}")
+        entry = cache.get(key)
+        # Birinchi o'qishda kesh bo'sh ko'rindi, lease olinganda esa boshqa so'rov natijani yozib bo'lgan
+        with mock.patch.object(caching.cache, 'get', side_effect=[None, entry, None]):
+            self.assertEqual(self.view(self.request).data['value'], 1)
+        self.assertEqual(self.computed, 1)
+
+    @override_settings(VIEW_CACHE_EARLY_REFRESH_BETA=1.0)
+    def test_early_refresh_probability(self):
+        now = time.time()
+        self.assertFalse(caching.should_refresh(now + 3600, 0.01, now))
+        self.assertTrue(caching.should_refresh(now - 1, 0.01, now))
+        early = sum(caching.should_refresh(now + 1, 1.0, now) for _ in range(1000))
+        self.assertTrue(200 < early < 600)
+
+
+@override_settings(SIMILARITY_RELOAD_INTERVAL=0, CHANGES_SETTLE_SECONDS=0)
+class SimilarBooksAPITest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(override_settings(SIMILARITY_INDEX_DIR=tmp.name))
+        drama, poetry, history = (Genre.objects.create(name=name) for name in ("Drama", "She'riyat", "Tarix"))
+        self.books = {}
+        for title, genres, rating in [("Bir", [drama, poetry], 5), ("Ikki", [drama, poetry], 4),
+                                      ("Uch", [history], 2), ("To'rt", [drama], 5)]:
+            book = Book.objects.create(title=title, author=Author.objects.create(last_name=title))
+            book.genres.set(genres)
+            Review.objects.create(book=book, reviewer_name="Ali", rating=rating)
+            self.books[title] = book
+        self.genres = [drama, poetry]
+
+    def test_prune_keeps_previous_version_and_grace_period(self):
+        root = str(settings.SIMILARITY_INDEX_DIR)
+        now = timezone.now()
+        names = [(now - timedelta(seconds=age)).strftime(similarity.VERSION_FORMAT) for age in (300, 200, 30, 0)]
+        for name in names:
+            os.makedirs(os.path.join(root, name))
+
+        # Oldingi versiyaning o'rnini hozirgina (30 s oldin) bosgan versiya ham, oldingisi ham qoladi
+        similarity.prune(root, names[2])
+        self.assertEqual(sorted(os.listdir(root)), names[1:])
+        with override_settings(SIMILARITY_PRUNE_GRACE=0):
+            similarity.prune(root, names[2])
+            self.assertEqual(sorted(os.listdir(root)), names[2:])
+            similarity.prune(root, None)
+            self.assertEqual(sorted(os.listdir(root)), names[2:])
+
+    def similar(self, title, **params):
+        response = self.client.get(reverse('book_similar', kwargs={'pk': self.books[title].pk}), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [item['title'] for item in response.data['data']]
+
+    def test_similar_books_ranked_by_cosine(self):
+        response = self.client.get(reverse('book_similar', kwargs={'pk': self.books["Bir"].pk}))
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        call_command('build_similarity_index', stdout=io.StringIO())
+        self.assertEqual(self.similar("Bir", limit=2), ["Ikki", "To'rt"])
+        self.assertEqual(self.similar("Bir")[-1], "Uch")
+        self.assertNotIn("Bir", self.similar("Bir"))
+
+        response = self.client.get(reverse('book_similar', kwargs={'pk': 999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_incremental_rebuild_from_change_log(self):
+        call_command('build_similarity_index', stdout=io.StringIO())
+        first = similarity.get_index().meta['version']
+
+        new = self.books["Besh"] = Book.objects.create(title="Besh", author=Author.objects.create(last_name="Besh"))
+        new.genres.set(self.genres)
+        Review.objects.create(book=new, reviewer_name="Ali", rating=5)
+        self.books["Ikki"].delete()
+        self.assertEqual(self.similar("Besh"), [])
+
+        out = io.StringIO()
+        call_command('build_similarity_index', incremental=True, stdout=out)
+        self.assertIn("2 ta kitob qayta hisoblandi", out.getvalue())
+        # Kitob bilan birga uning sharhlari ham o'chdi: baho ustunlari hammasi uchun yangilanadi
+        self.assertIn("baho ustunlari", out.getvalue())
+        self.assertNotEqual(similarity.get_index().meta['version'], first)
+        self.assertEqual(self.similar("Bir", limit=1), ["Besh"])
+        self.assertNotIn("Ikki", self.similar("Bir"))
+
+        # Yangi janr ustun qo'shadi: to'liq qurish
+        Genre.objects.create(name="Yangi")
+        out = io.StringIO()
+        call_command('build_similarity_index', incremental=True, stdout=out)
+        self.assertIn("to'liq qurildi", out.getvalue())
+
+
+class BookExportAPITest(BaseAPITestCase):
+    def read_stream(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        response = self.client.get(reverse('book_export'), {'output': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in self.read_stream(response).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['isbn'], self.book.isbn)
+        self.assertEqual(rows[0]['genres'], [self.genre.name])
+        self.assertEqual(rows[0]['rating_avg'], 5.0)
+        self.assertEqual(rows[0]['review_count'], 1)
+
+    def test_export_since_and_columnar(self):
+        since = self.client.get(reverse('book_export'))['X-Export-Started-At']
+        response = self.client.get(reverse('book_export'), {'output': 'columnar', 'since': since})
+        lines = self.read_stream(response).splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn('fields', json.loads(lines[0]))
+
+        self.book.title = "Changed"
+        self.book.save()
+        response = self.client.get(reverse('book_export'), {'output': 'columnar', 'since': since})
+        group = json.loads(self.read_stream(response).splitlines()[1])
+        self.assertEqual(group['count'], 1)
+        self.assertEqual(group['columns']['title'], ["Changed"])
+
+    def test_export_since_includes_reviews_and_renames(self):
+        def export_since(since):
+            response = self.client.get(reverse('book_export'), {'output': 'ndjson', 'since': since})
+            return [json.loads(line) for line in self.read_stream(response).splitlines()]
+
+        def started_at():
+            # Javob yopilmasa eksport sinfidagi joy bo'shamaydi (app.load)
+            response = self.client.get(reverse('book_export'))
+            response.close()
+            return response['X-Export-Started-At']
+
+        since = started_at()
+        self.assertEqual(export_since(since), [])
+        Review.objects.create(book=self.book, reviewer_name="Yangi", rating=3)
+        rows = export_since(since)
+        self.assertEqual([(row['id'], row['review_count'], row['rating_avg']) for row in rows], [(self.book.pk, 2, 4.0)])
+
+        since = started_at()
+        self.author.last_name = "Boshqa"
+        self.author.save()
+        self.assertEqual([row['author_last_name'] for row in export_since(since)], ["Boshqa"])
+
+        # Nashriyot nomi fon vazifasida yoziladi
+        since = started_at()
+        self.publisher.name = "Yangi nashriyot"
+        self.publisher.save()
+        jobs.run_pending()
+        self.assertEqual([row['publisher'] for row in export_since(since)], ["Yangi nashriyot"])
+
+    def test_export_csv_invalid_since(self):
+        response = self.client.get(reverse('book_export'), {'output': 'csv', 'since': 'kecha'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(LEADERBOARD_MIN_REVIEWS=1, LEADERBOARD_AUTO_REFRESH=False, CHANGES_SETTLE_SECONDS=0)
+class LeaderboardAPITest(BaseAPITestCase):
+    def test_leaderboards_after_refresh(self):
+        other = Book.objects.create(title="Other Book", author=Author.objects.create(last_name="B"), publisher=self.publisher)
+        other.genres.add(self.genre)
+        Review.objects.create(book=other, reviewer_name="U", rating=2)
+        Review.objects.create(book=other, reviewer_name="V", rating=3)
+        call_command('refresh_leaderboards', stdout=io.StringIO())
+
+        response = self.client.get(reverse('leaderboard_genre_top_books', kwargs={'pk': self.genre.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['stale'])
+        self.assertEqual([row['book'] for row in response.data['data']], [self.book.pk, other.pk])
+
+        response = self.client.get(reverse('leaderboard_most_reviewed'))
+        self.assertEqual(response.data['data'][0]['book'], other.pk)
+        self.assertEqual(response.data['data'][0]['review_count'], 2)
+
+        response = self.client.get(reverse('leaderboard_publishers'))
+        self.assertEqual(response.data['data'][0]['book_count'], 2)
+
+    def test_incremental_refresh_only_touches_reviewed_genres(self):
+        call_command('refresh_leaderboards', stdout=io.StringIO())
+        untouched = Genre.objects.create(name="Untouched")
+        book = Book.objects.create(title="Fresh", author=Author.objects.create(last_name="C"))
+        book.genres.add(untouched)
+        Review.objects.create(book=book, reviewer_name="U", rating=5)
+        self.assertEqual(leaderboards.refresh(), 1)
+        self.assertTrue(GenreTopBook.objects.filter(genre=untouched, book=book).exists())
+
+    def test_incremental_refresh_sees_edits_genre_moves_and_deletes(self):
+        other = Book.objects.create(title="Other Book", author=Author.objects.create(last_name="B"))
+        other.genres.add(self.genre)
+        Review.objects.create(book=other, reviewer_name="U", rating=4)
+        leaderboards.refresh()
+        ranked = lambda genre: list(GenreTopBook.objects.filter(genre=genre).values_list('book', flat=True))  # noqa: E731
+        self.assertEqual(ranked(self.genre), [self.book.pk, other.pk])
+
+        self.review.rating = 3
+        self.review.save()
+        self.assertEqual(leaderboards.refresh(), 1)
+        self.assertEqual(ranked(self.genre), [other.pk, self.book.pk])
+
+        moved = Genre.objects.create(name="Moved")
+        other.genres.set([moved])
+        leaderboards.refresh()
+        self.assertEqual(ranked(self.genre), [self.book.pk])
+        self.assertEqual(ranked(moved), [other.pk])
+
+        self.review.delete()
+        self.assertEqual(leaderboards.refresh(), Genre.objects.count())
+        self.assertEqual(ranked(self.genre), [])
+
 
 class GenreAPITest(BaseAPITestCase):
     def test_genre_create(self):
@@ -226,4 +1001,522 @@ class ReviewAPITest(BaseAPITestCase):
         self.client.credentials() 
         self.client.force_authenticate(user=None)
         response = self.client.delete(url)
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(REVIEW_INGEST_MODE='buffered', REVIEW_INGEST_FLUSH_INTERVAL=0, REVIEW_INGEST_BATCH_SIZE=4)
+class BufferedReviewIngestTest(BaseAPITestCase):
+    def test_reviews_are_accepted_then_flushed_in_batches(self):
+        url = self.get_urls('Review')['create']
+        other = Book.objects.create(title="Boshqa", author=Author.objects.create(last_name="B"))
+        ids = []
+        for i in range(6):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    url, {'book': self.book.pk, 'reviewer_name': f"U{i}", 'rating': i % 5 + 1}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertFalse(any('"app_review"' in q['sql'] for q in queries.captured_queries))
+            ids.append(response.data['data']['id'])
+        self.client.post(url, {'book': other.pk, 'reviewer_name': "O'chadi", 'rating': 3}, format='json')
+        self.assertEqual(len(set(ids)), 6)
+        self.assertEqual((Review.objects.count(), ReviewStaging.objects.count()), (1, 7))
+
+        response = self.client.post(url, {'book': 10 ** 9, 'reviewer_name': "X", 'rating': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('book', response.data['errors'])
+
+        self.client.delete(self.get_urls('Book', other.pk)['delete'])
+        with CaptureQueriesContext(connection) as queries:
+            jobs.run_pending()
+        # 7 ta sharh 4 talik ikki partiyada: har biri bitta INSERT
+        self.assertEqual(sum(q['sql'].startswith('INSERT INTO "app_review"') for q in queries.captured_queries), 2)
+        self.assertFalse(ReviewStaging.objects.exists())
+        self.assertEqual(sorted(Review.objects.filter(book=self.book).values_list('reviewer_name', flat=True)),
+                         ["Old User"] + [f"U{i}" for i in range(6)])
+        self.assertFalse(Review.objects.filter(book_id=other.pk).exists())
+        self.assertEqual(ChangeLog.objects.filter(model_name='review', action=ChangeLog.UPSERT).count(), 7)
+
+    def test_book_check_does_not_count_as_cache_read(self):
+        metrics.reset()
+        object_cache.fetch_serialized(Book, [self.book.pk], Book.alive.all(), BookSerializer)
+        before = metrics.snapshot()
+        response = self.client.post(
+            self.get_urls('Review')['create'], {'book': self.book.pk, 'reviewer_name': "U", 'rating': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        after = metrics.snapshot()
+        for name in ('object_cache.hits', 'object_cache.misses'):
+            self.assertEqual(after.get(name), before.get(name))
+
+    @override_settings(JOBS_MAX_ATTEMPTS=1)
+    def test_failed_flush_is_rescheduled_while_rows_remain(self):
+        self.client.post(self.get_urls('Review')['create'],
+                         {'book': self.book.pk, 'reviewer_name': "U", 'rating': 3}, format='json')
+        with mock.patch.object(ingest, 'flush', side_effect=OperationalError("uzilish")), \
+                self.assertLogs('app.jobs', 'ERROR'):
+            jobs.run_pending()
+        self.assertEqual(Job.objects.get(name=ingest.FLUSH_JOB).status, Job.FAILED)
+        self.assertTrue(ReviewStaging.objects.exists())
+
+        # Worker ning davriy tekshiruvi buferni qayta rejalashtiradi
+        call_command('run_worker', once=True, stdout=io.StringIO())
+        self.assertFalse(ReviewStaging.objects.exists())
+        self.assertTrue(Review.objects.filter(reviewer_name="U").exists())
+        jobs.maintain()
+        self.assertFalse(Job.objects.filter(name=ingest.FLUSH_JOB, status=Job.QUEUED).exists())
+
+
+class LoadSheddingTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        load.reset()
+
+    def hold(self, name):
+        slot, status_code = load.acquire(name)
+        self.assertIsNone(status_code)
+        self.addCleanup(slot.release)
+        return slot
+
+    @override_settings(LOAD_CLASSES={
+        **settings.LOAD_CLASSES, 'list': dict(settings.LOAD_CLASSES['list'], concurrency=1, queue=0, retry_after=7),
+    })
+    def test_route_class_limit(self):
+        slot = self.hold('list')
+        response = self.client.get(self.get_urls('Review')['list'])
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '7')
+        # Boshqa sinf (detail) band sinfdan ta'sirlanmaydi
+        self.assertEqual(self.client.get(self.get_urls('Book', self.book.pk)['detail']).status_code, status.HTTP_200_OK)
+
+        slot.release()
+        self.assertEqual(self.client.get(self.get_urls('Review')['list']).status_code, status.HTTP_200_OK)
+        self.assertEqual(metrics.snapshot()['load.shed.list'], 1)
+
+    @override_settings(LOAD_MAX_INFLIGHT=2)
+    def test_low_priority_shed_first(self):
+        self.hold('detail')
+        response = self.client.get(self.get_urls('Author')['list'])
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', response)
+        response = self.client.post(reverse('login_user'), {'username': 'testuser', 'password': 'password123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(metrics.snapshot()['load.shed.503'], 1)
+
+    def test_statement_timeout_becomes_503(self):
+        class QueryCanceled(Exception):
+            sqlstate = load.STATEMENT_TIMEOUT_SQLSTATE
+
+        request = RequestFactory().get('/')
+        request.load_slot = self.hold('list')
+        try:
+            raise OperationalError("canceling statement due to statement timeout") from QueryCanceled()
+        except OperationalError as exc:
+            response = load.LoadSheddingMiddleware(lambda r: None).process_exception(request, exc)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(metrics.snapshot()['load.statement_timeouts.list'], 1)
+
+
+@override_settings(CHANGES_SETTLE_SECONDS=0)
+class ChangeFeedAPITest(BaseAPITestCase):
+    def feed(self, **params):
+        response = self.client.get(reverse('change_feed'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_feed_collapses_repeated_changes(self):
+        since = self.feed()['next']
+        for rating in (1, 2, 3):
+            self.review.rating = rating
+            self.review.save()
+        self.book.genres.add(Genre.objects.create(name="Yangi"))
+
+        data = self.feed(since=since)
+        self.assertEqual([(e['model'], e['id']) for e in data['data']],
+                         [('review', self.review.pk), ('genre', Genre.objects.get(name="Yangi").pk), ('book', self.book.pk)])
+        self.assertEqual(data['data'][0]['data']['rating'], 3)
+        self.assertEqual(len(data['data'][2]['data']['genres']), 2)
+        self.assertEqual(self.feed(since=data['next'])['data'], [])
+
+    def test_paging_and_deletes(self):
+        ids = [Author.objects.create(last_name=f"M{i}").pk for i in range(5)]
+        since = ChangeLog.objects.get(model_name='author', object_id=ids[0]).pk - 1
+        Author.objects.get(pk=ids[1]).delete()
+
+        first = self.feed(since=since, limit=3)
+        self.assertTrue(first['has_more'])
+        self.assertEqual([e['id'] for e in first['data']], ids[:3])
+        rest = self.feed(since=first['next'], limit=3)
+        self.assertFalse(rest['has_more'])
+        self.assertEqual([e['id'] for e in rest['data']], [ids[3], ids[4], ids[1]])
+        self.assertEqual((rest['data'][-1]['action'], rest['data'][-1]['data']), (ChangeLog.DELETE, None))
+
+        # Sahifa ichida yaratilib o'chirilgan obyekt faqat "delete" sifatida keladi
+        self.assertEqual([e['action'] for e in self.feed(since=since)['data'] if e['id'] == ids[1]],
+                         [ChangeLog.DELETE])
+
+    def test_compaction_bounds_log_and_expires_old_cursors(self):
+        for i in range(10):
+            self.author.bio = f"Bio {i}"
+            self.author.save()
+        review_pk = self.review.pk
+        self.review.delete()
+        old_cursor = self.feed()['next'] - 1
+
+        out = io.StringIO()
+        call_command('compact_changelog', retention_days=0, stdout=out)
+        self.assertIn("ta yozuv o'chirildi", out.getvalue())
+        self.assertEqual(ChangeLog.objects.filter(model_name='author', object_id=self.author.pk).count(), 1)
+        self.assertFalse(ChangeLog.objects.filter(action=ChangeLog.DELETE).exists())
+        self.assertGreater(changes.horizon(), 0)
+
+        response = self.client.get(reverse('change_feed'), {'since': old_cursor})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        snapshot = self.feed(since=0)['data']
+        self.assertIn(('author', self.author.pk), {(e['model'], e['id']) for e in snapshot})
+        self.assertNotIn(('review', review_pk), {(e['model'], e['id']) for e in snapshot})
+
+    def test_expired_cursors_resync(self):
+        cursor = self.feed()['next']
+        horizon = changes.expire_cursors()
+        self.assertGreater(horizon, cursor)
+        response = self.client.get(reverse('change_feed'), {'since': cursor})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+        # To'liq sinxronlangan mijoz kursori keyingi yozuvdan keyin yana ishlaydi
+        changes.record_many(Book, [self.book.pk])
+        data = self.feed(since=0)
+        self.assertGreaterEqual(data['next'], horizon)
+        self.assertEqual(self.feed(since=data['next'])['data'], [])
+        self.assertEqual(changes.expire_cursors(), data['next'] + 1)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('change_feed'), {'since': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        self.calls = []
+        jobs.register('test.record')(lambda **payload: self.calls.append(payload))
+        jobs.register('test.fail')(self.fail_job)
+
+    def fail_job(self):
+        raise RuntimeError("xato")
+
+    def test_enqueue_and_run(self):
+        jobs.enqueue('test.record', {'x': 1})
+        jobs.enqueue('test.record', {'x': 2}, delay=60)
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(self.calls, [{'x': 1}])
+        self.assertEqual(list(Job.objects.values_list('payload', flat=True)), [{'x': 2}])
+
+    def test_dedupe_key_keeps_one_queued_job(self):
+        for _ in range(3):
+            jobs.enqueue('test.record', dedupe_key='bir')
+        self.assertEqual(Job.objects.count(), 1)
+        jobs.run_pending()
+        jobs.enqueue('test.record', dedupe_key='bir')
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED).count(), 1)
+
+    @override_settings(JOBS_BACKOFF_BASE=0)
+    def test_retry_with_backoff_then_fail(self):
+        jobs.enqueue('test.fail', max_attempts=2)
+        jobs.run_pending(limit=1)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn("RuntimeError", job.last_error)
+
+        with self.assertLogs('app.jobs', 'ERROR'):
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    @override_settings(LEADERBOARD_AUTO_REFRESH=True)
+    def test_writes_schedule_single_leaderboard_refresh(self):
+        # Xotiradagi test keshi (config.test_runner) testlar orasida tozalanadi
+        cache.clear()
+        book = Book.objects.create(title="Kitob", author=Author.objects.create(last_name="A"))
+        for rating in (3, 4, 5):
+            Review.objects.create(book=book, reviewer_name="Ali", rating=rating)
+        job = Job.objects.get(name=leaderboards.REFRESH_JOB)
+        self.assertGreater(job.run_at, job.created_at)
+
+        Job.objects.update(run_at=job.created_at)
+        jobs.run_pending()
+        self.assertIsNotNone(leaderboards.get_state().refreshed_at)
+
+    @override_settings(JOBS_LOCK_TIMEOUT=0)
+    def test_stale_running_job_requeued_by_worker(self):
+        jobs.enqueue('test.record', {'x': 1})
+        self.assertEqual(len(jobs.claim('olgan-worker')), 1)
+        self.assertEqual(jobs.claim('boshqa-worker'), [])
+
+        out = io.StringIO()
+        with self.assertLogs('app.jobs', 'WARNING'):
+            call_command('run_worker', once=True, stdout=out)
+        self.assertIn("1 ta vazifa", out.getvalue())
+        self.assertEqual(self.calls, [{'x': 1}])
+        self.assertFalse(Job.objects.exists())
+
+
+# =============================
+# 4. ADMIN TESTS
+# =============================
+class AdminChangelistTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='password123')
+        self.client.force_login(self.admin)
+        author = Author.objects.create(first_name="Abdulla", last_name="Qodiriy")
+        self.book = Book.objects.create(title="O'tkan kunlar", author=author, isbn="9781111111111")
+        Review.objects.create(book=self.book, reviewer_name="Ali", rating=5)
+
+    def test_changelists_with_prefix_search(self):
+        for model, term in ((Book, "O'tkan"), (Author, "Qodi"), (Review, "Al")):
+            url = reverse(f'admin:app_{model._meta.model_name}_changelist')
+            response = self.client.get(url, {'q': term})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_paginator_falls_back_to_exact_count(self):
+        paginator = EstimatedCountPaginator(Review.objects.order_by('-created_at', '-id'), 100)
+        self.assertEqual(paginator.count, 1)
+
+
+# =============================
+# 5. MANAGEMENT COMMAND TESTS
+# =============================
+class ImportCatalogCommandTest(TestCase):
+    def write_file(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_import_csv_and_update_by_isbn(self):
+        path = self.write_file('.csv', (
+            "isbn,title,author_first_name,author_last_name,publisher,genres,published_date,pages,description\n"
+            "1111111111111,Birinchi,Ali,Valiyev,Sharq,Roman|Tarix,2020-01-02,120,\n"
+            "2222222222222,Ikkinchi,Hasan,Karimov,Sharq,Roman,,,\n"
+            ",Nomsiz muallif,,,,,,,\n"
+        ))
+        call_command('import_catalog', path, batch_size=2, stdout=io.StringIO())
+
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Publisher.objects.count(), 1)
+        book = Book.objects.get(isbn='1111111111111')
+        self.assertEqual(sorted(book.genres.values_list('name', flat=True)), ['Roman', 'Tarix'])
+        self.assertEqual(book.published_date, date(2020, 1, 2))
+        imported_at = book.updated_at
+
+        path = self.write_file('.ndjson', json.dumps({
+            'isbn': '1111111111111', 'title': 'Yangilangan', 'author_first_name': 'Ali',
+            'author_last_name': 'Valiyev', 'genres': ['Roman', 'Fantastika'],
+        }) + "\n")
+        call_command('import_catalog', path, stdout=io.StringIO())
+
+        book.refresh_from_db()
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(book.title, 'Yangilangan')
+        # Fayldan olib tashlangan janr (Tarix) ham o'chadi
+        self.assertEqual(sorted(book.genres.values_list('name', flat=True)), ['Fantastika', 'Roman'])
+        self.assertGreater(book.updated_at, imported_at)
+
+    def test_ignore_mode_counts_isbn_conflicts_as_skipped(self):
+        header = "isbn,title,author_first_name,author_last_name,genres\n"
+        call_command('import_catalog', self.write_file('.csv', header + "1111111111111,Birinchi,Ali,Valiyev,Roman\n"),
+                     stdout=io.StringIO())
+        path = self.write_file('.csv', header + (
+            "1111111111111,Boshqa nom,Ali,Valiyev,Tarix\n"
+            "1111111111111,Begona,Hasan,Karimov,Tarix\n"
+            "2222222222222,Ikkinchi,Vali,Aliyev,Tarix\n"
+        ))
+        out = io.StringIO()
+        call_command('import_catalog', path, on_conflict='ignore', batch_size=1, stdout=out)
+        self.assertIn("Import yakunlandi: 1 ta kitob, 2 ta o'tkazib yuborilgan qator", out.getvalue())
+        book = Book.objects.get(isbn='1111111111111')
+        self.assertEqual((book.title, list(book.genres.values_list('name', flat=True))), ('Birinchi', ['Roman']))
+        self.assertTrue(Book.objects.filter(isbn='2222222222222').exists())
+
+    def test_change_log_written_after_chunk_commits(self):
+        path = self.write_file('.csv', "isbn,title,author_first_name,author_last_name\n1111111111111,Birinchi,Ali,Valiyev\n")
+        with self.captureOnCommitCallbacks() as callbacks:
+            call_command('import_catalog', path, stdout=io.StringIO())
+        # Bo'lak tranzaksiyasi ichida yozuv yo'q: uzoq import kechikib commit bo'lsa ham lentadan tushib qolmaydi
+        self.assertFalse(ChangeLog.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(sorted(ChangeLog.objects.values_list('model_name', flat=True)), ['author', 'book'])
+
+    def test_import_skips_second_book_of_author(self):
+        path = self.write_file('.csv', (
+            "isbn,title,author_first_name,author_last_name\n"
+            "1111111111111,Birinchi,Ali,Valiyev\n"
+            "2222222222222,Ikkinchi,Ali,Valiyev\n"
+            ",Uchinchi,Ali,Valiyev\n"
+            ",To'rtinchi,Hasan,Karimov\n"
+        ))
+        for on_conflict in ('update', 'ignore'):
+            with self.subTest(on_conflict):
+                call_command('import_catalog', path, on_conflict=on_conflict, stdout=io.StringIO())
+                self.assertEqual(
+                    sorted(Book.objects.values_list('title', flat=True)), ['Birinchi', "To'rtinchi"])
+
+
+class SeedCommandTest(TestCase):
+    def test_seed_distribution(self):
+        call_command(
+            'seed', authors=30, books=20, genres=5, publishers=3, reviews=500, batch_size=64, stdout=io.StringIO(),
+        )
+        self.assertEqual(Author.objects.count(), 30)
+        self.assertEqual(Book.objects.count(), 20)
+        self.assertEqual(Review.objects.count(), 500)
+        self.assertEqual(Book.objects.values('isbn').distinct().count(), 20)
+        self.assertEqual(Book.objects.values('author').distinct().count(), 20)
+        self.assertTrue(all(book.genres.exists() for book in Book.objects.all()))
+
+        per_book = sorted(Book.objects.annotate(n=Count('reviews')).values_list('n', flat=True), reverse=True)
+        self.assertGreater(per_book[0], per_book[len(per_book) // 2] * 3)
+        self.assertGreater(Review.objects.values('created_at__date').distinct().count(), 1)
+        self.assertEqual(ChangeLog.objects.filter(model_name='review').count(), 500)
+
+    def test_seed_again_after_delete_and_fixed_clock(self):
+        now = '2024-06-01T12:00:00+00:00'
+        call_command('seed', authors=5, books=5, genres=2, publishers=1, reviews=20, now=now, stdout=io.StringIO())
+        Book.objects.order_by('pk').first().delete()
+        call_command('seed', authors=5, books=5, genres=2, publishers=1, reviews=20, now=now, stdout=io.StringIO())
+        self.assertEqual(Book.objects.count(), 9)
+        self.assertLessEqual(Review.objects.order_by('-created_at').first().created_at,
+                             datetime(2024, 6, 1, 12, tzinfo=dt_timezone.utc))
+
+
+def plan_relations(plan):
+    relations = {plan['Relation Name']} if 'Relation Name' in plan else set()
+    for child in plan.get('Plans', []):
+        relations |= plan_relations(child)
+    return relations
+
+
+class PartitionReviewsCommandTest(TestCase):
+    def test_month_arithmetic(self):
+        start = partitions.month_start(datetime(2025, 12, 31, 23, 30, tzinfo=dt_timezone.utc))
+        self.assertEqual(start, datetime(2025, 12, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(partitions.add_months(start, 1), datetime(2026, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(partitions.add_months(start, -12), datetime(2024, 12, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(partitions.partition_name('app_review', start), 'app_review_p202512')
+
+    @skipIf(connection.vendor == 'postgresql', "PostgreSQL da bo'laklash ishlaydi")
+    def test_requires_postgresql(self):
+        with self.assertRaises(CommandError):
+            call_command('partition_reviews', stdout=io.StringIO())
+
+    # SQLite da (odatiy test muhiti) o'tkazib yuboriladi: bo'laklarni kesish (pruning) va retention faqat
+    # PostgreSQL bilan ishlaydigan CI da tekshiriladi
+    @skipUnless(connection.vendor == 'postgresql', "Bo'laklash faqat PostgreSQL da")
+    def test_partition_pruning_and_retention(self):
+        book = Book.objects.create(title="Kitob", author=Author.objects.create(last_name="A"))
+        now = timezone.now()
+        old = Review.objects.create(book=book, reviewer_name="Eski", rating=2)
+        Review.objects.filter(pk=old.pk).update(created_at=now - timedelta(days=200))
+        Review.objects.create(book=book, reviewer_name="Yangi", rating=4)
+
+        def index_names():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", [Review._meta.db_table])
+                return {name for (name,) in cursor.fetchall()}
+
+        indexes = index_names()
+        call_command('partition_reviews', convert=True, ahead=2, stdout=io.StringIO())
+        self.assertEqual(Review.objects.count(), 2)
+        # Migratsiyalardagi indekslar o'z nomlari bilan qayta yaratiladi
+        self.assertLessEqual({'review_book_created_idx', 'review_created_idx'}, index_names())
+        self.assertEqual(index_names(), indexes)
+        self.assertGreater(Review.objects.create(book=book, reviewer_name="Keyin", rating=5).pk, old.pk)
+
+        table = Review._meta.db_table
+        sql, params = Review.objects.filter(created_at__gte=now - timedelta(days=7)).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        scanned = plan_relations((json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan'])
+        self.assertIn(partitions.partition_name(table, partitions.month_start(now)), scanned)
+        old_partition = partitions.partition_name(table, partitions.month_start(now - timedelta(days=200)))
+        self.assertNotIn(old_partition, scanned)
+
+        out = io.StringIO()
+        call_command('partition_reviews', retention_months=3, stdout=out)
+        self.assertIn(old_partition, out.getvalue())
+        self.assertFalse(Review.objects.filter(pk=old.pk).exists())
+        self.assertEqual(Review.objects.count(), 2)
+        # Har bir sharh uchun "delete" yozilmaydi: eski kursorlar 410 oladi, kitob esa bir marta yoziladi
+        self.assertFalse(ChangeLog.objects.filter(model_name='review', action=ChangeLog.DELETE).exists())
+        self.assertEqual(ChangeLog.objects.filter(model_name='book', object_id=book.pk, pk__gte=changes.horizon()).count(), 1)
+
+        out = io.StringIO()
+        call_command('partition_reviews', unpartition=True, stdout=out)
+        self.assertIn("oddiy jadvalga qaytarildi", out.getvalue())
+        with connection.cursor() as cursor:
+            self.assertFalse(partitions.is_partitioned(cursor, table))
+        self.assertEqual(index_names(), indexes)
+        self.assertEqual(Review.objects.count(), 2)
+
+
+class BenchmarkCommandTest(TestCase):
+    def test_benchmark_report_and_regression(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        options = dict(
+            authors=5, books=3, genres=2, publishers=2, reviews=10, requests=3, concurrency=1,
+            routes=['book_detail', 'book_update'], stdout=io.StringIO(),
+        )
+        call_command('benchmark', output=path, **options)
+
+        with open(path) as f:
+            report = json.load(f)
+        self.assertEqual(set(report['routes']), {'book_detail', 'book_update'})
+        self.assertEqual(report['routes']['book_detail']['requests'], 3)
+        self.assertEqual(report['routes']['book_detail']['errors'], 0)
+        self.assertGreater(report['routes']['book_update']['queries'], 0)
+
+        for route in report['routes'].values():
+            route['p95_ms'] = 0
+        with open(path, 'w') as f:
+            json.dump(report, f)
+        with self.assertRaises(CommandError):
+            call_command('benchmark', no_seed=True, baseline=path, **options)
+        self.assertFalse(User.objects.filter(username__startswith='benchmark').exists())
+
+    def test_refuses_non_test_database_without_force(self):
+        name = connection.settings_dict['NAME']
+        connection.settings_dict['NAME'] = 'library'
+        self.addCleanup(connection.settings_dict.__setitem__, 'NAME', name)
+        with self.assertRaisesMessage(CommandError, '--force'):
+            call_command('benchmark', no_seed=True, stdout=io.StringIO())
+
+
+class BenchmarkOverloadCommandTest(TransactionTestCase):
+    # Yuklovchi oqimlar alohida ulanishlardan o'qiydi: ma'lumotlar commit qilingan bo'lishi kerak
+    @override_settings(LOAD_CLASSES={
+        **settings.LOAD_CLASSES, 'list': dict(settings.LOAD_CLASSES['list'], concurrency=1, queue=0),
+    })
+    def test_overload_report(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        call_command(
+            'benchmark', overload=True, authors=5, books=3, genres=2, publishers=2, reviews=50, requests=5,
+            concurrency=1, flood_route='review_list_detail', flood_concurrency=3, protected_routes=['book_detail'],
+            output=path, stdout=io.StringIO(),
+        )
+        with open(path) as f:
+            report = json.load(f)['overload']
+        self.assertEqual(report['flood']['route'], 'review_list_detail')
+        self.assertGreater(report['flood']['requests'], 0)
+        self.assertEqual(report['flood']['shed'], report['flood']['statuses'].get('429', 0)
+                         + report['flood']['statuses'].get('503', 0))
+        self.assertEqual(report['routes']['book_detail']['overload_errors'], 0)
+        self.assertIsNotNone(report['routes']['book_detail']['overload_p99_ms'])
+
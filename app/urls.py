@@ -7,11 +7,16 @@ from .views import (
 
     author_detail,
     author_create,
+    author_batch,
     author_update,
     author_delete,
 
     book_detail,
     book_create,
+    book_batch,
+    book_export,
+    book_reviews,
+    book_similar,
     book_update,
     book_delete,
     
@@ -27,8 +32,16 @@ from .views import (
 
     review_detail,
     review_create,
+    review_recent,
     review_update,
     review_delete,
+
+    leaderboard_genre_top_books,
+    leaderboard_most_reviewed,
+    leaderboard_publishers,
+
+    change_feed,
+    metrics_snapshot,
 )
 
 urlpatterns = [
@@ -40,15 +53,20 @@ urlpatterns = [
 
     path('authors/create/', author_create, name='author_create'),
     path('authors/', author_detail, name='author_list_detail'),
+    path('authors/batch/', author_batch, name='author_batch'),
     path('authors/<int:pk>/update/', author_update, name='author_update'),
     path('authors/<int:pk>/delete/', author_delete, name='author_delete'),
     path('authors/<int:pk>/', author_detail, name='author_detail'),
 
     path('books/create/', book_create, name='book_create'),
     path('books/', book_detail, name='book_list_detail'),
+    path('books/batch/', book_batch, name='book_batch'),
+    path('books/export/', book_export, name='book_export'),
     path('books/<int:pk>/update/', book_update, name='book_update'),
     path('books/<int:pk>/delete/', book_delete, name='book_delete'),
     path('books/<int:pk>/', book_detail, name='book_detail'),
+    path('books/<int:pk>/reviews/', book_reviews, name='book_reviews'),
+    path('books/<int:pk>/similar/', book_similar, name='book_similar'),
     
     path('genres/create/', genre_create, name='genre_create'),
     path('genres/', genre_detail, name='genre_list_detail'),
@@ -64,7 +82,15 @@ urlpatterns = [
 
     path('reviews/create/', review_create, name='review_create'),
     path('reviews/', review_detail, name='review_list_detail'),
+    path('reviews/recent/', review_recent, name='review_recent'),
     path('reviews/<int:pk>/update/', review_update, name='review_update'),
     path('reviews/<int:pk>/delete/', review_delete, name='review_delete'),
     path('reviews/<int:pk>/', review_detail, name='review_detail'),
+
+    path('leaderboards/genres/<int:pk>/', leaderboard_genre_top_books, name='leaderboard_genre_top_books'),
+    path('leaderboards/most-reviewed/', leaderboard_most_reviewed, name='leaderboard_most_reviewed'),
+    path('leaderboards/publishers/', leaderboard_publishers, name='leaderboard_publishers'),
+
+    path('changes/', change_feed, name='change_feed'),
+    path('metrics/', metrics_snapshot, name='metrics_snapshot'),
 ]
\ No newline at end of file
@@ -0,0 +1,37 @@
+import gzip
+import hashlib
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+
+from django.contrib.auth import password_validation
+from django.core.exceptions import ValidationError
+
+
+def password_hash(password):
+    return int.from_bytes(hashlib.blake2b(password.encode(), digest_size=8).digest(), 'big')
+
+
+@lru_cache(maxsize=None)
+def load_password_hashes(path):
+    # 20 mingta satrdan iborat set (~1.5 MB) o'rniga 8 baytli xeshlarning tartiblangan massivi (~160 KB)
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            hashes = {password_hash(line.strip()) for line in f}
+    except OSError:
+        with open(path, encoding='utf-8') as f:
+            hashes = {password_hash(line.strip()) for line in f}
+    return array('Q', sorted(hashes))
+
+
+class CommonPasswordValidator(password_validation.CommonPasswordValidator):
+    # Ro'yxat jarayon davomida bir marta yuklanadi, tekshiruv bisect orqali O(log n)
+    def __init__(self, password_list_path=None):
+        # DEFAULT_PASSWORD_LIST_PATH - cached_property: yo'l faqat obyekt orqali olinadi
+        self.hashes = load_password_hashes(str(password_list_path or self.DEFAULT_PASSWORD_LIST_PATH))
+
+    def validate(self, password, user=None):
+        value = password_hash(password.lower().strip())
+        i = bisect_left(self.hashes, value)
+        if i < len(self.hashes) and self.hashes[i] == value:
+            raise ValidationError(self.get_error_message(), code='password_too_common')
@@ -1,14 +1,25 @@
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework import status
 from rest_framework.pagination import PageNumberPagination
+from datetime import timedelta
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.views.decorators.cache import cache_page
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from .models import Author, Book, Genre, Publisher, Review  
+from .caching import cached_view
+from .catalog import EXPORT_CONTENT_TYPES, EXPORT_FORMATS, export_catalog
+from .leaderboards import ensure_fresh, get_state, is_stale
+from . import changes, deletion, ingest, metrics, object_cache, registry, similarity
+from .models import Author, Book, ChangeLog, Genre, Publisher, Review, GenreTopBook, MostReviewedBook, PublisherRanking
+from .pagination import ReviewCursorPagination
 from .serializers import (
     AuthorSerializer, 
     BookSerializer, 
@@ -16,7 +27,12 @@ from .serializers import (
     UserLoginSerializer,
     GenreSerializer,
     PublisherSerializer,
-    ReviewSerializer
+    ReviewSerializer,
+    ReviewIngestSerializer,
+    ReviewSnippetSerializer,
+    GenreTopBookSerializer,
+    MostReviewedBookSerializer,
+    PublisherRankingSerializer,
 )
 
 
@@ -24,7 +40,10 @@ from .serializers import (
 def register_user(request):
     serializer = UserRegisterSerializer(data=request.data)
     if serializer.is_valid():
-        user = serializer.save()
+        try:
+            user = serializer.save()
+        except ValidationError as e:
+            return Response({"success": False, "errors": e.detail}, status=status.HTTP_400_BAD_REQUEST)
         
         refresh = RefreshToken.for_user(user)
         
@@ -72,52 +91,92 @@ def jwt_refresh(request):
         return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+def parse_ids(raw):
+    if isinstance(raw, str):
+        raw = raw.split(',')
+    if not isinstance(raw, list):
+        return None
+    ids = []
+    for value in raw:
+        value = str(value).strip()
+        if not value.isdigit():
+            return None
+        ids.append(int(value))
+    return list(dict.fromkeys(ids))
+
+
+def batch_response(raw_ids, model, queryset, serializer_class):
+    ids = parse_ids(raw_ids)
+    if not ids:
+        return Response({"success": False, "message": "«ids» vergul bilan ajratilgan ID lar ro'yxati bo'lishi kerak!"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > settings.BATCH_MAX_IDS:
+        return Response({"success": False, "message": f"Bir so'rovda ko'pi bilan {settings.BATCH_MAX_IDS} ta ID!"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    payloads = object_cache.fetch_serialized(model, ids, queryset, serializer_class)
+    return Response({
+        "success": True,
+        "data": [payloads[pk] for pk in ids if pk in payloads],
+        "missing": [pk for pk in ids if pk not in payloads],
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @authentication_classes([JWTAuthentication]) 
 @permission_classes([IsAuthenticated])
 def author_create(request):
 
-    serializer = AuthorSerializer(data=request.data)
-    if serializer.is_valid():
-        serializer.save()
-        return Response({"success": True, "message": "Muallif muvaffaqiyatli yaratildi!", "data": serializer.data},
-                        status=status.HTTP_201_CREATED)
+    with transaction.atomic():
+        serializer = AuthorSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response({"success": True, "message": "Muallif muvaffaqiyatli yaratildi!", "data": serializer.data},
+                            status=status.HTTP_201_CREATED)
     return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
-@cache_page(60 * 5)
+@cached_view(60 * 5)
 @authentication_classes([JWTAuthentication]) 
 @permission_classes([IsAuthenticated])
 def author_detail(request, pk=None):
     if pk:
-        try:
-            author = Author.objects.get(pk=pk)
-            serializer = AuthorSerializer(author)
-            return Response({"success": True, "message": f"Muallif (ID: {pk}) topildi!", "data": serializer.data},
-                            status=status.HTTP_200_OK)
-        except Author.DoesNotExist:
+        author = object_cache.fetch_serialized(Author, [pk], Author.alive.all(), AuthorSerializer).get(pk)
+        if author is None:
             return Response({"success": False, "message": f"«{pk}» ID li muallif topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"success": True, "message": f"Muallif (ID: {pk}) topildi!", "data": author},
+                        status=status.HTTP_200_OK)
+    elif 'ids' in request.query_params:
+        return batch_response(request.query_params['ids'], Author, Author.alive.all(), AuthorSerializer)
     else:
-        queryset = Author.objects.all().order_by('last_name') 
+        # Bazadan faqat sahifadagi ID lar olinadi, obyektlarning o'zi kesh orqali
+        queryset = Author.alive.order_by('last_name').values_list('pk', flat=True)
         paginator = PageNumberPagination()
         page = paginator.paginate_queryset(queryset, request)
-        serializer = AuthorSerializer(page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        payloads = object_cache.fetch_serialized(Author, page, Author.alive.all(), AuthorSerializer)
+        return paginator.get_paginated_response([payloads[pk] for pk in page if pk in payloads])
+
+
+@api_view(['POST'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def author_batch(request):
+    return batch_response(request.data.get('ids'), Author, Author.alive.all(), AuthorSerializer)
 
 
 @api_view(['PUT', 'PATCH'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def author_update(request, pk):
-    try:
-        author = Author.objects.get(pk=pk)
-    except Author.DoesNotExist:
-        return Response({"success": False, "message": "Muallif topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
-    serializer = AuthorSerializer(author, data=request.data, partial=True)
-    if serializer.is_valid():
-        serializer.save()
-        return Response({"success": True, "message": "Muallif muvaffaqiyatli yangilandi!", "data": serializer.data},
-                        status=status.HTTP_200_OK)
+    with transaction.atomic():
+        try:
+            author = Author.alive.select_for_update().get(pk=pk)
+        except Author.DoesNotExist:
+            return Response({"success": False, "message": "Muallif topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = AuthorSerializer(author, data=request.data, partial=True)
+        if serializer.is_valid():
+            serializer.save()
+            return Response({"success": True, "message": "Muallif muvaffaqiyatli yangilandi!", "data": serializer.data},
+                            status=status.HTTP_200_OK)
     return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -125,60 +184,168 @@ def author_update(request, pk):
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def author_delete(request, pk):
-    try:
-        author = Author.objects.get(pk=pk)
-        author.delete()
-        return Response({"success": True, "message": f"«{pk}» ID li muallif o'chirildi!"}, status=status.HTTP_204_NO_CONTENT)
-    except Author.DoesNotExist:
-        return Response({"success": False, "message": "Muallif topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+    with transaction.atomic():
+        if not Author.alive.select_for_update().filter(pk=pk).exists():
+            return Response({"success": False, "message": "Muallif topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+        # Kitoblari va sharhlari xotiraga yuklanmaydi (app.deletion)
+        deletion.delete(Author, pk)
+    return Response({"success": True, "message": f"«{pk}» ID li muallif o'chirildi!"}, status=status.HTTP_204_NO_CONTENT)
 
 
 @api_view(['POST'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def book_create(request):
+    # Yozish BookSerializer.create ichidagi tranzaksiyada bajariladi
     serializer = BookSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save()
+        try:
+            serializer.save()
+        except ValidationError as e:
+            return Response({"success": False, "errors": e.detail}, status=status.HTTP_400_BAD_REQUEST)
         return Response({"success": True, "message": "Kitob muvaffaqiyatli qo'shildi!", "data": serializer.data},
                         status=status.HTTP_201_CREATED)
     return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['GET'])
-@cache_page(60 * 5)
+@cached_view(60 * 5)
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def book_detail(request, pk=None):
     if pk:
-        try:
-            book = Book.objects.select_related('author').get(pk=pk)
-            serializer = BookSerializer(book)
-            return Response({"success": True, "message": f"«{book.title}» kitobi topildi!", "data": serializer.data},
-                            status=status.HTTP_200_OK)
-        except Book.DoesNotExist:
+        book = object_cache.fetch_serialized(Book, [pk], book_batch_queryset(), BookSerializer).get(pk)
+        if book is None:
             return Response({"success": False, "message": f"«{pk}» ID li kitob topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+        data = dict(book, latest_reviews=latest_reviews([pk])[pk])
+        return Response({"success": True, "message": f"«{book['title']}» kitobi topildi!", "data": data},
+                        status=status.HTTP_200_OK)
+    elif 'ids' in request.query_params:
+        return batch_response(request.query_params['ids'], Book, book_batch_queryset(), BookSerializer)
     else:
-        queryset = Book.objects.select_related('author').all().order_by('title')
+        queryset = Book.alive.order_by('title').values_list('pk', flat=True)
         paginator = PageNumberPagination()
         page = paginator.paginate_queryset(queryset, request)
-        serializer = BookSerializer(page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        payloads = object_cache.fetch_serialized(Book, page, book_batch_queryset(), BookSerializer)
+        data = [payloads[pk] for pk in page if pk in payloads]
+        if request.query_params.get('embed') == 'latest_reviews':
+            reviews = latest_reviews([item['id'] for item in data])
+            data = [dict(item, latest_reviews=reviews[item['id']]) for item in data]
+        return paginator.get_paginated_response(data)
+
+
+def book_batch_queryset():
+    # Nashriyot va janrlar xotiradagi reyestrdan biriktiriladi
+    return registry.with_references(Book.alive.all())
+
+
+@api_view(['POST'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def book_batch(request):
+    return batch_response(request.data.get('ids'), Book, book_batch_queryset(), BookSerializer)
+
+
+def latest_reviews(book_ids):
+    reviews = {book_id: [] for book_id in book_ids}
+    for review in Review.objects.latest_per_book(book_ids, settings.LATEST_REVIEWS_COUNT):
+        reviews[review.book_id].append(review)
+    return {book_id: ReviewSnippetSerializer(items, many=True).data for book_id, items in reviews.items()}
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def book_reviews(request, pk):
+    if not Book.alive.filter(pk=pk).exists():
+        return Response({"success": False, "message": f"«{pk}» ID li kitob topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+
+    queryset = Review.objects.filter(book_id=pk).select_related('book')
+    for param, lookup in (('rating', 'rating'), ('min_rating', 'rating__gte'), ('max_rating', 'rating__lte')):
+        value = request.query_params.get(param)
+        if value is None:
+            continue
+        if not value.isdigit() or not 1 <= int(value) <= 5:
+            return Response({"success": False, "message": f"«{param}» 1 dan 5 gacha butun son bo'lishi kerak!"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        queryset = queryset.filter(**{lookup: int(value)})
+
+    paginator = ReviewCursorPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = ReviewSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def book_similar(request, pk):
+    try:
+        limit = min(int(request.query_params.get('limit', settings.SIMILARITY_DEFAULT_LIMIT)), settings.SIMILARITY_MAX_LIMIT)
+    except ValueError:
+        return Response({"success": False, "message": "«limit» butun son bo'lishi kerak!"}, status=status.HTTP_400_BAD_REQUEST)
+    index = similarity.get_index()
+    if index is None:
+        return Response({"success": False, "message": "O'xshash kitoblar indeksi hali qurilmagan."},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    # SQL self-join yo'q: xotiraga akslantirilgan matritsa bo'yicha top-k kosinus o'xshashlik
+    found = index.similar(pk, max(limit, 1))
+    if found is None:
+        if not Book.alive.filter(pk=pk).exists():
+            return Response({"success": False, "message": f"«{pk}» ID li kitob topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+        # Indeks qurilgandan keyin qo'shilgan kitob: keyingi build_similarity_index gacha bo'sh ro'yxat
+        found = []
+    payloads = object_cache.fetch_serialized(Book, [book_id for book_id, _ in found], book_batch_queryset(), BookSerializer)
+    data = [dict(payloads[book_id], score=round(score, 4)) for book_id, score in found if book_id in payloads]
+    return Response({"success": True, "data": data, "index_version": index.meta['version']}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def book_export(request):
+    fmt = request.query_params.get('output', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return Response({"success": False, "message": f"Format {', '.join(EXPORT_FORMATS)} dan biri bo'lishi kerak!"},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    since = request.query_params.get('since')
+    if since:
+        since = parse_datetime(since)
+        if since is None:
+            return Response({"success": False, "message": "«since» ISO 8601 formatidagi sana-vaqt bo'lishi kerak!"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+
+    # Keyingi inkremental eksport uchun «since» sifatida shu vaqt ishlatiladi
+    started_at = timezone.now()
+    extension = 'csv' if fmt == 'csv' else 'ndjson'
+    response = StreamingHttpResponse(export_catalog(fmt, since=since), content_type=EXPORT_CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="books.{extension}"'
+    response['X-Export-Started-At'] = started_at.isoformat()
+    return response
 
 
 @api_view(['PUT', 'PATCH'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def book_update(request, pk):
-    try:
-        book = Book.objects.get(pk=pk)
-    except Book.DoesNotExist:
-        return Response({"success": False, "message": "Kitob topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
-    serializer = BookSerializer(book, data=request.data, partial=True)
-    if serializer.is_valid():
-        serializer.save()
-        return Response({"success": True, "message": "Kitob muvaffaqiyatli yangilandi!", "data": serializer.data},
-                        status=status.HTTP_200_OK)
+    # Qator yangilash tugaguncha qulflanadi; author/publisher/genres javob uchun bir marta yuklanadi
+    with transaction.atomic():
+        try:
+            book = book_batch_queryset().select_for_update(of=('self',)).get(pk=pk)
+        except Book.DoesNotExist:
+            return Response({"success": False, "message": "Kitob topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = BookSerializer(book, data=request.data, partial=True)
+        if serializer.is_valid():
+            try:
+                serializer.save()
+            except ValidationError as e:
+                return Response({"success": False, "errors": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"success": True, "message": "Kitob muvaffaqiyatli yangilandi!", "data": serializer.data},
+                            status=status.HTTP_200_OK)
     return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -186,56 +353,56 @@ def book_update(request, pk):
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def book_delete(request, pk):
-    try:
-        book = Book.objects.get(pk=pk)
-        title = book.title
-        book.delete()
-        return Response({"success": True, "message": f"«{title}» kitobi o'chirildi!"}, status=status.HTTP_204_NO_CONTENT)
-    except Book.DoesNotExist:
-        return Response({"success": False, "message": "Kitob topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+    with transaction.atomic():
+        title = Book.alive.select_for_update().filter(pk=pk).values_list('title', flat=True).first()
+        if title is None:
+            return Response({"success": False, "message": "Kitob topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+        deletion.delete(Book, pk)
+    return Response({"success": True, "message": f"«{title}» kitobi o'chirildi!"}, status=status.HTTP_204_NO_CONTENT)
 
 
 @api_view(['POST'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def genre_create(request):
-    serializer = GenreSerializer(data=request.data)
-    if serializer.is_valid():
-        serializer.save()
-        return Response({"success": True, "message": "Janr muvaffaqiyatli yaratildi!", "data": serializer.data},
-                        status=status.HTTP_201_CREATED)
+    with transaction.atomic():
+        serializer = GenreSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response({"success": True, "message": "Janr muvaffaqiyatli yaratildi!", "data": serializer.data},
+                            status=status.HTTP_201_CREATED)
     return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def genre_detail(request, pk=None):
+    # Jadval to'liq xotirada (app.registry): bazaga so'rov yo'q
     if pk:
-        try:
-            genre = Genre.objects.get(pk=pk)
-            serializer = GenreSerializer(genre)
-            return Response({"success": True, "message": f"«{genre.name}» (ID: {pk}) topildi!", "data": serializer.data},
-                            status=status.HTTP_200_OK)
-        except Genre.DoesNotExist:
+        genre = registry.GENRES.get(pk)
+        if genre is None:
             return Response({"success": False, "message": f"«{pk}» ID li janr topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = GenreSerializer(genre)
+        return Response({"success": True, "message": f"«{genre.name}» (ID: {pk}) topildi!", "data": serializer.data},
+                        status=status.HTTP_200_OK)
     else:
-        queryset = Genre.objects.all()
-        serializer = GenreSerializer(queryset, many=True)
+        serializer = GenreSerializer(registry.GENRES.all(), many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 @api_view(['PUT', 'PATCH'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def genre_update(request, pk):
-    try:
-        genre = Genre.objects.get(pk=pk)
-    except Genre.DoesNotExist:
-        return Response({"success": False, "message": "Janr topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
-    serializer = GenreSerializer(genre, data=request.data, partial=True)
-    if serializer.is_valid():
-        serializer.save()
-        return Response({"success": True, "message": "Janr muvaffaqiyatli yangilandi!", "data": serializer.data},
-                        status=status.HTTP_200_OK)
+    with transaction.atomic():
+        try:
+            genre = Genre.objects.select_for_update().get(pk=pk)
+        except Genre.DoesNotExist:
+            return Response({"success": False, "message": "Janr topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = GenreSerializer(genre, data=request.data, partial=True)
+        if serializer.is_valid():
+            serializer.save()
+            return Response({"success": True, "message": "Janr muvaffaqiyatli yangilandi!", "data": serializer.data},
+                            status=status.HTTP_200_OK)
     return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['DELETE'])
@@ -254,43 +421,44 @@ def genre_delete(request, pk):
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def publisher_create(request):
-    serializer = PublisherSerializer(data=request.data)
-    if serializer.is_valid():
-        serializer.save()
-        return Response({"success": True, "message": "Nashriyot muvaffaqiyatli yaratildi!", "data": serializer.data},
-                        status=status.HTTP_201_CREATED)
+    with transaction.atomic():
+        serializer = PublisherSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response({"success": True, "message": "Nashriyot muvaffaqiyatli yaratildi!", "data": serializer.data},
+                            status=status.HTTP_201_CREATED)
     return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def publisher_detail(request, pk=None):
+    # Jadval to'liq xotirada (app.registry): bazaga so'rov yo'q
     if pk:
-        try:
-            publisher = Publisher.objects.get(pk=pk)
-            serializer = PublisherSerializer(publisher)
-            return Response({"success": True, "message": f"«{publisher.name}» (ID: {pk}) topildi!", "data": serializer.data},
-                            status=status.HTTP_200_OK)
-        except Publisher.DoesNotExist:
+        publisher = registry.PUBLISHERS.get(pk)
+        if publisher is None:
             return Response({"success": False, "message": f"«{pk}» ID li nashriyot topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = PublisherSerializer(publisher)
+        return Response({"success": True, "message": f"«{publisher.name}» (ID: {pk}) topildi!", "data": serializer.data},
+                        status=status.HTTP_200_OK)
     else:
-        queryset = Publisher.objects.all()
-        serializer = PublisherSerializer(queryset, many=True)
+        serializer = PublisherSerializer(registry.PUBLISHERS.all(), many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 @api_view(['PUT', 'PATCH'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def publisher_update(request, pk):
-    try:
-        publisher = Publisher.objects.get(pk=pk)
-    except Publisher.DoesNotExist:
-        return Response({"success": False, "message": "Nashriyot topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
-    serializer = PublisherSerializer(publisher, data=request.data, partial=True)
-    if serializer.is_valid():
-        serializer.save()
-        return Response({"success": True, "message": "Nashriyot muvaffaqiyatli yangilandi!", "data": serializer.data},
-                        status=status.HTTP_200_OK)
+    with transaction.atomic():
+        try:
+            publisher = Publisher.objects.select_for_update().get(pk=pk)
+        except Publisher.DoesNotExist:
+            return Response({"success": False, "message": "Nashriyot topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = PublisherSerializer(publisher, data=request.data, partial=True)
+        if serializer.is_valid():
+            serializer.save()
+            return Response({"success": True, "message": "Nashriyot muvaffaqiyatli yangilandi!", "data": serializer.data},
+                            status=status.HTTP_200_OK)
     return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['DELETE'])
@@ -309,11 +477,20 @@ def publisher_delete(request, pk):
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def review_create(request):
-    serializer = ReviewSerializer(data=request.data)
-    if serializer.is_valid():
-        serializer.save()
-        return Response({"success": True, "message": "Sharh muvaffaqiyatli qo'shildi!", "data": serializer.data},
-                        status=status.HTTP_201_CREATED)
+    if ingest.is_buffered():
+        serializer = ReviewIngestSerializer(data=request.data)
+        if serializer.is_valid():
+            staged = serializer.save()
+            return Response({"success": True, "message": "Sharh qabul qilindi va tez orada e'lon qilinadi.",
+                             "data": {"id": staged.pk, "status": "queued"}}, status=status.HTTP_202_ACCEPTED)
+        return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        serializer = ReviewSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response({"success": True, "message": "Sharh muvaffaqiyatli qo'shildi!", "data": serializer.data},
+                            status=status.HTTP_201_CREATED)
     return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
@@ -322,30 +499,47 @@ def review_create(request):
 def review_detail(request, pk=None):
     if pk:
         try:
-            review = Review.objects.select_related('book').get(pk=pk)
+            review = Review.objects.select_related('book').get(pk=pk, book__is_deleted=False)
             serializer = ReviewSerializer(review)
             return Response({"success": True, "message": f"Sharh (ID: {pk}) topildi!", "data": serializer.data},
                             status=status.HTTP_200_OK)
         except Review.DoesNotExist:
             return Response({"success": False, "message": f"«{pk}» ID li sharh topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
     else:
-        queryset = Review.objects.select_related('book').all()
+        queryset = Review.objects.select_related('book').filter(book__is_deleted=False)
         serializer = ReviewSerializer(queryset, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def review_recent(request):
+    days = request.query_params.get('days', str(settings.REVIEW_RECENT_DAYS))
+    if not days.isdigit() or not 1 <= int(days) <= settings.REVIEW_RECENT_MAX_DAYS:
+        return Response({"success": False, "message": f"«days» 1 dan {settings.REVIEW_RECENT_MAX_DAYS} gacha butun son bo'lishi kerak!"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    # created_at ning quyi chegarasi bo'laklangan jadvalda faqat oxirgi oy(lar) bo'laklarini o'qitadi
+    since = timezone.now() - timedelta(days=int(days))
+    queryset = Review.objects.filter(created_at__gte=since, book__is_deleted=False).select_related('book')
+    paginator = ReviewCursorPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = ReviewSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
 @api_view(['PUT', 'PATCH'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def review_update(request, pk):
-    try:
-        review = Review.objects.get(pk=pk)
-    except Review.DoesNotExist:
-        return Response({"success": False, "message": "Sharh topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
-    serializer = ReviewSerializer(review, data=request.data, partial=True)
-    if serializer.is_valid():
-        serializer.save()
-        return Response({"success": True, "message": "Sharh muvaffaqiyatli yangilandi!", "data": serializer.data},
-                        status=status.HTTP_200_OK)
+    with transaction.atomic():
+        try:
+            review = Review.objects.select_related('book').select_for_update(of=('self',)).get(pk=pk, book__is_deleted=False)
+        except Review.DoesNotExist:
+            return Response({"success": False, "message": "Sharh topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = ReviewSerializer(review, data=request.data, partial=True)
+        if serializer.is_valid():
+            serializer.save()
+            return Response({"success": True, "message": "Sharh muvaffaqiyatli yangilandi!", "data": serializer.data},
+                            status=status.HTTP_200_OK)
     return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['DELETE'])
@@ -353,8 +547,105 @@ def review_update(request, pk):
 @permission_classes([IsAuthenticated]) 
 def review_delete(request, pk):
     try:
-        review = Review.objects.get(pk=pk)
+        review = Review.objects.get(pk=pk, book__is_deleted=False)
         review.delete()
         return Response({"success": True, "message": f"«{pk}» ID li sharh o'chirildi!"}, status=status.HTTP_204_NO_CONTENT)
     except Review.DoesNotExist:
-        return Response({"success": False, "message": "Sharh topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        return Response({"success": False, "message": "Sharh topilmadi!"}, status=status.HTTP_404_NOT_FOUND)
+
+
+def leaderboard_response(queryset, serializer_class):
+    state = get_state()
+    ensure_fresh(state)
+    serializer = serializer_class(queryset, many=True)
+    return Response({"success": True, "refreshed_at": state.refreshed_at, "stale": is_stale(state), "data": serializer.data},
+                    status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def leaderboard_genre_top_books(request, pk):
+    queryset = GenreTopBook.objects.filter(genre_id=pk).select_related('book')
+    return leaderboard_response(queryset, GenreTopBookSerializer)
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def leaderboard_most_reviewed(request):
+    queryset = MostReviewedBook.objects.select_related('book')
+    return leaderboard_response(queryset, MostReviewedBookSerializer)
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def leaderboard_publishers(request):
+    queryset = PublisherRanking.objects.select_related('publisher')
+    return leaderboard_response(queryset, PublisherRankingSerializer)
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAdminUser])
+def metrics_snapshot(request):
+    return Response({"success": True, "data": metrics.snapshot()}, status=status.HTTP_200_OK)
+
+
+# Muallif va kitob javoblari obyekt keshidan, janr va nashriyot reyestrdan, sharhlar bitta "pk IN (...)" so'rovidan
+CHANGE_FEED_SOURCES = {
+    'author': (lambda: Author.alive.all(), AuthorSerializer, True),
+    'book': (book_batch_queryset, BookSerializer, True),
+    'genre': (lambda: Genre.objects.all(), GenreSerializer, False),
+    'publisher': (lambda: Publisher.objects.all(), PublisherSerializer, False),
+    'review': (lambda: Review.objects.select_related('book').filter(book__is_deleted=False), ReviewSerializer, False),
+}
+
+
+def changed_payloads(entries):
+    ids = {}
+    for entry in entries:
+        if entry.action == ChangeLog.UPSERT:
+            ids.setdefault(entry.model_name, []).append(entry.object_id)
+    payloads = {}
+    for name, pks in ids.items():
+        queryset, serializer_class, cached = CHANGE_FEED_SOURCES[name]
+        model = changes.FEED_MODELS[name]
+        if cached:
+            found = object_cache.fetch_serialized(model, pks, queryset(), serializer_class)
+        elif model in registry.REGISTRIES:
+            found = {pk: serializer_class(obj).data for pk, obj in registry.for_model(model).in_bulk(pks).items()}
+        else:
+            found = {obj.pk: serializer_class(obj).data for obj in queryset().filter(pk__in=pks)}
+        payloads.update({(name, pk): data for pk, data in found.items()})
+    return payloads
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def change_feed(request):
+    try:
+        since = int(request.query_params.get('since', 0))
+        limit = min(int(request.query_params.get('limit', settings.CHANGES_PAGE_SIZE)), settings.CHANGES_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({"success": False, "message": "'since' va 'limit' butun son bo'lishi kerak."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if since < 0 or limit < 1:
+        return Response({"success": False, "message": "'since' manfiy, 'limit' esa 1 dan kichik bo'lmasligi kerak."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    # since=0 - to'liq nusxa; eski kursor esa siqilgan "delete" yozuvlarini ko'rmay qolgan bo'lishi mumkin
+    if 0 < since < changes.horizon():
+        return Response({"success": False, "message": "Kursor juda eski. since=0 dan to'liq sinxronlang."},
+                        status=status.HTTP_410_GONE)
+
+    entries, next_cursor, has_more = changes.read(since, limit)
+    payloads = changed_payloads(entries)
+    data = []
+    for entry in entries:
+        payload = payloads.get((entry.model_name, entry.object_id))
+        # Yozuvdan keyin o'chirilgan obyekt "delete" sifatida yuboriladi
+        action = entry.action if payload is not None else ChangeLog.DELETE
+        data.append({
+            'cursor': entry.pk, 'model': entry.model_name, 'id': entry.object_id, 'action': action, 'data': payload,
+        })
+    return Response({"success": True, "data": data, "next": next_cursor, "has_more": has_more},
+                    status=status.HTTP_200_OK)
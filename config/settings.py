@@ -22,6 +22,8 @@ ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", "127.0.0.1,localhost,0.0.0.0").split(
 # ==========================================
 # CACHE
 # ==========================================
+# Bir nechta web jarayonda cached_view ning "bitta so'rov hisoblaydi" kafolati uchun atomar add kerak
+# (Redis, Memcached yoki DatabaseCache); FileBasedCache bunday kafolat bermaydi
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
@@ -30,6 +32,107 @@ CACHES = {
         "OPTIONS": {"MAX_ENTRIES": 1000}
     }
 }
+# "manage.py test" bu keshga tegmaydi: testlar LocMemCache da ishlaydi
+TEST_RUNNER = 'config.test_runner.LocMemCacheTestRunner'
+
+# ==========================================
+# KUTUBXONA API
+# ==========================================
+# Kitob sahifasiga qo'shiladigan oxirgi sharhlar soni
+LATEST_REVIEWS_COUNT = 3
+
+# Per-object kesh (serializatsiya qilingan Book/Author) va batch GET chegarasi
+OBJECT_CACHE_TIMEOUT = 60 * 60
+BATCH_MAX_IDS = 200
+
+# Genre/Publisher reyestri (app.registry) umumiy versiya hisoblagichini shu oraliqda tekshiradi (soniya)
+REGISTRY_CHECK_INTERVAL = 1.0
+
+# cached_view (app.caching): eski qiymat timeout dan keyin yana shuncha soniya yangilanish paytida beriladi
+VIEW_CACHE_STALE_TTL = 60
+# Qayta hisoblayotgan so'rovning lease muddati; keshda hech narsa bo'lmasa, boshqalar shu vaqtgacha kutadi
+VIEW_CACHE_LEASE_TIMEOUT = 10
+VIEW_CACHE_WAIT_INTERVAL = 0.05
+# Oldindan (probabilistik) yangilash koeffitsienti: 0 - o'chirilgan, >1 - ertaroq
+VIEW_CACHE_EARLY_REFRESH_BETA = 1.0
+
+# Admin ro'yxatlarida shu sondan ko'p qatorlar uchun COUNT(*) o'rniga taxminiy son
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+
+# ==========================================
+# LEADERBOARDS
+# ==========================================
+LEADERBOARD_SIZE = 10
+LEADERBOARD_MIN_REVIEWS = 3
+LEADERBOARD_WINDOW_DAYS = 7
+LEADERBOARD_MAX_STALENESS = int(os.getenv("LEADERBOARD_MAX_STALENESS", 300))  # soniya
+LEADERBOARD_AUTO_REFRESH = True
+
+# ==========================================
+# O'XSHASH KITOBLAR (/books/<pk>/similar/)
+# ==========================================
+# build_similarity_index shu papkaga .npy fayllarini yozadi; workerlar ularni mmap qiladi
+SIMILARITY_INDEX_DIR = Path(os.getenv("SIMILARITY_INDEX_DIR", BASE_DIR / 'similarity_index'))
+SIMILARITY_RELOAD_INTERVAL = 5  # soniya: yangi indeks versiyasi shu oraliqda tekshiriladi
+SIMILARITY_KEEP_VERSIONS = 2
+SIMILARITY_PRUNE_GRACE = 60  # soniya: almashtirilgan versiya shundan keyin o'chiriladi
+SIMILARITY_DEFAULT_LIMIT = 10
+SIMILARITY_MAX_LIMIT = 50
+# Vektor og'irliklari: janrlar, o'rtacha baho, sharhlar soni (log) va bir xil nashriyot uchun qo'shimcha ball
+SIMILARITY_GENRE_WEIGHT = 1.0
+SIMILARITY_RATING_WEIGHT = 0.5
+SIMILARITY_POPULARITY_WEIGHT = 0.25
+SIMILARITY_PUBLISHER_WEIGHT = 0.05
+# Shundan kam kitob qayta hisoblansa, bog'lanishlar va sharhlar "IN (...)" bilan, aks holda to'liq o'qiladi
+SIMILARITY_FULL_SCAN_THRESHOLD = 5000
+
+# ==========================================
+# O'ZGARISHLAR LENTASI (/changes/)
+# ==========================================
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 5000
+# Shu soniyadan yangi yozuvlar hali commit bo'lmagan tranzaksiyalar tufayli keyingi so'rovga qoldiriladi.
+# ChangeLog ga yozgan tranzaksiya shu vaqt ichida commit bo'lishi kerak, aks holda uning yozuvlari o'tkazib
+# yuborilishi mumkin: uzoq yozuvchilar (import, seed, tozalash) yozuvlarni alohida qisqa tranzaksiyada qo'shadi
+CHANGES_SETTLE_SECONDS = 2
+# "delete" yozuvlari shuncha kun saqlanadi (compact_changelog)
+CHANGELOG_RETENTION_DAYS = 30
+
+# ==========================================
+# FON VAZIFALARI (app.jobs)
+# ==========================================
+# Ishlab chiqarishda (DEBUG=False) navbatni "manage.py run_worker" bajaradi (docker-compose dagi worker xizmati).
+# Yoqilsa, navbat web jarayon ichidagi oqimda ham bajariladi (lokal ishlab chiqish)
+JOBS_LOCAL_WORKER = os.getenv("JOBS_LOCAL_WORKER", str(DEBUG)).lower() in ["true", "1", "yes"]
+JOBS_CONCURRENCY = int(os.getenv("JOBS_CONCURRENCY", 4))
+JOBS_POLL_INTERVAL = 1.0  # soniya
+JOBS_MAX_ATTEMPTS = 5
+JOBS_BACKOFF_BASE = 5  # soniya: 5, 10, 20, 40, ...
+JOBS_BACKOFF_MAX = 60 * 60
+# "running" holatida shu vaqtdan ortiq qolgan vazifa (worker o'lgan) navbatga qaytariladi
+JOBS_LOCK_TIMEOUT = 5 * 60
+
+# ==========================================
+# O'CHIRISH (app.deletion)
+# ==========================================
+# Sharhlari shundan ko'p muallif/kitob darhol emas, fon vazifasida bo'laklab o'chiriladi
+DELETE_INLINE_LIMIT = 1000
+DELETE_PURGE_BATCH_SIZE = 5000
+
+# ==========================================
+# SHARHLAR JADVALINI BO'LAKLASH (app.partitions, faqat PostgreSQL)
+# ==========================================
+# Migratsiyalar jadvalni bo'laklamaydi: "manage.py partition_reviews --convert" app_review ni created_at bo'yicha
+# oylik bo'laklarga ajratadi ("--unpartition" - orqaga), keyin cron orqali kuniga bir marta ishga tushiriladi
+REVIEW_PARTITIONS_AHEAD = 3  # oy: partition_reviews shuncha oy oldinga bo'lak yaratadi
+REVIEW_RETENTION_MONTHS = int(os.getenv("REVIEW_RETENTION_MONTHS", 0))  # 0 - sharhlar o'chirilmaydi
+# /reviews/recent/?days=N
+REVIEW_RECENT_DAYS = 7
+REVIEW_RECENT_MAX_DAYS = 90
+# "buffered": POST /reviews/create/ sharhni buferga yozib 202 qaytaradi, fon vazifasi partiyalab saqlaydi (app.ingest)
+REVIEW_INGEST_MODE = os.getenv("REVIEW_INGEST_MODE", "sync")
+REVIEW_INGEST_BATCH_SIZE = 1000
+REVIEW_INGEST_FLUSH_INTERVAL = 1  # soniya: bufer shundan kech bo'lmay bo'shatiladi
 
 # ==========================================
 # INSTALLED APPS
@@ -81,8 +184,11 @@ SIMPLE_JWT = {
 # MIDDLEWARE
 # ==========================================
 MIDDLEWARE = [
+    # Keshdan qaytgan javoblar ham siqilishi uchun eng tashqi qatlamda
+    'app.compression.CompressionMiddleware',
     'django.middleware.cache.FetchFromCacheMiddleware',
-    'django.middleware.gzip.GZipMiddleware',
+    # Keshdan qaytgan javoblar chegaralanmaydi: faqat view gacha yetib boradigan so'rovlar
+    'app.load.LoadSheddingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "debug_toolbar.middleware.DebugToolbarMiddleware",
@@ -94,7 +200,50 @@ MIDDLEWARE = [
     'django.middleware.cache.UpdateCacheMiddleware',
 ]
 
-GZIP_MIN_LENGTH = 1024
+# Javoblarni siqish (app.compression): brotli / zstandard o'rnatilgan bo'lsa, ular ham taklif qilinadi
+COMPRESSION_MIN_LENGTH = 1024
+COMPRESSION_LEVELS = {'gzip': 6, 'br': 5, 'zstd': 3}
+# URL nomi bo'yicha: katta eksport oqimlarida tezlik siqish nisbatidan muhimroq
+COMPRESSION_ROUTE_LEVELS = {
+    'book_export': {'gzip': 1, 'br': 1, 'zstd': 1},
+}
+
+# Yuklamani boshqarish (app.load): qiymatlar bitta worker jarayoni uchun (umumiy = jarayonlar soni x qiymat).
+# Ko'p oqimli server talab qilinadi (Dockerfile: gunicorn --worker-class gthread); --threads LOAD_MAX_INFLIGHT dan
+# katta bo'lsin, aks holda ortiqcha so'rovlar 503 olish o'rniga server navbatida kutadi
+LOAD_SHEDDING_ENABLED = os.getenv("LOAD_SHEDDING_ENABLED", "True").lower() in ["true", "1", "yes"]
+# Jarayondagi jami so'rovlar (oqimlar soniga yaqin); ustuvorlik shu sig'imning qancha qismini egallay olishini belgilaydi
+LOAD_MAX_INFLIGHT = int(os.getenv("LOAD_MAX_INFLIGHT", 32))
+LOAD_PRIORITY_SHARES = {0: 1.0, 1: 0.9, 2: 0.5, 3: 0.25}
+# concurrency - bir vaqtda ishlovchi so'rovlar, queue - kutishi mumkin bo'lganlar, queue_timeout - kutish (s),
+# statement_timeout - PostgreSQL so'rov chegarasi (ms), retry_after - rad etilganda Retry-After (s)
+LOAD_CLASSES = {
+    'auth': {'priority': 0, 'concurrency': 8, 'queue': 32, 'queue_timeout': 2.0,
+             'statement_timeout': 2000, 'retry_after': 1},
+    'detail': {'priority': 1, 'concurrency': 16, 'queue': 32, 'queue_timeout': 1.0,
+               'statement_timeout': 2000, 'retry_after': 1},
+    'write': {'priority': 1, 'concurrency': 8, 'queue': 16, 'queue_timeout': 1.0,
+              'statement_timeout': 5000, 'retry_after': 2},
+    'list': {'priority': 2, 'concurrency': 4, 'queue': 8, 'queue_timeout': 0.5,
+             'statement_timeout': 5000, 'retry_after': 5},
+    'export': {'priority': 3, 'concurrency': 2, 'queue': 0, 'queue_timeout': 0,
+               'statement_timeout': 120000, 'retry_after': 30},
+}
+# URL nomi (nomsiz bo'lsa - yo'l) bo'yicha; qolganlari: GET + pk - detail, GET - list, boshqa metodlar - write
+LOAD_ROUTE_CLASSES = {
+    'api-token-auth/': 'auth',
+    'register_user': 'auth',
+    'login_user': 'auth',
+    'jwt_refresh': 'auth',
+    'author_batch': 'list',
+    'book_batch': 'list',
+    'book_export': 'export',
+    'change_feed': 'list',
+    'metrics_snapshot': 'detail',
+}
+# Siqilgan variant javobning max-age idan uzoq saqlanmaydi; max-age siz javoblar keshlanmaydi
+COMPRESSION_CACHE_TIMEOUT = 60 * 10
+COMPRESSION_STREAM_BUFFER = 64 * 1024
 
 # ==========================================
 # URLS & TEMPLATES
@@ -135,13 +284,20 @@ DATABASES = {
     }
 }
 
+# Lokal benchmark va tezkor sinovlar uchun: DB_ENGINE=sqlite
+if os.getenv("DB_ENGINE") == "sqlite":
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv("DB_NAME") or BASE_DIR / 'db.sqlite3',
+    }
+
 # ==========================================
 # PASSWORD VALIDATORS
 # ==========================================
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
-    {'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator'},
+    {'NAME': 'app.validators.CommonPasswordValidator'},
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
 ]
 